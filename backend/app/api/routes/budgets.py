@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends
 from app.dependencies import get_current_user
 from app.services.firestore_service import db
+from app.services.cache import MISSING, cache
 from datetime import datetime, timedelta
 import calendar
 
@@ -9,6 +10,14 @@ router = APIRouter()
 @router.get("/summary/current")
 async def get_current_summary(user: dict = Depends(get_current_user)):
     uid = user["uid"]
+    now = datetime.now()
+    
+    # Computed summaries are cached per user and dropped on the user's next write
+    cache_key = ("summary", uid, now.strftime("%Y-%m"))
+    summary = cache.get(cache_key)
+    if summary is not MISSING:
+        return summary
+    generation = cache.generation(uid)
     
     # 1. Get User Profile for Income
     user_data = await db.get_user(uid)
@@ -17,30 +26,21 @@ async def get_current_summary(user: dict = Depends(get_current_user)):
         monthly_income = float(user_data["profile"].get("monthlyIncome", 0))
     
     # 2. Determine Date Range (Current Month)
-    now = datetime.now()
     start_date = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
     
     # Get last day of month
     _, last_day = calendar.monthrange(now.year, now.month)
     end_date = now.replace(day=last_day, hour=23, minute=59, second=59, microsecond=999999)
     
-    # 3. Fetch Transactions
-    transactions = await db.get_transactions(uid, start_date, end_date)
-    
-    # 4. Aggregate
-    total_spent = 0.0
-    category_breakdown = {}
+    # 3. Fetch the month's pre-aggregated rollup (maintained on every transaction write)
+    rollup = await db.get_budget_rollup(uid, start_date) or {}
     
-    for txn in transactions:
-        amount = float(txn.get("amount", 0))
-        category = txn.get("category", "other")
-        
-        total_spent += amount
-        
-        if category not in category_breakdown:
-            category_breakdown[category] = {"spent": 0.0, "budget": 0.0, "percentage": 0.0}
-        
-        category_breakdown[category]["spent"] += amount
+    # 4. Build the breakdown
+    total_spent = float(rollup.get("totalSpent", 0))
+    category_breakdown = {
+        category: {"spent": float(spent), "budget": 0.0, "percentage": 0.0}
+        for category, spent in rollup.get("actualSpent", {}).items()
+    }
 
     # Calculate percentages
     for cat, data in category_breakdown.items():
@@ -51,7 +51,7 @@ async def get_current_summary(user: dict = Depends(get_current_user)):
     if monthly_income > 0:
         savings_rate = ((monthly_income - total_spent) / monthly_income) * 100
 
-    return {
+    summary = {
         "period": {
             "start": start_date.strftime("%Y-%m-%d"), 
             "end": end_date.strftime("%Y-%m-%d")
@@ -61,6 +61,8 @@ async def get_current_summary(user: dict = Depends(get_current_user)):
         "savingsRate": round(savings_rate, 2),
         "categoryBreakdown": category_breakdown
     }
+    cache.set(cache_key, summary, uid=uid, generation=generation)
+    return summary
 
 @router.get("/history")
 async def get_budget_history(months: int = 6, user: dict = Depends(get_current_user)):
@@ -68,27 +70,21 @@ async def get_budget_history(months: int = 6, user: dict = Depends(get_current_u
     
     # Calculate date range
     end_date = datetime.now()
-    start_date = end_date - timedelta(days=30 * months)
     
-    # Fetch all transactions in range
-    transactions = await db.get_transactions(uid, start_date, end_date)
+    cache_key = ("history", uid, months, end_date.strftime("%Y-%m-%d"))
+    history = cache.get(cache_key)
+    if history is not MISSING:
+        return history
+    generation = cache.generation(uid)
+    start_date = end_date - timedelta(days=30 * months)
     
-    # Aggregate by month
+    # Spending per month in range, one pre-aggregated rollup per month
     history = {}
     
-    for txn in transactions:
-        # Group by YYYY-MM
-        if isinstance(txn["date"], str):
-             d = datetime.strptime(txn["date"], "%Y-%m-%d")
-        else:
-             d = txn["date"] # Already datetime
-             
-        month_key = d.strftime("%Y-%m")
-        
-        if month_key not in history:
-            history[month_key] = {"month": month_key, "spent": 0.0, "income": 0.0} # Income would ideally be historical too
-            
-        history[month_key]["spent"] += float(txn.get("amount", 0))
+    for rollup in await db.get_budget_rollups(uid, start_date, end_date):
+        month_key = rollup["periodStart"].strftime("%Y-%m")
+        # Income would ideally be historical too
+        history[month_key] = {"month": month_key, "spent": float(rollup.get("totalSpent", 0)), "income": 0.0}
 
     # Get current profile income as baseline (simplification)
     user_data = await db.get_user(uid)
@@ -101,5 +97,7 @@ async def get_budget_history(months: int = 6, user: dict = Depends(get_current_u
         entry["savings"] = max(0, base_income - entry["spent"])
         entry["savingsRate"] = round((entry["savings"] / base_income * 100), 1) if base_income > 0 else 0
         result.append(entry)
-        
-    return {"history": result}
\ No newline at end of file
+    
+    history = {"history": result}
+    cache.set(cache_key, history, uid=uid, generation=generation)
+    return history
\ No newline at end of file
@@ -1,6 +1,18 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, status
+from app.config import settings
 from app.dependencies import get_current_user
-from pydantic import BaseModel
+from app.services.firestore_service import db
+from app.services.rl_service import registry, format_suggestion
+from app.services.rl_batcher import batcher
+from app.services.suggestions import current_suggestion, period_key
+from app.services.feedback import FEEDBACK_REWARDS, feedback_log, pending, trainer
+from app.services.adapters import adapters
+from app.services.rollups import month_start
+from app.rl_engine.state import ACTION_NAMES, allocation_from_spending, build_state
+from pydantic import BaseModel, Field
+from typing import Literal
+from datetime import datetime
+import asyncio
 
 router = APIRouter()
 
@@ -10,22 +22,69 @@ class SuggestionRequest(BaseModel):
 
 @router.post("/suggest")
 async def get_rl_suggestion(req: SuggestionRequest, user: dict = Depends(get_current_user)):
-    # This is where the RL Inference engine will be called
+    model = registry.get(req.modelType)
+    if model is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"RL model '{req.modelType}' is not loaded"
+        )
+    
+    uid = user["uid"]
+    now = datetime.now()
+    # The user's personalization of this model, if any
+    adapter = None
+    if settings.FEEDBACK_PERSONALIZE:
+        adapter = await adapters.get_async(model.name, uid, model.version)
+    
+    # 1. Precomputed suggestion, if it is still current for this model, adapter and month
+    precomputed = await db.get_suggestions(uid)
+    suggestion = current_suggestion(precomputed, model, period_key(now), adapter)
+    if suggestion is not None:
+        if precomputed.get("state"):
+            pending.put(uid, model.name, precomputed["state"], suggestion["actionId"])
+        return {"success": True, "suggestion": suggestion}
+    
+    # 2. Otherwise compute it: profile (income + risk preference)...
+    user_data = await db.get_user(uid)
+    profile = (user_data or {}).get("profile") or {}
+    monthly_income = float(profile.get("monthlyIncome", 0))
+    
+    # ...and current-month spending per category, from the month's rollup (one document read)
+    rollup = await db.get_budget_rollup(uid, month_start(now)) or {}
+    spending = rollup.get("actualSpent", {})
+    
+    # 3. Build the state and run the policy (batched with concurrent requests)
+    allocation = allocation_from_spending(monthly_income, spending)
+    state = build_state(allocation, profile.get("riskPreference", "moderate"), (now.month - 1) / 12)
+    q_values = await batcher.q_values(model, state, adapter)
+    suggestion = format_suggestion(model.name, q_values, allocation, monthly_income)
+    
+    # Kept so feedback on this suggestion can be learned from
+    pending.put(uid, model.name, state, suggestion["actionId"])
+    
     return {
         "success": True,
-        "suggestion": {
-            "reasoning": "RL Model not yet connected. Please train model first."
-        }
+        "suggestion": suggestion
     }
 
 class FeedbackRequest(BaseModel):
-    actionId: int
-    feedback: str # "accepted" | "rejected"
+    actionId: int = Field(ge=0, lt=len(ACTION_NAMES))
+    feedback: Literal["accepted", "rejected"]
     timestamp: str = None
 
 @router.post("/feedback")
 async def submit_feedback(req: FeedbackRequest, user: dict = Depends(get_current_user)):
-    # In a real system, this would update the RL agent's replay buffer
-    # For now, we just acknowledge receipt
-    print(f"User {user['uid']} {req.feedback} action {req.actionId}")
-    return {"success": True}
\ No newline at end of file
+    # Only appends to the feedback log; fine-tuning runs in the background trainer
+    served = pending.pop(user["uid"])
+    if served is None:
+        # No suggestion of ours to attribute the feedback to (e.g. served before a restart)
+        return {"success": True, "recorded": False}
+    
+    model_name, state, _ = served
+    # File I/O (and segment rolls) stays off the event loop
+    recorded = await asyncio.to_thread(
+        feedback_log.append, user["uid"], model_name, state, req.actionId, FEEDBACK_REWARDS[req.feedback]
+    )
+    if recorded:
+        trainer.notify()
+    return {"success": True, "recorded": recorded}
\ No newline at end of file
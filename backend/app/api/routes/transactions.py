@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from typing import List, Optional
 from app.dependencies import get_current_user
 from app.api.models.transaction import TransactionCreate, Transaction
@@ -12,7 +12,6 @@ router = APIRouter()
 async def create_transaction(txn: TransactionCreate, user: dict = Depends(get_current_user)):
     txn_data = txn.model_dump()
     txn_data["userId"] = user["uid"]
-    txn_data["createdAt"] = datetime.now()
     
     txn_id = await db.add_transaction(txn_data)
     return {"success": True, "transactionId": txn_id}
@@ -20,8 +19,9 @@ async def create_transaction(txn: TransactionCreate, user: dict = Depends(get_cu
 @router.get("/", response_model=dict)
 async def get_transactions(
     period: str = "current", 
-    limit: int = 50, 
+    limit: int = Query(50, ge=1, le=500), 
     category: Optional[str] = None,
+    cursor: Optional[str] = None,
     user: dict = Depends(get_current_user)
 ):
     uid = user["uid"]
@@ -36,17 +36,24 @@ async def get_transactions(
         _, last_day = calendar.monthrange(now.year, now.month)
         end_date = now.replace(day=last_day, hour=23, minute=59, second=59, microsecond=999999)
     elif period == "last_30":
-        end_date = now
-        start_date = now - timedelta(days=30)
+        # Whole days, so the bounds (and the cached count) stay the same all day
+        end_date = now.replace(hour=23, minute=59, second=59, microsecond=999999)
+        start_date = (now - timedelta(days=30)).replace(hour=0, minute=0, second=0, microsecond=0)
         
-    # Fetch transactions from Firestore
-    raw_txns = await db.get_transactions(uid, start_date, end_date)
+    # Filter, sort and limit inside Firestore; `cursor` continues from a previous page
+    from google.api_core.exceptions import GoogleAPICallError
+    try:
+        transactions, next_cursor, total = await db.get_transactions_page(
+            uid, start_date, end_date, category=category, limit=limit, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except GoogleAPICallError as e:
+        # Missing index (FailedPrecondition) or a transient outage
+        print(f"Firestore query error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Transactions are temporarily unavailable"
+        )
     
-    # Filter by category if provided
-    if category:
-        raw_txns = [t for t in raw_txns if t.get("category") == category]
-        
-    # Sort by date descending
-    raw_txns.sort(key=lambda x: x.get("date", datetime.min), reverse=True)
-    
-    return {"transactions": raw_txns[:limit], "total": len(raw_txns)}
\ No newline at end of file
+    return {"transactions": transactions, "total": total, "nextCursor": next_cursor}
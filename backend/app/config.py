@@ -1,5 +1,5 @@
 import os
-from typing import List
+from typing import Dict, List
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -9,6 +9,25 @@ class Settings(BaseSettings):
     FIREBASE_CREDENTIALS_PATH: str = "firebase-creds.json"
     CORS_ORIGINS: List[str] = ["http://localhost:5173"]
     DEFAULT_RL_MODEL: str = "dqn"
+    RL_MODELS: Dict[str, str] = {"dqn": "models/dqn_test.npz"}
+    MODEL_REGISTRY_DIR: str = "models/registry"
+    RL_BATCH_MAX_WAIT_MS: float = 2.0
+    RL_BATCH_MAX_SIZE: int = 64
+    CACHE_TTL_SECONDS: float = 30.0
+    CACHE_MAX_ENTRIES: int = 10000
+    CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    COLUMNAR_MAX_USERS: int = 1000
+    COLUMNAR_REFRESH_SECONDS: float = 30.0
+    FEEDBACK_DIR: str = "data/feedback"
+    FEEDBACK_LOG_MAX_BYTES: int = 64 * 1024 * 1024
+    FEEDBACK_MODEL: str = "dqn"
+    FEEDBACK_CHECKPOINT: str = "models/dqn_test.pth"
+    FEEDBACK_TRAIN_INTERVAL_SECONDS: float = 5.0
+    FEEDBACK_PUBLISH_INTERVAL_SECONDS: float = 60.0
+    FEEDBACK_PERSONALIZE: bool = False
+    ADAPTER_DIR: str = "data/adapters"
+    ADAPTER_CACHE_SIZE: int = 10000
+    ADAPTER_RANK: int = 4
     ENV: str = "development"
 
     class Config:
@@ -1,18 +1,36 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from firebase_admin import auth, credentials, initialize_app
 from app.config import settings
 import os
+import threading
 
 security = HTTPBearer()
 
-# Initialize Firebase Admin SDK
-if os.path.exists(settings.FIREBASE_CREDENTIALS_PATH):
-    cred = credentials.Certificate(settings.FIREBASE_CREDENTIALS_PATH)
-    try:
-        initialize_app(cred)
-    except ValueError:
-        pass # Already initialized
+_firebase_lock = threading.Lock()
+_firebase_auth = None
+
+def get_firebase_auth():
+    """
+    Imports and initializes the Firebase Admin SDK on first use.
+
+    firebase_admin pulls in google.auth and friends, so it is kept off the
+    import path and warmed up from the app's lifespan hook instead.
+    """
+    global _firebase_auth
+    if _firebase_auth is None:
+        with _firebase_lock:
+            if _firebase_auth is None:
+                from firebase_admin import auth, credentials, initialize_app
+                
+                # Initialize Firebase Admin SDK
+                if os.path.exists(settings.FIREBASE_CREDENTIALS_PATH):
+                    cred = credentials.Certificate(settings.FIREBASE_CREDENTIALS_PATH)
+                    try:
+                        initialize_app(cred)
+                    except ValueError:
+                        pass # Already initialized
+                _firebase_auth = auth
+    return _firebase_auth
 
 async def get_current_user(token: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     # Development Bypass: If no creds file, return a mock user
@@ -20,11 +38,11 @@ async def get_current_user(token: HTTPAuthorizationCredentials = Depends(securit
         return {"uid": "dev_user_123", "email": "dev@example.com"}
     
     try:
-        decoded_token = auth.verify_id_token(token.credentials)
+        decoded_token = get_firebase_auth().verify_id_token(token.credentials)
         return {"uid": decoded_token["uid"], "email": decoded_token.get("email")}
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
-        )
\ No newline at end of file
+        )
@@ -1,11 +1,38 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes import users, transactions, budgets, rl
 from app.config import settings
+from app.dependencies import get_firebase_auth
+from app.services.firestore_service import db
+from app.services.rl_service import registry
+from app.services.rl_batcher import batcher
+from app.services.feedback import trainer
+
+def warm_up():
+    # Heavy clients and models are initialized off the import path so the
+    # server starts accepting requests before they are ready
+    get_firebase_auth()
+    db.db
+    # Load RL checkpoints once so inference never touches the disk on the request path
+    registry.load_all(settings.RL_MODELS)
+    # Started after the registry is loaded, so fine-tuned weights it publishes aren't overwritten
+    trainer.start()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warm_up_task = asyncio.create_task(asyncio.to_thread(warm_up))
+    batcher.start()
+    yield
+    await batcher.stop()
+    await warm_up_task
+    await asyncio.to_thread(trainer.stop)
 
 app = FastAPI(
     title="RL Budget Optimizer API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS for frontend communication
@@ -0,0 +1,154 @@
+"""
+Per-user low-rank adapters on a frozen, shared DQN policy.
+
+An adapter only corrects the output layer:
+
+    Q(s) = h(s) @ W + b + (h(s) @ down) @ up + bias
+
+where h(s) are the base network's last hidden activations. At rank 4 that
+is 128*4 + 4*9 + 9 floats (about 2 KB), against megabytes for a full
+checkpoint with optimizer state. Serving needs only NumPy; fit_adapter
+imports torch when called.
+"""
+import os
+import numpy as np
+
+class Adapter:
+    def __init__(self, down, up, bias, base_version=None, version=0):
+        """
+        Args:
+            down (np.ndarray): (hidden, rank) projection of the base features.
+            up (np.ndarray): (rank, action_dim) projection to Q-value deltas.
+            bias (np.ndarray): (action_dim,) Q-value offsets.
+            base_version (str): Version of the base model the adapter was fit on.
+            version (int): Incremented on every fit, so cached results can be invalidated.
+        """
+        self.down = np.asarray(down, dtype=np.float32)
+        self.up = np.asarray(up, dtype=np.float32)
+        self.bias = np.asarray(bias, dtype=np.float32)
+        self.base_version = base_version
+        self.version = version
+
+    @property
+    def rank(self):
+        return self.down.shape[1]
+
+    @property
+    def nbytes(self):
+        return self.down.nbytes + self.up.nbytes + self.bias.nbytes
+
+    @classmethod
+    def zeros(cls, hidden_dim, action_dim, rank=4, base_version=None, seed=None):
+        """A fresh adapter with zero effect: `down` is small noise, `up` and `bias` are zero."""
+        rng = np.random.default_rng(seed)
+        down = rng.normal(0.0, 1.0 / np.sqrt(hidden_dim), size=(hidden_dim, rank))
+        return cls(down, np.zeros((rank, action_dim)), np.zeros(action_dim), base_version)
+
+    def delta(self, features):
+        """Q-value corrections for (N, hidden) base features."""
+        return (features @ self.down) @ self.up + self.bias
+
+    def save(self, path):
+        """Writes the adapter atomically (write to a temp file, then rename)."""
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, down=self.down, up=self.up, bias=self.bias,
+                     base_version=np.array(self.base_version or ""), version=np.array(self.version))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["down"], data["up"], data["bias"], str(data["base_version"]) or None,
+                       int(data["version"]))
+
+def adapted_q_values(features, weight, bias, adapters):
+    """
+    Q-values for a batch whose rows may each use a different adapter.
+
+    The base output layer runs once for the whole batch; adapter rows are
+    then corrected with one batched matmul per adapter rank.
+
+    Args:
+        features (np.ndarray): (N, hidden) base features.
+        weight, bias: The base output layer, (hidden, action_dim) and (action_dim,).
+        adapters (list): N entries, each an Adapter or None.
+
+    Returns:
+        np.ndarray: (N, action_dim) Q-values.
+    """
+    q_values = features @ weight + bias
+
+    by_rank = {}
+    for row, adapter in enumerate(adapters):
+        if adapter is not None:
+            by_rank.setdefault(adapter.rank, []).append(row)
+
+    for rows in by_rank.values():
+        # Stack each distinct adapter once; rows index into the stack
+        index, stacked, slots = {}, [], []
+        for row in rows:
+            adapter = adapters[row]
+            if id(adapter) not in index:
+                index[id(adapter)] = len(stacked)
+                stacked.append(adapter)
+            slots.append(index[id(adapter)])
+        downs = np.stack([a.down for a in stacked])[slots]
+        ups = np.stack([a.up for a in stacked])[slots]
+        biases = np.stack([a.bias for a in stacked])[slots]
+
+        low_rank = np.matmul(features[rows][:, None, :], downs)      # (R, 1, rank)
+        q_values[rows] += np.matmul(low_rank, ups)[:, 0, :] + biases
+    return q_values
+
+def fit_adapter(policy, transitions, adapter=None, rank=4, steps=20, lr=1e-2, gamma=0.99, base_version=None):
+    """
+    Fits a user's adapter to their transitions with the base policy frozen.
+
+    Targets bootstrap from the adapted Q-values of the next states, as in
+    DQNAgent.learn; only the adapter's parameters receive gradients.
+
+    Args:
+        policy: Base policy with features() and output_layer (NumpyPolicy or TorchPolicy).
+        transitions (tuple): (states, actions, rewards, next_states, dones) arrays.
+        adapter (Adapter): Existing adapter to continue from; a fresh one if None.
+        rank (int): Rank of a fresh adapter.
+        steps (int): Gradient steps.
+
+    Returns:
+        Adapter: The updated adapter, with its version incremented.
+    """
+    import torch
+
+    states, actions, rewards, next_states, dones = transitions
+    weight, bias = (torch.from_numpy(np.asarray(x, dtype=np.float32)) for x in policy.output_layer)
+    features = torch.from_numpy(np.asarray(policy.features(states), dtype=np.float32))
+    next_features = torch.from_numpy(np.asarray(policy.features(next_states), dtype=np.float32))
+    base_q = features @ weight + bias
+    base_next_q = next_features @ weight + bias
+
+    if adapter is None:
+        adapter = Adapter.zeros(weight.shape[0], weight.shape[1], rank, base_version)
+    down = torch.tensor(adapter.down, requires_grad=True)
+    up = torch.tensor(adapter.up, requires_grad=True)
+    offset = torch.tensor(adapter.bias, requires_grad=True)
+    optimizer = torch.optim.Adam([down, up, offset], lr=lr)
+
+    actions = torch.as_tensor(actions, dtype=torch.int64).view(-1, 1)
+    rewards = torch.as_tensor(rewards, dtype=torch.float32).view(-1, 1)
+    dones = torch.as_tensor(dones, dtype=torch.float32).view(-1, 1)
+
+    for _ in range(steps):
+        current_q = (base_q + (features @ down) @ up + offset).gather(1, actions)
+        with torch.no_grad():
+            next_q = (base_next_q + (next_features @ down) @ up + offset).max(1)[0].unsqueeze(1)
+            target_q = rewards + gamma * next_q * (1 - dones)
+        loss = torch.nn.functional.mse_loss(current_q, target_q)
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+
+    return Adapter(down.detach().numpy(), up.detach().numpy(), offset.detach().numpy(),
+                   base_version, adapter.version + 1)
@@ -3,8 +3,9 @@ import torch.nn as nn
 import torch.optim as optim
 import numpy as np
 import random
-from collections import deque
 import os
+from app.rl_engine.metrics import timed
+from app.rl_engine.agents.replay_buffer import ReplayBuffer, PrioritizedReplayBuffer
 
 class DQN(nn.Module):
     def __init__(self, input_dim, output_dim):
@@ -21,18 +22,45 @@ class DQN(nn.Module):
         return self.net(x)
 
 class DQNAgent:
-    def __init__(self, state_dim=10, action_dim=9, lr=1e-3, gamma=0.99, epsilon=1.0):
+    def __init__(self, state_dim=10, action_dim=9, lr=1e-3, gamma=0.99, epsilon=1.0, memory_size=10000,
+                 prioritized=False, per_alpha=0.6, per_beta=0.4, batch_size=64, learning_starts=0,
+                 train_freq=1, gradient_steps=1, tau=None):
+        """
+        Args:
+            batch_size (int): Transitions per gradient step.
+            learning_starts (int): Environment steps to collect before the first update.
+            train_freq (int): Environment steps between rounds of updates in train_step().
+            gradient_steps (int): Gradient steps per round.
+            tau (float): Polyak coefficient for a soft target update after every gradient
+                step; None keeps hard copies via update_target_network().
+        """
         self.state_dim = state_dim
         self.action_dim = action_dim
         self.gamma = gamma
         self.epsilon = epsilon
         self.epsilon_min = 0.01
         self.epsilon_decay = 0.995
-        self.batch_size = 64
-        self.memory = deque(maxlen=10000)
+        self.batch_size = batch_size
+        
+        self.learning_starts = learning_starts
+        self.train_freq = train_freq
+        self.gradient_steps = gradient_steps
+        self.tau = tau
+        self.num_timesteps = 0
+        self.num_updates = 0
+        self._steps_since_train = 0
         
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         
+        # Replay memory: uniform by default, proportional prioritized replay if requested
+        self.prioritized = prioritized
+        if prioritized:
+            self.memory = PrioritizedReplayBuffer(
+                memory_size, state_dim, device=self.device, alpha=per_alpha, beta=per_beta
+            )
+        else:
+            self.memory = ReplayBuffer(memory_size, state_dim, device=self.device)
+        
         # Policy Network (trains every step)
         self.policy_net = DQN(state_dim, action_dim).to(self.device)
         # Target Network (stabilizes training)
@@ -41,6 +69,12 @@ class DQNAgent:
         
         self.optimizer = optim.Adam(self.policy_net.parameters(), lr=lr)
         self.loss_fn = nn.MSELoss()
+        
+        # Optional metrics.TrainingMetrics; timers and stats are skipped when None
+        self.metrics = None
+
+    def _phase(self, name):
+        return timed(self.metrics, name)
 
     def select_action(self, state, training=True):
         # Epsilon-greedy strategy
@@ -52,54 +86,169 @@ class DQNAgent:
             q_values = self.policy_net(state_t)
             return q_values.argmax().item()
 
+    def select_actions(self, states, training=True):
+        """Epsilon-greedy actions for a batch of states (e.g. from a vector env)."""
+        with torch.no_grad():
+            states_t = torch.from_numpy(np.asarray(states, dtype=np.float32)).to(self.device)
+            actions = self.policy_net(states_t).argmax(dim=1).cpu().numpy()
+        
+        if training:
+            explore = np.random.random(len(actions)) < self.epsilon
+            actions[explore] = np.random.randint(self.action_dim, size=explore.sum())
+        return actions
+
     def remember(self, state, action, reward, next_state, done):
-        self.memory.append((state, action, reward, next_state, done))
+        self.memory.add(state, action, reward, next_state, done)
+
+    def remember_batch(self, states, actions, rewards, next_states, dones):
+        self.memory.add_batch(states, actions, rewards, next_states, dones)
 
     def replay(self):
+        """One gradient step on a sampled batch, then one epsilon decay."""
         if len(self.memory) < self.batch_size:
             return
         
-        batch = random.sample(self.memory, self.batch_size)
-        states, actions, rewards, next_states, dones = zip(*batch)
+        self._gradient_step()
+        self._decay_epsilon()
+
+    def train_step(self, num_steps=1):
+        """
+        Call once per environment step, after storing its `num_steps` transitions
+        (num_envs for a vector env). Once `learning_starts` steps have been
+        collected, runs `gradient_steps` updates for every `train_freq` steps.
+        Epsilon decays once per call, so the exploration schedule doesn't depend
+        on train_freq.
+        """
+        self.num_timesteps += num_steps
+        if self.num_timesteps < self.learning_starts or len(self.memory) < self.batch_size:
+            return
         
-        states = torch.FloatTensor(np.array(states)).to(self.device)
-        actions = torch.LongTensor(actions).unsqueeze(1).to(self.device)
-        rewards = torch.FloatTensor(rewards).unsqueeze(1).to(self.device)
-        next_states = torch.FloatTensor(np.array(next_states)).to(self.device)
-        dones = torch.FloatTensor(dones).unsqueeze(1).to(self.device)
+        self._steps_since_train += num_steps
+        rounds, self._steps_since_train = divmod(self._steps_since_train, self.train_freq)
+        for _ in range(rounds * self.gradient_steps):
+            self._gradient_step()
+        self._decay_epsilon()
+
+    def _decay_epsilon(self):
+        if self.epsilon > self.epsilon_min:
+            self.epsilon *= self.epsilon_decay
+
+    def _gradient_step(self):
+        with self._phase("sample"):
+            if self.prioritized:
+                batch, indices, weights = self.memory.sample(self.batch_size)
+            else:
+                batch, weights = self.memory.sample(self.batch_size), None
         
-        # Current Q values
-        current_q = self.policy_net(states).gather(1, actions)
+        td_errors = self.learn(*batch, weights=weights)
         
-        # Target Q values (Bellman equation)
-        with torch.no_grad():
-            next_q = self.target_net(next_states).max(1)[0].unsqueeze(1)
-            target_q = rewards + (self.gamma * next_q * (1 - dones))
+        if self.prioritized:
+            # New priorities are the absolute TD errors
+            with self._phase("priority_update"):
+                self.memory.update_priorities(indices, td_errors.cpu().numpy())
+
+    def learn(self, states, actions, rewards, next_states, dones, weights=None):
+        """
+        Runs one gradient step on a batch of transitions.
+
+        Args:
+            states, next_states: (B, state_dim) float tensors.
+            actions: (B, 1) int64 tensor.
+            rewards, dones: (B, 1) float tensors.
+            weights: Optional (B, 1) importance-sampling weights.
+
+        Returns:
+            torch.Tensor: (B,) absolute TD errors, detached.
+        """
+        with self._phase("forward"):
+            # Current Q values
+            current_q = self.policy_net(states).gather(1, actions)
             
-        loss = self.loss_fn(current_q, target_q)
+            # Target Q values (Bellman equation)
+            with torch.no_grad():
+                next_q = self.target_net(next_states).max(1)[0].unsqueeze(1)
+                target_q = rewards + (self.gamma * next_q * (1 - dones))
+                
+            if weights is not None:
+                # Importance-sampling weighted MSE
+                td_errors = target_q - current_q
+                loss = (weights * td_errors.pow(2)).mean()
+            else:
+                loss = self.loss_fn(current_q, target_q)
         
-        self.optimizer.zero_grad()
-        loss.backward()
-        self.optimizer.step()
+        with self._phase("backward"):
+            self.optimizer.zero_grad()
+            loss.backward()
+            self.optimizer.step()
         
-        # Decay epsilon
-        if self.epsilon > self.epsilon_min:
-            self.epsilon *= self.epsilon_decay
+        self.num_updates += 1
+        if self.tau is not None:
+            self.soft_update_target_network()
+        
+        td_errors = (target_q - current_q).detach().abs().squeeze(1)
+        if self.metrics:
+            self.metrics.count("updates")
+            self.metrics.observe("loss", loss.item())
+            self.metrics.observe("q_mean", current_q.detach().mean().item())
+            self.metrics.observe("q_max", current_q.detach().max().item())
+            self.metrics.observe("td_error", td_errors.mean().item())
+        return td_errors
 
     def update_target_network(self):
-        self.target_net.load_state_dict(self.policy_net.state_dict())
+        with self._phase("target_update"):
+            self.target_net.load_state_dict(self.policy_net.state_dict())
+
+    def soft_update_target_network(self, tau=None):
+        """Polyak update: target <- (1 - tau) * target + tau * policy."""
+        tau = self.tau if tau is None else tau
+        with self._phase("target_update"), torch.no_grad():
+            for target, source in zip(self.target_net.parameters(), self.policy_net.parameters()):
+                target.lerp_(source, tau)
 
     def save(self, path):
-        os.makedirs(os.path.dirname(path), exist_ok=True)
+        """
+        Writes a full training checkpoint (policy, target network, optimizer
+        and schedule state). The file is written next to `path` and renamed
+        into place, so readers never see a partial checkpoint. For versioned
+        serving artifacts see app.rl_engine.artifacts.
+        """
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
         torch.save({
             'model_state_dict': self.policy_net.state_dict(),
+            'target_state_dict': self.target_net.state_dict(),
             'optimizer_state_dict': self.optimizer.state_dict(),
-            'epsilon': self.epsilon
-        }, path)
+            'epsilon': self.epsilon,
+            'num_timesteps': self.num_timesteps,
+            'num_updates': self.num_updates
+        }, tmp_path)
+        os.replace(tmp_path, path)
 
     def load(self, path):
-        if os.path.exists(path):
-            checkpoint = torch.load(path, map_location=self.device)
-            self.policy_net.load_state_dict(checkpoint['model_state_dict'])
-            self.target_net.load_state_dict(checkpoint['model_state_dict'])
-            self.epsilon = checkpoint.get('epsilon', 0.01)
\ No newline at end of file
+        """
+        Restores a checkpoint written by save().
+
+        The target network and optimizer are restored too, so training resumes
+        where it stopped; checkpoints without a target network (older format)
+        get a copy of the policy weights.
+
+        Raises:
+            FileNotFoundError: If `path` does not exist.
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No DQN checkpoint at {path}")
+        checkpoint = torch.load(path, map_location=self.device, weights_only=True)
+        self.load_state(checkpoint['model_state_dict'], checkpoint.get('target_state_dict'),
+                        checkpoint.get('optimizer_state_dict'))
+        self.epsilon = checkpoint.get('epsilon', 0.01)
+        self.num_timesteps = checkpoint.get('num_timesteps', 0)
+        self.num_updates = checkpoint.get('num_updates', 0)
+
+    def load_state(self, policy_state, target_state=None, optimizer_state=None):
+        """Loads network (and optionally optimizer) weights, keeping the target network consistent."""
+        self.policy_net.load_state_dict(policy_state)
+        self.target_net.load_state_dict(target_state if target_state is not None else policy_state)
+        if optimizer_state is not None:
+            # Moves the Adam moments to self.device along with the parameters
+            self.optimizer.load_state_dict(optimizer_state)
@@ -0,0 +1,188 @@
+import numpy as np
+import torch
+
+class ReplayBuffer:
+    """
+    Fixed-capacity replay memory backed by preallocated arrays.
+
+    Transitions are written at a circular index, so storage never grows and
+    sampling is a single fancy-index gather per field followed by a
+    zero-copy torch.from_numpy.
+    """
+    def __init__(self, capacity, state_dim, device="cpu", seed=None):
+        self.capacity = capacity
+        self.state_dim = state_dim
+        self.device = torch.device(device)
+        self.rng = np.random.default_rng(seed)
+
+        self.states = np.zeros((capacity, state_dim), dtype=np.float32)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros((capacity, state_dim), dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=np.float32)
+
+        self.position = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state, action, reward, next_state, done):
+        """Stores a single transition and returns its slot index."""
+        idx = self.position
+        self.states[idx] = state
+        self.actions[idx] = action
+        self.rewards[idx] = reward
+        self.next_states[idx] = next_state
+        self.dones[idx] = done
+
+        self.position = (idx + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return idx
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        """
+        Stores a batch of transitions (e.g. one step of a vector env).
+
+        Returns:
+            np.ndarray: Slot indices the transitions were written to.
+        """
+        n = len(actions)
+        if n > self.capacity:
+            # Only the most recent `capacity` transitions would survive anyway
+            states, actions, rewards = states[-self.capacity:], actions[-self.capacity:], rewards[-self.capacity:]
+            next_states, dones = next_states[-self.capacity:], dones[-self.capacity:]
+            n = self.capacity
+
+        idx = (self.position + np.arange(n)) % self.capacity
+        self.states[idx] = states
+        self.actions[idx] = actions
+        self.rewards[idx] = rewards
+        self.next_states[idx] = next_states
+        self.dones[idx] = dones
+
+        self.position = (self.position + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+        return idx
+
+    def sample(self, batch_size):
+        """Samples a batch uniformly (with replacement) as torch tensors."""
+        idx = self.rng.integers(0, self.size, size=batch_size)
+        return self.gather(idx)
+
+    def gather(self, idx):
+        """
+        Returns (states, actions, rewards, next_states, dones) tensors for the
+        given slot indices. actions, rewards and dones are shaped (batch, 1).
+        """
+        return (
+            torch.from_numpy(self.states[idx]).to(self.device),
+            torch.from_numpy(self.actions[idx]).unsqueeze(1).to(self.device),
+            torch.from_numpy(self.rewards[idx]).unsqueeze(1).to(self.device),
+            torch.from_numpy(self.next_states[idx]).to(self.device),
+            torch.from_numpy(self.dones[idx]).unsqueeze(1).to(self.device),
+        )
+
+
+class SumTree:
+    """
+    Array-based sum tree (segment tree) over per-slot priorities.
+
+    The root lives at index 1 and leaf i at index `tree_capacity + i`, so
+    updates walk log2(capacity) parents and proportional lookups descend
+    log2(capacity) levels. Both operations are vectorized over a batch of
+    indices/values.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.tree_capacity = 1 << max(capacity - 1, 1).bit_length()
+        self.tree = np.zeros(2 * self.tree_capacity, dtype=np.float64)
+
+    def total(self):
+        return self.tree[1]
+
+    def get(self, idx):
+        return self.tree[np.asarray(idx) + self.tree_capacity]
+
+    def update(self, idx, priorities):
+        nodes = np.asarray(idx, dtype=np.int64) + self.tree_capacity
+        self.tree[nodes] = priorities
+        
+        # Recompute every affected ancestor, one tree level at a time
+        nodes = np.unique(nodes // 2)
+        while nodes[0] >= 1:
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+            nodes = np.unique(nodes // 2)
+
+    def find(self, values):
+        """Returns the slot whose prefix-sum interval contains each value in [0, total)."""
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        
+        while nodes[0] < self.tree_capacity:
+            left = 2 * nodes
+            left_sum = self.tree[left]
+            go_right = values >= left_sum
+            values = np.where(go_right, values - left_sum, values)
+            nodes = np.where(go_right, left + 1, left)
+            
+        return nodes - self.tree_capacity
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """
+    Proportional prioritized experience replay (Schaul et al., 2016).
+
+    Transitions are sampled with probability p_i^alpha / sum_k p_k^alpha via
+    a SumTree, and returned with importance-sampling weights
+    (N * P(i))^-beta, normalized by the batch maximum. beta is annealed
+    towards 1 on every sample.
+    """
+    def __init__(self, capacity, state_dim, device="cpu", seed=None,
+                 alpha=0.6, beta=0.4, beta_increment=1e-4, eps=1e-6):
+        super(PrioritizedReplayBuffer, self).__init__(capacity, state_dim, device=device, seed=seed)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.eps = eps
+        self.max_priority = 1.0
+        self.tree = SumTree(capacity)
+
+    def add(self, state, action, reward, next_state, done):
+        # New transitions get the max priority so they are replayed at least once
+        idx = super().add(state, action, reward, next_state, done)
+        self.tree.update([idx], self.max_priority ** self.alpha)
+        return idx
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        idx = super().add_batch(states, actions, rewards, next_states, dones)
+        self.tree.update(idx, np.full(len(idx), self.max_priority ** self.alpha))
+        return idx
+
+    def sample(self, batch_size):
+        """
+        Stratified proportional sampling.
+
+        Returns:
+            tuple: (batch, indices, weights) where batch is the same tuple of tensors
+                returned by ReplayBuffer.sample and weights is a (batch, 1) tensor.
+        """
+        total = self.tree.total()
+        segment = total / batch_size
+        values = (np.arange(batch_size) + self.rng.random(batch_size)) * segment
+        
+        idx = np.minimum(self.tree.find(values), self.size - 1)
+        
+        probs = self.tree.get(idx) / total
+        weights = (self.size * probs) ** (-self.beta)
+        weights = (weights / weights.max()).astype(np.float32)
+        
+        self.beta = min(1.0, self.beta + self.beta_increment)
+        
+        weights_t = torch.from_numpy(weights).unsqueeze(1).to(self.device)
+        return self.gather(idx), idx, weights_t
+
+    def update_priorities(self, idx, td_errors):
+        priorities = np.abs(td_errors) + self.eps
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(idx, priorities ** self.alpha)
@@ -0,0 +1,343 @@
+"""
+Versioned DQN model artifacts and a local artifact registry.
+
+Layout under the registry root:
+
+    {name}/CURRENT                   version served by default (e.g. "v0003")
+    {name}/v0003/manifest.json       dims, profile, training metrics, file hashes
+    {name}/v0003/policy.safetensors  inference artifact: policy weights
+    {name}/v0003/resume.pt           resume artifact: target net, optimizer, schedule
+
+A version is written to a temporary directory and renamed into place, so it
+either exists completely or not at all. Weights use the safetensors layout
+(8-byte header length, JSON header, raw little-endian tensors) and are
+memory-mapped on load, so serving a model copies no weights and never
+unpickles anything. Only `load_agent` (resuming training) reads resume.pt.
+
+Usage (from backend/):
+    python -m app.rl_engine.artifacts list dqn
+    python -m app.rl_engine.artifacts import dqn models/dqn_test.pth
+    python -m app.rl_engine.artifacts rollback dqn
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import struct
+from datetime import datetime
+import numpy as np
+
+FORMAT = "dqn-artifact/1"
+MANIFEST = "manifest.json"
+POLICY_FILE = "policy.safetensors"
+RESUME_FILE = "resume.pt"
+
+_DTYPES = {"F16": np.float16, "F32": np.float32, "F64": np.float64, "I32": np.int32, "I64": np.int64,
+           "U8": np.uint8}
+_DTYPE_NAMES = {np.dtype(dtype): name for name, dtype in _DTYPES.items()}
+_VERSION = re.compile(r"v(\d+)")
+
+def _fsync_write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def write_safetensors(path, tensors, metadata=None):
+    """
+    Writes `tensors` (name -> np.ndarray) in the safetensors format.
+
+    Args:
+        metadata (dict): Optional string -> string pairs stored in the header.
+    """
+    header, offset = {}, 0
+    arrays = []
+    for name, array in tensors.items():
+        array = np.ascontiguousarray(array)
+        header[name] = {"dtype": _DTYPE_NAMES[array.dtype.newbyteorder("=")], "shape": list(array.shape),
+                        "data_offsets": [offset, offset + array.nbytes]}
+        arrays.append(array.astype(array.dtype.newbyteorder("<"), copy=False))
+        offset += array.nbytes
+    if metadata:
+        header["__metadata__"] = {str(k): str(v) for k, v in metadata.items()}
+
+    header_bytes = json.dumps(header, separators=(",", ":")).encode()
+    # Pad so the data (and so every float32 tensor) starts 8-byte aligned
+    header_bytes += b" " * (-len(header_bytes) % 8)
+    _fsync_write(path, struct.pack("<Q", len(header_bytes)) + header_bytes
+                 + b"".join(array.tobytes() for array in arrays))
+
+def read_safetensors(path):
+    """
+    Memory-maps a safetensors file.
+
+    Returns:
+        tuple: (tensors, metadata). Tensors are read-only views into the
+        mapping, so nothing is copied until a tensor is actually used.
+    """
+    with open(path, "rb") as f:
+        header_len = struct.unpack("<Q", f.read(8))[0]
+        header = json.loads(f.read(header_len))
+    metadata = header.pop("__metadata__", {})
+
+    data = np.memmap(path, dtype=np.uint8, mode="r", offset=8 + header_len)
+    tensors = {}
+    for name, info in header.items():
+        start, end = info["data_offsets"]
+        dtype = np.dtype(_DTYPES[info["dtype"]]).newbyteorder("<")
+        tensors[name] = data[start:end].view(dtype).reshape(info["shape"])
+    return tensors, metadata
+
+def linear_layers(tensors):
+    """(weight, bias) pairs of a DQN state dict ("net.{i}.weight"), in layer order."""
+    indices = sorted(int(name.split(".")[1]) for name in tensors if name.endswith(".weight"))
+    return [(tensors[f"net.{i}.weight"], tensors[f"net.{i}.bias"]) for i in indices]
+
+class Artifact:
+    """One loaded artifact version: its manifest, directory and memory-mapped policy tensors."""
+    def __init__(self, path, manifest, tensors):
+        self.path = path
+        self.manifest = manifest
+        self.tensors = tensors
+
+    @property
+    def version(self):
+        """Content version: changes whenever the policy weights do."""
+        return self.manifest["files"][POLICY_FILE]["sha256"][:12]
+
+    def numpy_policy(self):
+        """A NumpyPolicy over the mapped weights (transposed views, no copies)."""
+        from app.rl_engine.numpy_policy import NumpyPolicy
+        layers = linear_layers(self.tensors)
+        return NumpyPolicy([weight.T for weight, _ in layers], [bias for _, bias in layers])
+
+def read_manifest(version_dir):
+    with open(os.path.join(version_dir, MANIFEST)) as f:
+        return json.load(f)
+
+def load_artifact(path, verify=True):
+    """
+    Loads the inference half of an artifact: manifest and policy weights.
+
+    Args:
+        path (str): A version directory, or a model directory (its CURRENT
+            version is loaded).
+        verify (bool): Check the weights against the manifest's SHA-256.
+
+    Raises:
+        FileNotFoundError: If there is no artifact at `path`.
+        ValueError: If the weights don't match the manifest.
+    """
+    if not os.path.exists(os.path.join(path, MANIFEST)):
+        path = os.path.join(path, ArtifactRegistry.current_version(path))
+    manifest = read_manifest(path)
+    policy_path = os.path.join(path, POLICY_FILE)
+    if verify and _sha256(policy_path) != manifest["files"][POLICY_FILE]["sha256"]:
+        raise ValueError(f"Checksum mismatch for {policy_path}")
+    tensors, _ = read_safetensors(policy_path)
+    return Artifact(path, manifest, tensors)
+
+def load_agent(path, verify=True, **agent_kwargs):
+    """
+    Rebuilds a DQNAgent from an artifact for further training.
+
+    Policy weights come from the safetensors file; target network, optimizer
+    and schedule state from resume.pt if the artifact has one (otherwise the
+    target network copies the policy and the optimizer starts fresh).
+    """
+    import torch
+    from app.rl_engine.agents.dqn import DQNAgent
+
+    artifact = load_artifact(path, verify)
+    manifest = artifact.manifest
+    agent = DQNAgent(manifest["state_dim"], manifest["action_dim"], **agent_kwargs)
+    policy_state = {name: torch.from_numpy(np.array(t)) for name, t in artifact.tensors.items()}
+
+    resume_path = os.path.join(artifact.path, RESUME_FILE)
+    if RESUME_FILE not in manifest["files"]:
+        agent.load_state(policy_state)
+        return agent
+    if verify and _sha256(resume_path) != manifest["files"][RESUME_FILE]["sha256"]:
+        raise ValueError(f"Checksum mismatch for {resume_path}")
+    resume = torch.load(resume_path, map_location=agent.device, weights_only=True)
+    agent.load_state(policy_state, resume["target_state_dict"], resume["optimizer_state_dict"])
+    agent.epsilon = resume["epsilon"]
+    agent.num_timesteps = resume["num_timesteps"]
+    agent.num_updates = resume["num_updates"]
+    return agent
+
+class ArtifactRegistry:
+    """Versions of named models under `root`, with a movable CURRENT pointer."""
+    def __init__(self, root):
+        self.root = root
+
+    def model_dir(self, name):
+        return os.path.join(self.root, name)
+
+    def path(self, name, version=None):
+        return os.path.join(self.model_dir(name), version or self.current_version(self.model_dir(name)))
+
+    def versions(self, name):
+        """Manifests of all complete versions, oldest first."""
+        model_dir = self.model_dir(name)
+        if not os.path.isdir(model_dir):
+            return []
+        versions = sorted((int(m.group(1)), entry) for entry in os.listdir(model_dir)
+                          if (m := _VERSION.fullmatch(entry)))
+        return [read_manifest(os.path.join(model_dir, entry)) for _, entry in versions]
+
+    @staticmethod
+    def current_version(model_dir):
+        """The version CURRENT points to, or the newest version if there is no pointer."""
+        pointer = os.path.join(model_dir, "CURRENT")
+        if os.path.exists(pointer):
+            with open(pointer) as f:
+                return f.read().strip()
+        versions = sorted(int(m.group(1)) for entry in os.listdir(model_dir) if (m := _VERSION.fullmatch(entry))) \
+            if os.path.isdir(model_dir) else []
+        if not versions:
+            raise FileNotFoundError(f"No model artifacts in {model_dir}")
+        return f"v{versions[-1]:04d}"
+
+    def current(self, name):
+        return self.current_version(self.model_dir(name))
+
+    def promote(self, name, version):
+        """Points CURRENT at `version` (atomically)."""
+        if not os.path.exists(os.path.join(self.model_dir(name), version, MANIFEST)):
+            raise ValueError(f"Unknown version {version!r} of model {name!r}")
+        pointer = os.path.join(self.model_dir(name), "CURRENT")
+        _fsync_write(f"{pointer}.tmp", version.encode())
+        os.replace(f"{pointer}.tmp", pointer)
+
+    def rollback(self, name):
+        """Points CURRENT at the version before it and returns that version."""
+        versions = [manifest["version"] for manifest in self.versions(name)]
+        current = self.current(name)
+        position = versions.index(current) if current in versions else len(versions)
+        if position == 0:
+            raise ValueError(f"No version of model {name!r} before {current}")
+        self.promote(name, versions[position - 1])
+        return versions[position - 1]
+
+    def save(self, name, agent, profile=None, metrics=None, resume=True, promote=True):
+        """
+        Writes the agent as the next version of `name`.
+
+        Args:
+            agent (DQNAgent): The trained agent.
+            profile (dict): User profile (or cohort) the agent was trained for.
+            metrics (dict): Training metrics to record, e.g. episodes and final reward.
+            resume (bool): Also write resume.pt, so training can continue from
+                this version. Inference-only artifacts omit it.
+            promote (bool): Point CURRENT at the new version.
+
+        Returns:
+            dict: The manifest.
+        """
+        import torch
+
+        model_dir = self.model_dir(name)
+        os.makedirs(model_dir, exist_ok=True)
+        tensors = {key: value.detach().cpu().numpy() for key, value in agent.policy_net.state_dict().items()}
+
+        while True:
+            existing = [int(m.group(1)) for entry in os.listdir(model_dir) if (m := _VERSION.fullmatch(entry))]
+            version = f"v{max(existing, default=0) + 1:04d}"
+            tmp_dir = os.path.join(model_dir, f".{version}.tmp-{os.getpid()}")
+            os.makedirs(tmp_dir)
+            try:
+                # 1. Weights and (optionally) resume state
+                write_safetensors(os.path.join(tmp_dir, POLICY_FILE), tensors, {"format": FORMAT})
+                files = [POLICY_FILE]
+                if resume:
+                    torch.save({
+                        "target_state_dict": agent.target_net.state_dict(),
+                        "optimizer_state_dict": agent.optimizer.state_dict(),
+                        "epsilon": agent.epsilon,
+                        "num_timesteps": agent.num_timesteps,
+                        "num_updates": agent.num_updates,
+                    }, os.path.join(tmp_dir, RESUME_FILE))
+                    files.append(RESUME_FILE)
+
+                # 2. Manifest, written last
+                manifest = {
+                    "format": FORMAT,
+                    "name": name,
+                    "version": version,
+                    "created_at": datetime.now().isoformat(),
+                    "state_dim": agent.state_dim,
+                    "action_dim": agent.action_dim,
+                    "profile": profile,
+                    "metrics": metrics or {},
+                    "files": {
+                        file: {"sha256": _sha256(os.path.join(tmp_dir, file)),
+                               "bytes": os.path.getsize(os.path.join(tmp_dir, file)),
+                               "kind": "inference" if file == POLICY_FILE else "resume"}
+                        for file in files
+                    },
+                }
+                _fsync_write(os.path.join(tmp_dir, MANIFEST), json.dumps(manifest, indent=2).encode())
+
+                # 3. Publish the whole version with one rename
+                os.rename(tmp_dir, os.path.join(model_dir, version))
+                break
+            except OSError:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                if os.path.exists(os.path.join(model_dir, version)):
+                    continue  # another writer took this version number
+                raise
+
+        if promote:
+            self.promote(name, version)
+        return manifest
+
+def main():
+    from app.config import settings
+    parser = argparse.ArgumentParser(description="Manage versioned DQN model artifacts.")
+    parser.add_argument("--root", default=settings.MODEL_REGISTRY_DIR, help="Registry directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="List versions of a model").add_argument("name")
+    for command in ("promote", "rollback"):
+        sub = commands.add_parser(command, help=f"{command.title()} the CURRENT version")
+        sub.add_argument("name")
+        if command == "promote":
+            sub.add_argument("version")
+    imported = commands.add_parser("import", help="Import a DQNAgent .pth checkpoint as a new version")
+    imported.add_argument("name")
+    imported.add_argument("checkpoint")
+    imported.add_argument("--inference-only", action="store_true", help="Skip the resume artifact")
+    args = parser.parse_args()
+
+    registry = ArtifactRegistry(args.root)
+    if args.command == "list":
+        current = registry.current(args.name) if registry.versions(args.name) else None
+        for manifest in registry.versions(args.name):
+            marker = "*" if manifest["version"] == current else " "
+            size = sum(f["bytes"] for f in manifest["files"].values())
+            print(f"{marker} {manifest['version']}  {manifest['created_at']}  {size:>9,} B  "
+                  f"{json.dumps(manifest['metrics'])}")
+    elif args.command == "promote":
+        registry.promote(args.name, args.version)
+        print(f"{args.name}: CURRENT -> {args.version}")
+    elif args.command == "rollback":
+        print(f"{args.name}: CURRENT -> {registry.rollback(args.name)}")
+    else:
+        from app.rl_engine.agents.dqn import DQNAgent
+        agent = DQNAgent()
+        agent.load(args.checkpoint)
+        manifest = registry.save(args.name, agent, metrics={"imported_from": args.checkpoint},
+                                 resume=not args.inference_only)
+        print(f"Imported {args.checkpoint} as {args.name} {manifest['version']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+import numpy as np
+import os
+import queue
+import time
+import torch
+import torch.multiprocessing as mp
+from app.rl_engine.environment import BudgetEnvironment
+from app.rl_engine.agents.dqn import DQN, DQNAgent
+
+STATE_DIM = 10
+ACTION_DIM = 9
+
+def worker_epsilon(worker_id, num_workers, base=0.4, alpha=7.0):
+    """Ape-X style fixed exploration rate: worker 0 explores most, the last worker least."""
+    if num_workers == 1:
+        return base
+    return base ** (1 + alpha * worker_id / (num_workers - 1))
+
+def _rollout_worker(worker_id, user_profile, epsilon, shared_net, weights_lock, weights_version,
+                    transition_queue, env_steps, stop_event, chunk_size, seed):
+    """
+    Runs BudgetEnvironment with a local copy of the policy and ships transitions
+    to the learner in chunks of `chunk_size` shared-memory tensors.
+    """
+    torch.set_num_threads(1)
+    rng = np.random.default_rng(seed)
+    env = BudgetEnvironment(user_profile)
+
+    local_net = DQN(STATE_DIM, ACTION_DIM)
+    with weights_lock:
+        local_net.load_state_dict(shared_net.state_dict())
+        local_version = weights_version.value
+
+    def new_chunk():
+        return (
+            torch.empty((chunk_size, STATE_DIM)),
+            torch.empty(chunk_size, dtype=torch.int64),
+            torch.empty(chunk_size),
+            torch.empty((chunk_size, STATE_DIM)),
+            torch.empty(chunk_size),
+        )
+
+    states, actions, rewards, next_states, dones = new_chunk()
+    n = 0
+    state, _ = env.reset(seed=seed)
+
+    while not stop_event.is_set():
+        # Pick up the latest broadcast weights at episode boundaries
+        if env.current_step == 0 and weights_version.value != local_version:
+            with weights_lock:
+                local_net.load_state_dict(shared_net.state_dict())
+                local_version = weights_version.value
+
+        if rng.random() < epsilon:
+            action = int(rng.integers(ACTION_DIM))
+        else:
+            with torch.no_grad():
+                action = local_net(torch.from_numpy(state).unsqueeze(0)).argmax().item()
+
+        next_state, reward, terminated, truncated, _ = env.step(action)
+        done = terminated or truncated
+
+        states[n] = torch.from_numpy(state)
+        actions[n] = action
+        rewards[n] = float(reward)
+        next_states[n] = torch.from_numpy(next_state)
+        dones[n] = float(done)
+        n += 1
+
+        state = env.reset()[0] if done else next_state
+
+        if n == chunk_size:
+            # Chunks are moved to shared memory by the queue, so never reuse them
+            chunk = (states, actions, rewards, next_states, dones)
+            while not stop_event.is_set():
+                try:
+                    transition_queue.put(chunk, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            with env_steps.get_lock():
+                env_steps.value += chunk_size
+            states, actions, rewards, next_states, dones = new_chunk()
+            n = 0
+
+    # Don't block process exit on chunks the learner will never read
+    transition_queue.cancel_join_thread()
+
+def train_async(user_profile, num_workers=2, learner_steps=5000, broadcast_every=50,
+                target_update_every=100, chunk_size=64, queue_size=64,
+                save_path="models/dqn_async.pth", prioritized=False, log_every=500, seed=0):
+    """
+    Trains the DQN agent with an actor/learner split.
+
+    `num_workers` rollout processes step their own BudgetEnvironment with a
+    periodically synced copy of `policy_net`, while this process acts as the
+    learner: it drains transitions from a shared-memory queue into the replay
+    buffer and runs batched updates. Weights are broadcast every
+    `broadcast_every` learner steps.
+
+    Args:
+        user_profile (dict): User profile data including income and risk preference.
+        num_workers (int): Number of rollout worker processes.
+        learner_steps (int): Number of gradient steps to run.
+        broadcast_every (int): Learner steps between weight broadcasts to the workers.
+        target_update_every (int): Learner steps between target network updates.
+        chunk_size (int): Transitions per queue message.
+        queue_size (int): Maximum queued chunks before workers block.
+        save_path (str): Path to save the trained model weights.
+        prioritized (bool): Use prioritized experience replay.
+        log_every (int): Learner steps between progress lines.
+        seed (int): Base seed for the workers.
+
+    Returns:
+        tuple: (agent, stats) where stats reports env steps/sec and gradient steps/sec.
+
+    Raises:
+        RuntimeError: If every rollout worker exits before the learner finishes.
+    """
+    agent = DQNAgent(STATE_DIM, ACTION_DIM, prioritized=prioritized)
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+
+    ctx = mp.get_context("spawn")
+    shared_net = DQN(STATE_DIM, ACTION_DIM)
+    shared_net.load_state_dict(agent.policy_net.state_dict())
+    shared_net.share_memory()
+
+    weights_lock = ctx.Lock()
+    weights_version = ctx.Value("i", 0)
+    env_steps = ctx.Value("q", 0)
+    stop_event = ctx.Event()
+    transition_queue = ctx.Queue(maxsize=queue_size)
+
+    workers = [
+        ctx.Process(
+            target=_rollout_worker,
+            args=(i, user_profile, worker_epsilon(i, num_workers), shared_net, weights_lock,
+                  weights_version, transition_queue, env_steps, stop_event, chunk_size, seed + i),
+            daemon=True,
+        )
+        for i in range(num_workers)
+    ]
+
+    print(f"Starting async training: {num_workers} rollout workers, {learner_steps} learner steps...")
+    for w in workers:
+        w.start()
+
+    start = time.perf_counter()
+    grad_steps = 0
+    received = 0
+    try:
+        while grad_steps < learner_steps:
+            # Without workers the buffer never changes again; fail instead of spinning on it
+            if not any(w.is_alive() for w in workers):
+                raise RuntimeError(
+                    f"All rollout workers exited (exit codes {[w.exitcode for w in workers]}) "
+                    f"after {grad_steps}/{learner_steps} learner steps"
+                )
+
+            # Block only while the buffer can't fill a batch yet
+            block = len(agent.memory) < agent.batch_size
+            try:
+                chunk = transition_queue.get(timeout=1.0) if block else transition_queue.get_nowait()
+                agent.remember_batch(*(t.numpy() for t in chunk))
+                received += len(chunk[1])
+                del chunk
+            except queue.Empty:
+                pass
+
+            if len(agent.memory) < agent.batch_size:
+                continue
+
+            agent.replay()
+            grad_steps += 1
+
+            if grad_steps % target_update_every == 0:
+                agent.update_target_network()
+
+            if grad_steps % broadcast_every == 0:
+                with weights_lock:
+                    shared_net.load_state_dict(agent.policy_net.state_dict())
+                    weights_version.value += 1
+
+            if grad_steps % log_every == 0:
+                elapsed = time.perf_counter() - start
+                print(f"Learner step {grad_steps}/{learner_steps} | "
+                      f"env steps/s: {env_steps.value / elapsed:.0f} | "
+                      f"grad steps/s: {grad_steps / elapsed:.0f}")
+    finally:
+        stop_event.set()
+        elapsed = time.perf_counter() - start
+
+        # Drain so no worker stays blocked on a full queue. Chunks from workers
+        # that already exited can no longer be rebuilt (OSError, incl. ConnectionError,
+        # or EOFError), which is fine to ignore.
+        while any(w.is_alive() for w in workers):
+            try:
+                transition_queue.get(timeout=0.1)
+            except (queue.Empty, OSError, EOFError):
+                pass
+        for w in workers:
+            w.join()
+
+    stats = {
+        "elapsed_s": elapsed,
+        "env_steps": env_steps.value,
+        "transitions_consumed": received,
+        "grad_steps": grad_steps,
+        "broadcasts": weights_version.value,
+        "env_steps_per_sec": env_steps.value / elapsed if elapsed else 0.0,
+        "grad_steps_per_sec": grad_steps / elapsed if elapsed else 0.0,
+    }
+
+    agent.save(save_path)
+    print(f"Async training complete in {elapsed:.1f}s | "
+          f"env steps/s: {stats['env_steps_per_sec']:.0f} | grad steps/s: {stats['grad_steps_per_sec']:.0f}")
+    print(f"Model saved to {save_path}")
+
+    return agent, stats
+
+if __name__ == "__main__":
+    dummy_profile = {
+        "monthlyIncome": 50000,
+        "riskPreference": "moderate"
+    }
+
+    train_async(dummy_profile, num_workers=2, learner_steps=2000, save_path="models/dqn_async.pth")
@@ -1,6 +1,7 @@
 import asyncio
 import os
 import sys
+import pandas as pd
 from datetime import datetime
 
 # Add backend directory to path so we can import app modules
@@ -39,21 +40,16 @@ async def bulk_upload():
 
     # 2. Upload Transactions
     print("Uploading Transactions...")
+    
+    # Convert string dates to datetimes for Firestore in one vectorized pass
+    # createdAt is stamped by the server when each batch commits
+    df["date"] = pd.to_datetime(df["date"], format="%Y-%m-%d")
+    df["source"] = "synthetic"
     transactions = df.to_dict('records')
     
-    count = 0
-    for txn in transactions:
-        # Convert string date to datetime object for Firestore
-        date_str = txn["date"]
-        txn["date"] = datetime.strptime(date_str, "%Y-%m-%d")
-        txn["createdAt"] = datetime.now()
-        txn["source"] = "synthetic"
-        
-        # Use the service to add (it generates a new ID, but links to userId correctly)
-        await db.add_transaction(txn)
-        count += 1
-        if count % 50 == 0:
-            print(f"  Uploaded {count}/{len(transactions)} transactions...")
+    # Batched writes, reusing the generated transactionIds as document IDs
+    count = await db.add_transactions_bulk(transactions)
+    print(f"  Uploaded {count}/{len(transactions)} transactions.")
 
     print("Bulk upload complete! 🚀")
 
@@ -1,18 +1,144 @@
 import pandas as pd
 import numpy as np
-import random
-import uuid
 import os
+import shutil
+import tempfile
 from datetime import datetime, timedelta
 
 CATEGORIES = ['food', 'rent', 'transport', 'shopping', 'entertainment', 'other']
 VARIABLE_CATEGORIES = ['food', 'transport', 'shopping', 'entertainment', 'other']
 
+INCOME_LEVELS = np.array([30000, 50000, 80000, 120000, 200000])
+
+# Base weights: Food, Trans, Shop, Ent, Other
+BASE_WEIGHTS = np.array([0.35, 0.15, 0.20, 0.20, 0.10])
+# Lavish people (personality > 0.6) spend more on Shopping/Ent
+LAVISH_WEIGHTS = BASE_WEIGHTS + np.array([0.0, 0.0, 0.15, 0.15, 0.0])
+
+# Row codes: 0 is rent, 1.. are VARIABLE_CATEGORIES
+ROW_CATEGORIES = ['rent'] + VARIABLE_CATEGORIES
+ROW_DESCRIPTIONS = ['Monthly Rent'] + [f"{cat.capitalize()} expense" for cat in VARIABLE_CATEGORIES]
+
+# ASCII codes of the two hex digits of every byte value
+_HEX_TABLE = np.frombuffer("".join(f"{i:02x}" for i in range(256)).encode(), dtype=np.uint8).reshape(256, 2)
+
+def _hex_ids(rng, count, num_bytes):
+    """`count` random lowercase hex strings of 2 * num_bytes characters."""
+    raw = rng.integers(0, 256, size=(count, num_bytes), dtype=np.uint8)
+    chars = _HEX_TABLE[raw].reshape(count, 2 * num_bytes)
+    return chars.view(f"S{2 * num_bytes}").ravel().astype(f"U{2 * num_bytes}")
+
+def _date_table(start_date, months_per_user):
+    """"YYYY-MM-DD" strings indexed by [month, day] (day 0 unused)."""
+    months = [(start_date + timedelta(days=30 * m)).strftime("%Y-%m") for m in range(months_per_user)]
+    return np.array([[f"{month}-{day:02d}" for day in range(29)] for month in months])
+
+def _generate_block(rng, num_users, months_per_user, start_date):
+    """
+    Draws every transaction for `num_users` users at once.
+
+    Samples the same distributions as the original per-row generator: a rent
+    row on the 1st of each month, then 20-50 log-normal variable expenses
+    whose categories follow the user's personality weights.
+
+    Returns:
+        tuple: (DataFrame, users_list)
+    """
+    # 1. User profiles
+    monthly_income = rng.choice(INCOME_LEVELS, size=num_users)
+    spending_personality = rng.random(num_users)
+    user_ids = np.char.add("user_", _hex_ids(rng, num_users, 4))
+    
+    risk = np.full(num_users, "moderate", dtype="U12")
+    risk[spending_personality > 0.7] = "aggressive"
+    risk[spending_personality < 0.3] = "conservative"
+    users_data = [
+        {"uid": uid, "monthlyIncome": int(income), "riskPreference": r, "spendingPersonality": float(p)}
+        for uid, income, r, p in zip(user_ids.tolist(), monthly_income, risk.tolist(), spending_personality)
+    ]
+    
+    # 2. One row per user-month: rent and the variable spending budget
+    user_month_user = np.repeat(np.arange(num_users), months_per_user)
+    user_month_month = np.tile(np.arange(months_per_user), num_users)
+    income = monthly_income[user_month_user]
+    personality = spending_personality[user_month_user]
+    
+    rent_amt = income * (0.25 + rng.uniform(-0.05, 0.10, size=len(income)))
+    target_savings_rate = 0.40 * (1.0 - personality)
+    target_spending = (income - rent_amt) * (1.0 - target_savings_rate)
+    num_txns = rng.integers(20, 51, size=len(income))
+    
+    # 3. Variable expenses for every user-month at once
+    txn_user_month = np.repeat(np.arange(len(income)), num_txns)
+    cdf = np.cumsum(np.stack([BASE_WEIGHTS / BASE_WEIGHTS.sum(), LAVISH_WEIGHTS / LAVISH_WEIGHTS.sum()]), axis=1)
+    txn_cdf = cdf[(personality > 0.6).astype(np.intp)[txn_user_month]]
+    txn_category = (rng.random(len(txn_user_month))[:, None] >= txn_cdf[:, :-1]).sum(axis=1)
+    
+    avg_amt = target_spending / num_txns
+    txn_amount = rng.lognormal(mean=np.log(avg_amt)[txn_user_month], sigma=0.6)
+    txn_day = rng.integers(1, 29, size=len(txn_user_month))
+    
+    # 4. Interleave: each user-month is its rent row followed by its expenses
+    total_rows = len(income) + len(txn_user_month)
+    rent_pos = np.concatenate(([0], np.cumsum(num_txns + 1)[:-1]))
+    is_txn = np.ones(total_rows, dtype=bool)
+    is_txn[rent_pos] = False
+    
+    row_user_month = np.empty(total_rows, dtype=np.intp)
+    row_user_month[rent_pos] = np.arange(len(income))
+    row_user_month[is_txn] = txn_user_month
+    
+    amount = np.empty(total_rows)
+    amount[rent_pos] = rent_amt
+    amount[is_txn] = txn_amount
+    
+    code = np.zeros(total_rows, dtype=np.int8)
+    code[is_txn] = txn_category + 1
+    
+    day = np.ones(total_rows, dtype=np.intp)
+    day[is_txn] = txn_day
+    
+    dates = _date_table(start_date, months_per_user)
+    df = pd.DataFrame({
+        "transactionId": _hex_ids(rng, total_rows, 16),
+        "userId": user_ids[user_month_user[row_user_month]],
+        "date": dates[user_month_month[row_user_month], day],
+        "amount": np.round(amount, 2),
+        "category": pd.Categorical.from_codes(code, categories=ROW_CATEGORIES),
+        "description": pd.Categorical.from_codes(code, categories=ROW_DESCRIPTIONS),
+    })
+    return df, users_data
+
+def iter_synthetic_data(num_users=10, months_per_user=12, seed=None, block_users=10000, end_date=None):
+    """
+    Yields synthetic data in blocks of `block_users` users.
+
+    Args:
+        num_users (int): Number of unique users to simulate.
+        months_per_user (int): Duration of history to generate per user.
+        seed (int): Seed for numpy.random.Generator; the same seed, block_users
+            and end_date reproduce the same rows.
+        block_users (int): Users generated per block, bounding peak memory.
+        end_date (datetime): Last day of the generated history (default: now).
+    
+    Yields:
+        tuple: (DataFrame, users_list) for each block.
+    """
+    rng = np.random.default_rng(seed)
+    end_date = end_date or datetime.now()
+    start_date = end_date - timedelta(days=30 * months_per_user)
+    
+    for first in range(0, num_users, block_users):
+        yield _generate_block(rng, min(block_users, num_users - first), months_per_user, start_date)
+
 def generate_synthetic_data(
     num_users=10, 
     months_per_user=12, 
     output_path="data/synthetic_transactions.csv",
-    return_users=False
+    return_users=False,
+    seed=None,
+    block_users=10000,
+    end_date=None
 ):
     """
     Generates synthetic transaction data for pre-training the RL model.
@@ -20,115 +146,120 @@ def generate_synthetic_data(
     Args:
         num_users (int): Number of unique users to simulate.
         months_per_user (int): Duration of history to generate per user.
-        output_path (str): File path to save the CSV.
+        output_path (str): File path to save the CSV, or None to skip writing.
         return_users (bool): If True, returns a tuple (DataFrame, users_list).
+        seed (int): Seed for reproducible output.
+        block_users (int): Users generated per vectorized block.
+        end_date (datetime): Last day of the generated history (default: now).
     """
     print(f"Generating synthetic data for {num_users} users over {months_per_user} months...")
     
-    all_transactions = []
+    frames = []
     users_data = []
-    
-    for i in range(num_users):
-        user_id = f"user_{uuid.uuid4().hex[:8]}"
-        
-        # Randomize User Profile
-        # Income levels: Low, Medium, High, Very High
-        monthly_income = random.choice([30000, 50000, 80000, 120000, 200000])
-        
-        # Spending Personality (0.0 = Frugal, 1.0 = Lavish)
-        spending_personality = random.random()
-        
-        if return_users:
-            risk = "moderate"
-            if spending_personality > 0.7: risk = "aggressive"
-            elif spending_personality < 0.3: risk = "conservative"
-            
-            users_data.append({
-                "uid": user_id,
-                "monthlyIncome": monthly_income,
-                "riskPreference": risk,
-                "spendingPersonality": spending_personality
-            })
-
-        # Date range: ending today, going back months_per_user
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=30 * months_per_user)
-        
-        for m in range(months_per_user):
-            # Approximate month date
-            curr_month_date = start_date + timedelta(days=30 * m)
-            month_str = curr_month_date.strftime("%Y-%m")
-            
-            # 1. Fixed Expense: Rent (20-40% of income)
-            # Frugal people spend less on rent relative to income usually, or fixed.
-            # Let's just randomize slightly.
-            rent_ratio = 0.25 + (random.uniform(-0.05, 0.10))
-            rent_amt = monthly_income * rent_ratio
-            
-            all_transactions.append({
-                "transactionId": uuid.uuid4().hex,
-                "userId": user_id,
-                "date": f"{month_str}-01",
-                "amount": round(rent_amt, 2),
-                "category": "rent",
-                "description": "Monthly Rent"
-            })
-            
-            # 2. Variable Expenses
-            # Calculate disposable income
-            disposable = monthly_income - rent_amt
-            
-            # Target Savings Rate: Frugal (0.0) -> 40%, Lavish (1.0) -> 0%
-            target_savings_rate = 0.40 * (1.0 - spending_personality)
-            target_spending = disposable * (1.0 - target_savings_rate)
-            
-            # Distribute spending across variable categories
-            # Base weights: Food, Trans, Shop, Ent, Other
-            weights = np.array([0.35, 0.15, 0.20, 0.20, 0.10])
-            
-            # Adjust weights based on personality
-            # Lavish people spend more on Shopping/Ent
-            if spending_personality > 0.6:
-                weights[2] += 0.15 # Shopping
-                weights[3] += 0.15 # Ent
-            
-            # Normalize weights
-            weights = weights / weights.sum()
-            
-            # Generate random number of transactions
-            num_txns = random.randint(20, 50)
-            
-            for _ in range(num_txns):
-                cat = np.random.choice(VARIABLE_CATEGORIES, p=weights)
-                
-                # Amount logic: Log-normal distribution to simulate real spending
-                # Mean amount depends on category weight * total spending / num_txns
-                avg_amt = (target_spending / num_txns)
-                amt = np.random.lognormal(mean=np.log(avg_amt), sigma=0.6)
-                
-                day = random.randint(1, 28)
-                
-                all_transactions.append({
-                    "transactionId": uuid.uuid4().hex,
-                    "userId": user_id,
-                    "date": f"{month_str}-{day:02d}",
-                    "amount": round(amt, 2),
-                    "category": cat,
-                    "description": f"{cat.capitalize()} expense"
-                })
-                
-    # Convert to DataFrame
-    df = pd.DataFrame(all_transactions)
+    for df, users in iter_synthetic_data(num_users, months_per_user, seed, block_users, end_date):
+        frames.append(df)
+        users_data.extend(users)
+    df = pd.concat(frames, ignore_index=True)
     
     # Save
-    if os.path.dirname(output_path):
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        
-    df.to_csv(output_path, index=False)
-    print(f"Generated {len(df)} transactions. Saved to {output_path}")
+    if output_path:
+        if os.path.dirname(output_path):
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        df.to_csv(output_path, index=False)
+        print(f"Generated {len(df)} transactions. Saved to {output_path}")
+    else:
+        print(f"Generated {len(df)} transactions.")
     if return_users:
         return df, users_data
     return df
 
+def _transactions_table(df):
+    """Arrow table with compact training types: date32 dates, float32 amounts, dictionary categories."""
+    import pyarrow as pa
+    
+    return pa.table({
+        "transactionId": pa.array(df["transactionId"], type=pa.string()),
+        "userId": pa.array(df["userId"], type=pa.string()),
+        "date": pa.array(df["date"], type=pa.string()).cast(pa.date32()),
+        "amount": pa.array(df["amount"].to_numpy(np.float32)),
+        "category": pa.DictionaryArray.from_arrays(df["category"].cat.codes.to_numpy(), ROW_CATEGORIES),
+        "description": pa.DictionaryArray.from_arrays(df["description"].cat.codes.to_numpy(), ROW_DESCRIPTIONS),
+    })
+
+def write_synthetic_parquet(
+    output_dir="data/synthetic_transactions",
+    num_users=10,
+    months_per_user=12,
+    seed=None,
+    block_users=500,
+    end_date=None
+):
+    """
+    Streams synthetic data to a directory of Parquet files, one part per block.
+
+    Only one block of `block_users` users is in memory at a time, so peak
+    memory stays flat however many users are generated. Transactions go to
+    `transactions/part-NNNNN.parquet` and user profiles to
+    `users/part-NNNNN.parquet`; read them back with load_synthetic_parquet.
+    
+    Args:
+        output_dir (str): Directory to write the dataset to.
+        num_users (int): Number of unique users to simulate.
+        months_per_user (int): Duration of history to generate per user.
+        seed (int): Seed for reproducible output.
+        block_users (int): Users per Parquet part.
+        end_date (datetime): Last day of the generated history (default: now).
+    
+    Returns:
+        int: Number of transactions written.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    print(f"Streaming synthetic data for {num_users} users over {months_per_user} months to {output_dir}...")
+    # Parts go to a staging directory and replace the old ones only once complete,
+    # so a smaller rerun can't leave stale higher-numbered parts behind
+    os.makedirs(output_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".staging-", dir=output_dir)
+    try:
+        for name in ("transactions", "users"):
+            os.makedirs(os.path.join(staging, name))
+        
+        rows = 0
+        blocks = iter_synthetic_data(num_users, months_per_user, seed, block_users, end_date)
+        for part, (df, users) in enumerate(blocks):
+            filename = f"part-{part:05d}.parquet"
+            pq.write_table(_transactions_table(df), os.path.join(staging, "transactions", filename))
+            pq.write_table(pa.Table.from_pylist(users), os.path.join(staging, "users", filename))
+            rows += len(df)
+        
+        for name in ("transactions", "users"):
+            target = os.path.join(output_dir, name)
+            if os.path.exists(target):
+                shutil.rmtree(target)
+            os.replace(os.path.join(staging, name), target)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    
+    print(f"Generated {rows} transactions. Saved to {output_dir}")
+    return rows
+
+def load_synthetic_parquet(output_dir="data/synthetic_transactions", return_users=False):
+    """
+    Loads a dataset written by write_synthetic_parquet.
+    
+    Args:
+        output_dir (str): Directory the dataset was written to.
+        return_users (bool): If True, returns a tuple (DataFrame, users_list).
+    """
+    import pyarrow.parquet as pq
+    
+    table = pq.read_table(os.path.join(output_dir, "transactions"))
+    transactions = table.to_pandas(date_as_object=False)
+    if return_users:
+        users = pq.read_table(os.path.join(output_dir, "users")).to_pylist()
+        return transactions, users
+    return transactions
+
 if __name__ == "__main__":
     generate_synthetic_data()
\ No newline at end of file
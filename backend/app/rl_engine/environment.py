@@ -1,6 +1,10 @@
 import gymnasium as gym
 import numpy as np
 from gymnasium import spaces
+from gymnasium.vector import AutoresetMode
+from gymnasium.vector.utils import batch_space
+
+from app.rl_engine.state import RISK_MAP, DEFAULT_ALLOCATION, allocation_from_spending, apply_actions
 
 class BudgetEnvironment(gym.Env):
     """
@@ -28,23 +32,54 @@ class BudgetEnvironment(gym.Env):
         self.user_profile = user_profile
         self.income = user_profile.get("monthlyIncome", 50000)
         
-        # Map risk preference to a float value
-        risk_map = {"conservative": 0.0, "moderate": 0.5, "aggressive": 1.0}
-        self.risk_val = risk_map.get(user_profile.get("riskPreference", "moderate"), 0.5)
+        self.risk_val = RISK_MAP.get(user_profile.get("riskPreference", "moderate"), 0.5)
         
         self.max_steps = 12 # Simulate 12 months/periods
         self.current_step = 0
         
+        # Real starting points: one allocation per historical month, or None
+        self.historical_allocations = self._historical_allocations(historical_data)
+        
         # Initial allocation placeholders
         self.current_allocation = np.zeros(7) 
 
+    def _historical_allocations(self, historical_data):
+        """
+        Accepts a (T, 7) array of monthly allocations (e.g. from
+        offline.user_trajectories), a list of monthly {category: amount}
+        spending dicts, or a DataFrame with one month per row and a column
+        per category, and returns a (T, 7) float32 array or None.
+
+        Raises:
+            TypeError: If `historical_data` is none of the above.
+        """
+        if historical_data is None:
+            return None
+        if hasattr(historical_data, "columns") and hasattr(historical_data, "to_dict"):
+            historical_data = historical_data.to_dict("records")
+        if not isinstance(historical_data, (list, tuple, np.ndarray)):
+            raise TypeError(
+                "historical_data must be a (T, 7) allocation array, a list of monthly "
+                f"{{category: amount}} dicts or a DataFrame of them, not {type(historical_data).__name__}"
+            )
+        if len(historical_data) == 0:
+            return None
+        if isinstance(historical_data[0], dict):
+            return np.stack([allocation_from_spending(self.income, month) for month in historical_data])
+        return np.asarray(historical_data, dtype=np.float32).reshape(-1, 7)
+
     def reset(self, seed=None, options=None):
         super().reset(seed=seed)
         self.current_step = 0
         
-        # Initialize with a standard split if no history (Savings, Rent, Food, Trans, Shop, Ent, Other)
-        # Example: 20% Savings, 30% Rent, 15% Food, 10% Trans, 10% Shop, 10% Ent, 5% Other
-        self.current_allocation = np.array([0.20, 0.30, 0.15, 0.10, 0.10, 0.10, 0.05], dtype=np.float32)
+        if self.historical_allocations is not None:
+            # Start from one of the user's real months
+            month = self.np_random.integers(len(self.historical_allocations))
+            self.current_allocation = self.historical_allocations[month].copy()
+        else:
+            # Initialize with a standard split if no history (Savings, Rent, Food, Trans, Shop, Ent, Other)
+            # Example: 20% Savings, 30% Rent, 15% Food, 10% Trans, 10% Shop, 10% Ent, 5% Other
+            self.current_allocation = DEFAULT_ALLOCATION.copy()
         
         return self._get_obs(), {}
 
@@ -118,4 +153,99 @@ class BudgetEnvironment(gym.Env):
             for i in range(2, 7):
                 amount = alloc[i] * 0.02
                 alloc[i] -= amount
-                alloc[0] += amount
\ No newline at end of file
+                alloc[0] += amount
+
+class VectorBudgetEnvironment(gym.vector.VectorEnv):
+    """
+    Vectorized BudgetEnvironment that steps N users in a single NumPy call.
+
+    Follows the gymnasium vector API with same-step autoreset: when a row
+    terminates, its final observation is returned in infos["final_obs"]
+    (masked by infos["_final_obs"]) and the row is reset in place.
+    Each row can have its own income and risk preference.
+    """
+    metadata = {"render_modes": [], "autoreset_mode": AutoresetMode.SAME_STEP}
+
+    def __init__(self, user_profiles, num_envs=None):
+        """
+        Args:
+            user_profiles (list | dict): One profile per environment, or a single
+                profile shared by all environments.
+            num_envs (int): Number of environments when a single profile is given.
+        """
+        if isinstance(user_profiles, dict):
+            user_profiles = [user_profiles] * (num_envs or 1)
+        if not user_profiles:
+            raise ValueError("VectorBudgetEnvironment needs at least one user profile")
+
+        self.num_envs = len(user_profiles)
+        self.single_observation_space = spaces.Box(low=0, high=1, shape=(10,), dtype=np.float32)
+        self.single_action_space = spaces.Discrete(9)
+        self.observation_space = batch_space(self.single_observation_space, self.num_envs)
+        self.action_space = batch_space(self.single_action_space, self.num_envs)
+
+        self.user_profiles = user_profiles
+        self.incomes = np.array(
+            [p.get("monthlyIncome", 50000) for p in user_profiles], dtype=np.float32
+        )
+        self.risk_vals = np.array(
+            [RISK_MAP.get(p.get("riskPreference", "moderate"), 0.5) for p in user_profiles],
+            dtype=np.float32
+        )
+
+        self.max_steps = 12
+        self.current_step = np.zeros(self.num_envs, dtype=np.int64)
+        self.current_allocation = np.zeros((self.num_envs, 7), dtype=np.float32)
+
+    def reset(self, *, seed=None, options=None):
+        super().reset(seed=seed)
+
+        # Optional partial reset, following gymnasium's "reset_mask" convention
+        mask = (options or {}).get("reset_mask")
+        if mask is None:
+            mask = np.ones(self.num_envs, dtype=bool)
+
+        self.current_step[mask] = 0
+        self.current_allocation[mask] = DEFAULT_ALLOCATION
+
+        return self._get_obs(), {}
+
+    def _get_obs(self):
+        obs = np.empty((self.num_envs, 10), dtype=np.float32)
+        obs[:, 0] = self.current_allocation[:, 0]   # Savings Rate
+        obs[:, 1] = 1.0                              # Normalized Income
+        obs[:, 2:8] = self.current_allocation[:, 1:] # Rent + variable categories
+        obs[:, 8] = self.risk_vals                   # Risk Preference
+        obs[:, 9] = self.current_step / self.max_steps
+        return obs
+
+    def step(self, actions):
+        alloc = self.current_allocation
+        prev_savings = alloc[:, 0].copy()
+
+        apply_actions(alloc, actions)
+
+        # Re-normalize each row to sum to 1.0
+        alloc /= alloc.sum(axis=1, keepdims=True)
+
+        new_savings = alloc[:, 0]
+
+        # Same reward terms as BudgetEnvironment.step
+        rewards = (new_savings - prev_savings) * 100
+        rewards -= np.where(new_savings < 0.05, np.float32(50), np.float32(0))
+        rewards -= np.where(alloc[:, 2] < 0.05, np.float32(20), np.float32(0))
+
+        self.current_step += 1
+        terminations = self.current_step >= self.max_steps
+        truncations = np.zeros(self.num_envs, dtype=bool)
+
+        obs = self._get_obs()
+        infos = {}
+        if terminations.any():
+            infos["final_obs"] = obs.copy()
+            infos["_final_obs"] = terminations.copy()
+            self.current_step[terminations] = 0
+            self.current_allocation[terminations] = DEFAULT_ALLOCATION
+            obs[terminations] = self._get_obs()[terminations]
+
+        return obs, rewards.astype(np.float64), terminations, truncations, infos
@@ -0,0 +1,64 @@
+import argparse
+import os
+import numpy as np
+import torch
+import torch.nn as nn
+from app.rl_engine.agents.dqn import DQN
+
+def _linear_layers(policy_net):
+    return [m for m in policy_net.modules() if isinstance(m, nn.Linear)]
+
+def numpy_weights(policy_net):
+    """The policy network's Linear layers as NumpyPolicy (weights, biases); weights are transposed."""
+    layers = _linear_layers(policy_net)
+    weights = [layer.weight.detach().cpu().numpy().T.astype(np.float32) for layer in layers]
+    biases = [layer.bias.detach().cpu().numpy().astype(np.float32) for layer in layers]
+    return weights, biases
+
+def export_npz(policy_net, path):
+    """
+    Writes the policy network's Linear layers as a compact `.npz` that
+    NumpyPolicy can run without torch. Weights are stored transposed.
+    """
+    weights, biases = numpy_weights(policy_net)
+    arrays = {"num_layers": np.array(len(weights))}
+    for i, (weight, bias) in enumerate(zip(weights, biases)):
+        arrays[f"layer_{i}_weight"] = weight
+        arrays[f"layer_{i}_bias"] = bias
+
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    np.savez(path, **arrays)
+    return path
+
+def export_torchscript(policy_net, path):
+    """Writes the policy network as a TorchScript module."""
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    scripted = torch.jit.script(policy_net.cpu().eval())
+    scripted.save(path)
+    return path
+
+def load_policy_net(checkpoint_path, state_dim=10, action_dim=9):
+    """Loads just the policy weights from a DQNAgent checkpoint."""
+    checkpoint = torch.load(checkpoint_path, map_location="cpu", weights_only=True)
+    policy_net = DQN(state_dim, action_dim)
+    policy_net.load_state_dict(checkpoint["model_state_dict"])
+    return policy_net.eval()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a DQN checkpoint for torch-free or TorchScript inference.")
+    parser.add_argument("checkpoint", help="Path to a DQNAgent .pth checkpoint")
+    parser.add_argument("--npz", help="Output .npz path (defaults to the checkpoint path with .npz)")
+    parser.add_argument("--torchscript", help="Optional TorchScript output path")
+    args = parser.parse_args()
+
+    policy_net = load_policy_net(args.checkpoint)
+
+    npz_path = args.npz or os.path.splitext(args.checkpoint)[0] + ".npz"
+    export_npz(policy_net, npz_path)
+    print(f"Exported NumPy weights to {npz_path}")
+
+    if args.torchscript:
+        export_torchscript(policy_net, args.torchscript)
+        print(f"Exported TorchScript module to {args.torchscript}")
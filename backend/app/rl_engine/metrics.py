@@ -0,0 +1,170 @@
+"""
+Training instrumentation: per-phase timers, throughput, loss/Q statistics
+and an opt-in profiler.
+
+`TrainingMetrics` accumulates over a window and `log()` turns the window
+into one record, appended as a JSON line and/or written to TensorBoard.
+Timings are host wall-clock; on CUDA, asynchronous kernels are attributed
+to whichever phase next synchronizes.
+"""
+import json
+import os
+import time
+from contextlib import contextmanager, nullcontext
+
+def timed(metrics, name):
+    """`metrics.phase(name)`, or a no-op context when metrics is None."""
+    return metrics.phase(name) if metrics else nullcontext()
+
+class TrainingMetrics:
+    def __init__(self, log_path=None, tensorboard_dir=None):
+        """
+        Args:
+            log_path (str): Optional JSON-lines file, one record per log() call.
+            tensorboard_dir (str): Optional TensorBoard log directory (needs the
+                `tensorboard` package).
+        """
+        self.log_path = log_path
+        self._log_file = None
+        if log_path:
+            if os.path.dirname(log_path):
+                os.makedirs(os.path.dirname(log_path), exist_ok=True)
+            self._log_file = open(log_path, "a")
+
+        self._writer = None
+        if tensorboard_dir:
+            from torch.utils.tensorboard import SummaryWriter
+            self._writer = SummaryWriter(tensorboard_dir)
+
+        self.records = []
+        self._reset_window()
+
+    def _reset_window(self):
+        self._window_start = time.perf_counter()
+        self._phases = {}   # name -> total seconds
+        self._counters = {} # name -> count
+        self._stats = {}    # name -> [count, sum, sum of squares, min, max]
+
+    @contextmanager
+    def phase(self, name):
+        """Adds the wall-clock time of the `with` block to phase `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._phases[name] = self._phases.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name, n=1):
+        """Increments counter `name`; reported as `<name>_per_sec`."""
+        self._counters[name] = self._counters.get(name, 0) + n
+
+    def observe(self, name, value):
+        """Adds a sample to statistic `name`; reported as mean/std/min/max."""
+        value = float(value)
+        stat = self._stats.get(name)
+        if stat is None:
+            self._stats[name] = [1, value, value * value, value, value]
+            return
+        stat[0] += 1
+        stat[1] += value
+        stat[2] += value * value
+        stat[3] = min(stat[3], value)
+        stat[4] = max(stat[4], value)
+
+    def log(self, step, **values):
+        """
+        Closes the current window and emits one record.
+
+        Args:
+            step (int): x-axis value, e.g. the episode number.
+            **values: Extra scalars to include, e.g. buffer_fill or epsilon.
+
+        Returns:
+            dict: The record.
+        """
+        elapsed = time.perf_counter() - self._window_start
+        record = {"step": step, "time": time.time(), "window_s": round(elapsed, 6)}
+
+        for name, seconds in self._phases.items():
+            record[f"time/{name}_s"] = round(seconds, 6)
+            record[f"time/{name}_share"] = round(seconds / elapsed, 4) if elapsed else 0.0
+        for name, n in self._counters.items():
+            record[name] = n
+            record[f"{name}_per_sec"] = n / elapsed if elapsed else 0.0
+        for name, (n, total, total_sq, low, high) in self._stats.items():
+            mean = total / n
+            record[f"{name}/mean"] = mean
+            record[f"{name}/std"] = max(0.0, total_sq / n - mean * mean) ** 0.5
+            record[f"{name}/min"] = low
+            record[f"{name}/max"] = high
+        record.update(values)
+
+        if self._log_file:
+            self._log_file.write(json.dumps(record) + "\n")
+            self._log_file.flush()
+        if self._writer:
+            for key, value in record.items():
+                if key not in ("step", "time") and isinstance(value, (int, float)):
+                    self._writer.add_scalar(key, value, step)
+
+        self.records.append(record)
+        self._reset_window()
+        return record
+
+    def close(self):
+        if self._log_file:
+            self._log_file.close()
+            self._log_file = None
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+
+class StepProfiler:
+    """
+    Opt-in profiler that captures the first `steps` calls to step().
+
+    kind="torch" records a torch.profiler trace (open the .json in
+    chrome://tracing or Perfetto); kind="cprofile" writes a cProfile .prof
+    file (e.g. for snakeviz or pstats).
+    """
+    def __init__(self, output_path, steps=200, kind="torch"):
+        if kind not in ("torch", "cprofile"):
+            raise ValueError(f"Unknown profiler kind: {kind}")
+        self.output_path = output_path
+        self.steps = steps
+        self.kind = kind
+        self._seen = 0
+        self._profiler = None
+
+    def step(self):
+        """Call once per training step; starts on the first call, stops after `steps`."""
+        if self._seen == 0:
+            self._start()
+        self._seen += 1
+        if self._seen == self.steps:
+            self.stop()
+
+    def _start(self):
+        if self.kind == "torch":
+            from torch.profiler import ProfilerActivity, profile
+            self._profiler = profile(activities=[ProfilerActivity.CPU], record_shapes=True)
+            self._profiler.__enter__()
+        else:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop(self):
+        """Writes the trace; safe to call more than once (e.g. at the end of training)."""
+        if self._profiler is None:
+            return
+        if os.path.dirname(self.output_path):
+            os.makedirs(os.path.dirname(self.output_path), exist_ok=True)
+        if self.kind == "torch":
+            self._profiler.__exit__(None, None, None)
+            self._profiler.export_chrome_trace(self.output_path)
+        else:
+            self._profiler.disable()
+            self._profiler.dump_stats(self.output_path)
+        self._profiler = None
+        print(f"Profiler trace for {self._seen} steps saved to {self.output_path}")
@@ -0,0 +1,43 @@
+import numpy as np
+
+class NumpyPolicy:
+    """
+    Torch-free forward pass for an exported DQN policy network.
+
+    Loads the `.npz` written by `app.rl_engine.export` or a model artifact
+    from `app.rl_engine.artifacts` (one weight/bias pair per Linear layer,
+    ReLU between layers) and computes Q-values with plain NumPy matmuls, so
+    serving doesn't need to import torch.
+    """
+    def __init__(self, weights, biases):
+        # Weights are stored transposed (in_dim, out_dim) so a batch is states @ W + b.
+        # No copies: transposed views and memory-mapped artifact weights are used as is.
+        self.weights = [np.asarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.asarray(b, dtype=np.float32) for b in biases]
+        self.state_dim = self.weights[0].shape[0]
+        self.action_dim = self.weights[-1].shape[1]
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            num_layers = int(data["num_layers"])
+            weights = [data[f"layer_{i}_weight"] for i in range(num_layers)]
+            biases = [data[f"layer_{i}_bias"] for i in range(num_layers)]
+        return cls(weights, biases)
+
+    @property
+    def output_layer(self):
+        """(weight (hidden, action_dim), bias) of the last layer."""
+        return self.weights[-1], self.biases[-1]
+
+    def features(self, states):
+        """Activations of the last hidden layer, i.e. the input of the output layer."""
+        x = np.asarray(states, dtype=np.float32)
+        for w, b in zip(self.weights[:-1], self.biases[:-1]):
+            x = x @ w + b
+            np.maximum(x, 0, out=x)
+        return x
+
+    def q_values(self, states):
+        """Q-values for a (batch, state_dim) float32 array."""
+        return self.features(states) @ self.weights[-1] + self.biases[-1]
@@ -0,0 +1,305 @@
+"""
+Offline training from historical transactions.
+
+1. `monthly_allocations` turns a transaction corpus into per-user monthly
+   allocation (category share) trajectories.
+2. `build_transition_dataset` converts consecutive months into
+   (state, action, reward, next_state, done) tuples and writes them to
+   memory-mapped `.npy` files, in shuffled order.
+3. `train_offline` trains the DQN from that dataset, reading each batch as
+   a contiguous slice of the memory maps.
+
+Usage (from backend/):
+    python -m app.rl_engine.offline build data/synthetic_transactions data/offline
+    python -m app.rl_engine.offline train data/offline --epochs 5
+"""
+import argparse
+import glob
+import os
+import numpy as np
+import pandas as pd
+import torch
+from app.rl_engine.agents.dqn import DQNAgent
+from app.rl_engine.state import (
+    ALLOCATION_KEYS, DEFAULT_ALLOCATION, RISK_MAP, SPENDING_CATEGORIES, apply_actions, build_states
+)
+
+FIELDS = ("states", "actions", "rewards", "next_states", "dones")
+MAX_STEPS = 12
+
+def monthly_allocations(transactions, users):
+    """
+    Aggregates transactions into one allocation per (user, month).
+
+    Args:
+        transactions (pd.DataFrame): Columns userId, date, amount, category.
+        users (list): Dicts with uid, monthlyIncome and riskPreference.
+            Transactions of users not listed here are dropped.
+
+    Returns:
+        dict: Row arrays sorted by user then month:
+            "uids" (U,) user ids, "user" (R,) index into uids, "month" (R,)
+            datetime64[M], "allocations" (R, 7) float32, "risk" (R,) float32.
+    """
+    incomes = {u["uid"]: float(u["monthlyIncome"]) for u in users}
+    risks = {u["uid"]: RISK_MAP.get(u.get("riskPreference"), 0.5) for u in users}
+
+    transactions = transactions[transactions["userId"].isin(incomes.keys())]
+    user_codes, uids = pd.factorize(transactions["userId"], sort=True)
+    months = pd.to_datetime(transactions["date"]).to_numpy().astype("datetime64[M]").astype(np.int64)
+    # Unknown categories count as "other"
+    slots = pd.Categorical(transactions["category"], categories=SPENDING_CATEGORIES).codes.astype(np.int64)
+    slots[slots < 0] = len(SPENDING_CATEGORIES) - 1
+
+    # 1. Sum spending per (user, month, category) with one bincount
+    first_month = months.min() if len(months) else 0
+    span = (months.max() - first_month + 1) if len(months) else 1
+    keys = user_codes.astype(np.int64) * span + (months - first_month)
+    row_keys, rows = np.unique(keys, return_inverse=True)
+    spent = np.bincount(
+        rows * len(SPENDING_CATEGORIES) + slots,
+        weights=transactions["amount"].to_numpy(np.float64),
+        minlength=len(row_keys) * len(SPENDING_CATEGORIES),
+    ).reshape(len(row_keys), len(SPENDING_CATEGORIES))
+
+    # 2. Shares of income; whatever wasn't spent is savings
+    row_user = row_keys // span
+    income = np.array([incomes[uid] for uid in uids])[row_user]
+    allocations = np.empty((len(row_keys), len(ALLOCATION_KEYS)))
+    allocations[:, 0] = np.maximum(0.0, income - spent.sum(axis=1))
+    allocations[:, 1:] = spent
+    totals = allocations.sum(axis=1, keepdims=True)
+    allocations = np.where(totals > 0, allocations / np.where(totals > 0, totals, 1.0), DEFAULT_ALLOCATION)
+
+    return {
+        "uids": np.asarray(uids),
+        "user": row_user,
+        "month": (row_keys % span + first_month).astype("datetime64[M]"),
+        "allocations": allocations.astype(np.float32),
+        "risk": np.array([risks[uid] for uid in uids], dtype=np.float32)[row_user],
+    }
+
+def user_trajectories(monthly):
+    """Splits monthly_allocations output into {uid: (T, 7) allocations} for BudgetEnvironment(historical_data=...)."""
+    bounds = np.flatnonzero(np.diff(monthly["user"])) + 1
+    return {
+        monthly["uids"][user[0]]: allocations
+        for user, allocations in zip(np.split(monthly["user"], bounds), np.split(monthly["allocations"], bounds))
+    }
+
+def infer_actions(prev_allocations, next_allocations):
+    """
+    Labels each observed month-to-month change with the closest discrete action.
+
+    Every action is applied to the previous allocation (as BudgetEnvironment.step
+    would, including re-normalization) and the one landing nearest, in squared
+    distance, to the observed next allocation wins.
+    """
+    n, action_dim = len(prev_allocations), 9
+    candidates = np.repeat(prev_allocations, action_dim, axis=0)
+    apply_actions(candidates, np.tile(np.arange(action_dim), n))
+    candidates /= candidates.sum(axis=1, keepdims=True)
+    distance = ((candidates.reshape(n, action_dim, -1) - next_allocations[:, None, :]) ** 2).sum(axis=2)
+    return distance.argmin(axis=1)
+
+def transitions_from_allocations(monthly):
+    """
+    Builds one transition per pair of consecutive months of the same user.
+
+    Rewards follow BudgetEnvironment.step, evaluated on the observed next
+    month; the last transition of each user is terminal.
+
+    Returns:
+        tuple: (states, actions, rewards, next_states, dones) arrays.
+    """
+    user, allocations, risk = monthly["user"], monthly["allocations"], monthly["risk"]
+    same_user = user[1:] == user[:-1]
+    src = np.flatnonzero(same_user)
+    dst = src + 1
+
+    # Position of each row within its user's trajectory
+    starts = np.flatnonzero(np.r_[True, ~same_user])
+    position = np.arange(len(user)) - np.repeat(starts, np.diff(np.r_[starts, len(user)]))
+
+    prev, nxt = allocations[src], allocations[dst]
+    rewards = (nxt[:, 0] - prev[:, 0]) * 100
+    rewards -= 50 * (nxt[:, 0] < 0.05)
+    rewards -= 20 * (nxt[:, 2] < 0.05)
+    last = np.r_[~same_user, True]
+
+    return (
+        build_states(prev, risk[src], (position[src] % MAX_STEPS) / MAX_STEPS),
+        infer_actions(prev, nxt).astype(np.int64),
+        rewards.astype(np.float32),
+        build_states(nxt, risk[dst], (position[dst] % MAX_STEPS) / MAX_STEPS),
+        last[dst].astype(np.float32),
+    )
+
+def _corpus_chunks(source, users=None):
+    """
+    Yields (transactions, users) chunks from a write_synthetic_parquet directory
+    (one chunk per part, users never span parts) or from an in-memory DataFrame.
+    """
+    if isinstance(source, pd.DataFrame):
+        yield source, users
+        return
+
+    import pyarrow.parquet as pq
+
+    for path in sorted(glob.glob(os.path.join(source, "transactions", "*.parquet"))):
+        columns = ["userId", "date", "amount", "category"]
+        transactions = pq.read_table(path, columns=columns).to_pandas(date_as_object=False)
+        part_users = users or pq.read_table(os.path.join(source, "users", os.path.basename(path))).to_pylist()
+        yield transactions, part_users
+
+def build_transition_dataset(source, output_dir, users=None, seed=0):
+    """
+    Precomputes the offline transition dataset as memory-mapped `.npy` files.
+
+    Runs two passes over the corpus, one chunk at a time: the first counts
+    transitions so the memory maps can be allocated at their final size, the
+    second fills them. Rows are scattered to a random permutation of positions,
+    so contiguous slices of the result are already shuffled batches.
+
+    Args:
+        source (str | pd.DataFrame): A write_synthetic_parquet directory, or a
+            transactions DataFrame (then `users` is required).
+        output_dir (str): Directory for states/actions/rewards/next_states/dones.npy.
+        users (list): User profiles, for DataFrame sources.
+        seed (int): Seed for the row shuffle.
+
+    Returns:
+        int: Number of transitions written.
+    """
+    if isinstance(source, pd.DataFrame) and users is None:
+        raise ValueError("build_transition_dataset needs `users` for a DataFrame source")
+
+    # 1. Count transitions: one per month after each user's first
+    total = 0
+    for transactions, chunk_users in _corpus_chunks(source, users):
+        monthly = monthly_allocations(transactions, chunk_users)
+        total += len(monthly["user"]) - len(np.unique(monthly["user"]))
+
+    os.makedirs(output_dir, exist_ok=True)
+    specs = {
+        "states": (np.float32, (total, 10)),
+        "actions": (np.int64, (total,)),
+        "rewards": (np.float32, (total,)),
+        "next_states": (np.float32, (total, 10)),
+        "dones": (np.float32, (total,)),
+    }
+    arrays = [
+        np.lib.format.open_memmap(os.path.join(output_dir, f"{name}.npy"), mode="w+", dtype=specs[name][0],
+                                  shape=specs[name][1])
+        for name in FIELDS
+    ]
+
+    # 2. Fill, chunk by chunk, at shuffled positions
+    positions = np.random.default_rng(seed).permutation(total)
+    offset = 0
+    for transactions, chunk_users in _corpus_chunks(source, users):
+        chunk = transitions_from_allocations(monthly_allocations(transactions, chunk_users))
+        rows = positions[offset:offset + len(chunk[0])]
+        for array, values in zip(arrays, chunk):
+            array[rows] = values
+        offset += len(chunk[0])
+
+    for array in arrays:
+        array.flush()
+    print(f"Wrote {total} transitions to {output_dir}")
+    return total
+
+class OfflineDataset:
+    """Read-only view of a build_transition_dataset directory."""
+
+    def __init__(self, path):
+        # Copy-on-write maps: nothing is read until a batch touches it, and torch
+        # can wrap the slices without the read-only array warning
+        self.arrays = [np.load(os.path.join(path, f"{name}.npy"), mmap_mode="c") for name in FIELDS]
+
+    def __len__(self):
+        return len(self.arrays[0])
+
+    def batches(self, batch_size, rng=None):
+        """
+        Yields (states, actions, rewards, next_states, dones) tensors shaped like
+        ReplayBuffer.sample(). Each batch wraps a contiguous slice of the memory
+        maps without copying; slices are visited in random order.
+        """
+        rng = rng or np.random.default_rng()
+        starts = np.arange(0, len(self), batch_size)
+        rng.shuffle(starts)
+        for start in starts:
+            states, actions, rewards, next_states, dones = (
+                torch.from_numpy(array[start:start + batch_size]) for array in self.arrays
+            )
+            yield states, actions.unsqueeze(1), rewards.unsqueeze(1), next_states, dones.unsqueeze(1)
+
+def train_offline(dataset_dir, epochs=5, batch_size=256, lr=1e-3, target_update_every=500,
+                  save_path="models/dqn_offline.pth", seed=0, verbose=True):
+    """
+    Trains the DQN agent from a precomputed transition dataset.
+
+    Args:
+        dataset_dir (str): Output directory of build_transition_dataset.
+        epochs (int): Passes over the dataset.
+        batch_size (int): Transitions per gradient step.
+        lr (float): Learning rate.
+        target_update_every (int): Gradient steps between target network updates.
+        save_path (str): Path to save the trained model weights.
+        seed (int): Seed for the batch order.
+        verbose (bool): Print progress to stdout.
+
+    Returns:
+        tuple: (agent, loss_history) with the mean TD loss of each epoch.
+    """
+    dataset = OfflineDataset(dataset_dir)
+    # Transitions come from the dataset, so the agent's own replay memory stays tiny
+    agent = DQNAgent(lr=lr, memory_size=1)
+    rng = np.random.default_rng(seed)
+
+    if verbose:
+        print(f"Starting offline training on {len(dataset)} transitions for {epochs} epochs...")
+
+    loss_history = []
+    steps = 0
+    for epoch in range(epochs):
+        losses = []
+        for batch in dataset.batches(batch_size, rng):
+            td_errors = agent.learn(*(t.to(agent.device) for t in batch))
+            losses.append(td_errors.pow(2).mean().item())
+            steps += 1
+            if steps % target_update_every == 0:
+                agent.update_target_network()
+
+        loss_history.append(float(np.mean(losses)) if losses else 0.0)
+        if verbose:
+            print(f"Epoch {epoch + 1}/{epochs} | Mean TD loss: {loss_history[-1]:.4f}")
+
+    # The policy was learned without exploring, so continue online from a low epsilon
+    agent.epsilon = agent.epsilon_min
+    agent.save(save_path)
+    if verbose:
+        print(f"Model saved to {save_path}")
+    return agent, loss_history
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline DQN training from historical transactions.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Precompute a transition dataset from a Parquet corpus")
+    build.add_argument("corpus", help="Directory written by data_generator.write_synthetic_parquet")
+    build.add_argument("output", help="Directory for the .npy transition dataset")
+    build.add_argument("--seed", type=int, default=0)
+
+    train = commands.add_parser("train", help="Train the DQN from a transition dataset")
+    train.add_argument("dataset", help="Directory written by the build command")
+    train.add_argument("--epochs", type=int, default=5)
+    train.add_argument("--batch-size", type=int, default=256)
+    train.add_argument("--save-path", default="models/dqn_offline.pth")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_transition_dataset(args.corpus, args.output, seed=args.seed)
+    else:
+        train_offline(args.dataset, epochs=args.epochs, batch_size=args.batch_size, save_path=args.save_path)
@@ -0,0 +1,133 @@
+import numpy as np
+
+# Allocation slots, in environment order: 0=Save, 1=Rent, 2=Food, 3=Trans, 4=Shop, 5=Ent, 6=Other
+ALLOCATION_KEYS = ["savings", "rent", "food", "transport", "shopping", "entertainment", "other"]
+SPENDING_CATEGORIES = ALLOCATION_KEYS[1:]
+
+# Map risk preference to a float value
+RISK_MAP = {"conservative": 0.0, "moderate": 0.5, "aggressive": 1.0}
+
+# Standard starting split (Savings, Rent, Food, Trans, Shop, Ent, Other)
+DEFAULT_ALLOCATION = np.array([0.20, 0.30, 0.15, 0.10, 0.10, 0.10, 0.05], dtype=np.float32)
+
+ACTION_NAMES = [
+    "No change",
+    "Reduce food by 5%",
+    "Reduce transport by 5%",
+    "Reduce shopping by 5%",
+    "Reduce entertainment by 5%",
+    "Reduce other expenses by 5%",
+    "Aggressive save: reduce all variable spending by 5%",
+    "Conservative: move 5% of savings to shopping and entertainment",
+    "Balance: reduce all variable spending by 2%",
+]
+
+# Fraction moved from each allocation slot into savings, per action.
+# Action 7 (Conservative) moves money *out of* savings and is handled separately.
+ACTION_RATES = np.zeros((9, 7), dtype=np.float32)
+for _action in range(1, 6):
+    ACTION_RATES[_action, _action + 1] = 0.05
+ACTION_RATES[6, 2:] = 0.05
+ACTION_RATES[8, 2:] = 0.02
+
+
+def apply_actions(allocations, actions):
+    """
+    Applies a batch of actions to an (N, 7) allocation matrix in place.
+
+    Vectorized equivalent of BudgetEnvironment._apply_action: every row gets
+    its own action, and all 9 actions are expressed as masked array operations.
+
+    Args:
+        allocations (np.ndarray): (N, 7) float32 allocations, modified in place.
+        actions (np.ndarray): (N,) integer actions in [0, 8].
+    """
+    actions = np.asarray(actions, dtype=np.int64)
+
+    # Actions 1-6 and 8: move a fixed fraction of some categories into savings
+    moved = allocations * ACTION_RATES[actions]
+    allocations -= moved
+    allocations[:, 0] += moved.sum(axis=1)
+
+    # Action 7: take 5% of savings and split it between Shopping(4) and Ent(5)
+    conservative = (actions == 7) & (allocations[:, 0] > 0.05)
+    amount = np.where(conservative, allocations[:, 0] * np.float32(0.05), np.float32(0.0))
+    allocations[:, 0] -= amount
+    allocations[:, 4] += amount / 2
+    allocations[:, 5] += amount / 2
+
+
+def allocation_from_spending(monthly_income, spending):
+    """
+    Converts a month of category spending into a 7-slot allocation summing to 1.
+
+    Args:
+        monthly_income (float): The user's monthly income.
+        spending (dict): Category -> amount spent, e.g. {"food": 4200.0}.
+
+    Returns:
+        np.ndarray: float32 allocation (Savings, Rent, Food, Trans, Shop, Ent, Other).
+    """
+    spent = np.array([float(spending.get(cat, 0.0)) for cat in SPENDING_CATEGORIES], dtype=np.float32)
+    total_spent = spent.sum()
+
+    if monthly_income <= 0 and total_spent <= 0:
+        return DEFAULT_ALLOCATION.copy()
+
+    allocation = np.empty(7, dtype=np.float32)
+    allocation[0] = max(0.0, monthly_income - total_spent)
+    allocation[1:] = spent
+    return allocation / allocation.sum()
+
+
+def allocations_from_spending(monthly_incomes, spent):
+    """
+    Vectorized allocation_from_spending for many users at once.
+
+    Args:
+        monthly_incomes (np.ndarray): (N,) monthly incomes.
+        spent (np.ndarray): (N, 6) amounts spent, in SPENDING_CATEGORIES order.
+
+    Returns:
+        np.ndarray: (N, 7) float32 allocations, each row summing to 1.
+    """
+    spent = np.asarray(spent, dtype=np.float32)
+    monthly_incomes = np.asarray(monthly_incomes, dtype=np.float32)
+    total_spent = spent.sum(axis=1)
+
+    allocations = np.empty((len(spent), 7), dtype=np.float32)
+    allocations[:, 0] = np.maximum(0.0, monthly_incomes - total_spent)
+    allocations[:, 1:] = spent
+
+    # Users with neither income nor spending get the default split
+    empty = (monthly_incomes <= 0) & (total_spent <= 0)
+    totals = allocations.sum(axis=1, keepdims=True)
+    allocations /= np.where(empty[:, None], 1.0, totals)
+    allocations[empty] = DEFAULT_ALLOCATION
+    return allocations
+
+
+def build_state(allocation, risk_preference="moderate", period_idx=0.0):
+    """
+    Builds the 10-dim observation used by BudgetEnvironment from an allocation.
+
+    Layout: [savings, income_norm, rent, food, transport, shopping, ent, other, risk, period]
+    """
+    state = np.empty(10, dtype=np.float32)
+    state[0] = allocation[0]
+    state[1] = 1.0
+    state[2:8] = allocation[1:]
+    state[8] = RISK_MAP.get(risk_preference, 0.5)
+    state[9] = period_idx
+    return state
+
+
+def build_states(allocations, risk, period_idx):
+    """Vectorized build_state for (N, 7) allocations; risk and period_idx may be scalars or (N,) arrays."""
+    states = np.empty((len(allocations), 10), dtype=np.float32)
+    states[:, 0] = allocations[:, 0]
+    states[:, 1] = 1.0
+    states[:, 2:8] = allocations[:, 1:]
+    states[:, 8] = risk
+    states[:, 9] = period_idx
+    return states
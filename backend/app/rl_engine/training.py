@@ -1,9 +1,16 @@
 import numpy as np
 import os
-from app.rl_engine.environment import BudgetEnvironment
+import queue
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import torch
+from app.rl_engine.environment import BudgetEnvironment, VectorBudgetEnvironment
 from app.rl_engine.agents.dqn import DQNAgent
+from app.rl_engine.metrics import timed
 
-def train_agent(user_profile, episodes=500, save_path="models/dqn_model.pth"):
+def train_agent(user_profile, episodes=500, save_path="models/dqn_model.pth", prioritized=False,
+                progress_callback=None, verbose=True, metrics=None, profiler=None, log_every=50,
+                batch_size=64, learning_starts=0, train_freq=1, gradient_steps=1, tau=None):
     """
     Trains the DQN agent for a specific user profile.
     
@@ -11,6 +18,19 @@ def train_agent(user_profile, episodes=500, save_path="models/dqn_model.pth"):
         user_profile (dict): User profile data including income and risk preference.
         episodes (int): Number of episodes to train.
         save_path (str): Path to save the trained model weights.
+        prioritized (bool): Use prioritized experience replay instead of uniform sampling.
+        progress_callback (callable): Optional `callback(episode, total_reward)` invoked
+            after every episode.
+        verbose (bool): Print progress to stdout.
+        metrics (TrainingMetrics): Optional phase timers / loss stats, logged every `log_every` episodes.
+        profiler (StepProfiler): Optional profiler, stepped once per environment step.
+        log_every (int): Episodes between progress lines and metrics records.
+        batch_size (int): Transitions per gradient step.
+        learning_starts (int): Environment steps collected before the first update.
+        train_freq (int): Environment steps between rounds of updates.
+        gradient_steps (int): Gradient steps per round.
+        tau (float): Soft (Polyak) target update coefficient applied after every gradient
+            step; None keeps the hard copy every 10 episodes.
     """
     # Initialize environment
     env = BudgetEnvironment(user_profile)
@@ -20,14 +40,17 @@ def train_agent(user_profile, episodes=500, save_path="models/dqn_model.pth"):
     action_dim = env.action_space.n
     
     # Initialize agent
-    agent = DQNAgent(state_dim, action_dim)
+    agent = DQNAgent(state_dim, action_dim, prioritized=prioritized, batch_size=batch_size,
+                     learning_starts=learning_starts, train_freq=train_freq, gradient_steps=gradient_steps, tau=tau)
+    agent.metrics = metrics
     
     # Ensure model directory exists
     os.makedirs(os.path.dirname(save_path), exist_ok=True)
     
     rewards_history = []
-    print(f"Starting training for {episodes} episodes...")
-    print(f"Profile: Income={user_profile.get('monthlyIncome')}, Risk={user_profile.get('riskPreference')}")
+    if verbose:
+        print(f"Starting training for {episodes} episodes...")
+        print(f"Profile: Income={user_profile.get('monthlyIncome')}, Risk={user_profile.get('riskPreference')}")
     
     for e in range(episodes):
         state, _ = env.reset()
@@ -36,44 +59,304 @@ def train_agent(user_profile, episodes=500, save_path="models/dqn_model.pth"):
         
         while not done:
             # Select action
-            action = agent.select_action(state)
+            with timed(metrics, "act"):
+                action = agent.select_action(state)
             
             # Take step
-            next_state, reward, terminated, truncated, _ = env.step(action)
+            with timed(metrics, "env_step"):
+                next_state, reward, terminated, truncated, _ = env.step(action)
             done = terminated or truncated
             
             # Store experience in replay buffer
-            agent.remember(state, action, reward, next_state, done)
+            with timed(metrics, "remember"):
+                agent.remember(state, action, reward, next_state, done)
             
-            # Train the agent
-            agent.replay()
+            # Train the agent (every train_freq steps)
+            agent.train_step()
+            
+            if metrics:
+                metrics.count("env_steps")
+            if profiler:
+                profiler.step()
             
             state = next_state
             total_reward += reward
             
-        # Update target network periodically
-        if e % 10 == 0:
+        # Update target network periodically (soft updates happen inside train_step)
+        if tau is None and e % 10 == 0:
             agent.update_target_network()
             
         rewards_history.append(total_reward)
         
+        if progress_callback:
+            progress_callback(e, total_reward)
+        
         # Log progress
-        if (e + 1) % 50 == 0:
-            avg_reward = np.mean(rewards_history[-50:])
-            print(f"Episode {e+1}/{episodes} | Avg Reward: {avg_reward:.2f} | Epsilon: {agent.epsilon:.4f}")
+        if (e + 1) % log_every == 0 or e + 1 == episodes:
+            avg_reward = np.mean(rewards_history[-log_every:])
+            if verbose:
+                print(f"Episode {e+1}/{episodes} | Avg Reward: {avg_reward:.2f} | Epsilon: {agent.epsilon:.4f}")
+            if metrics:
+                metrics.log(e + 1, avg_reward=float(avg_reward), epsilon=agent.epsilon,
+                            buffer_fill=len(agent.memory) / agent.memory.capacity)
+    
+    if profiler:
+        profiler.stop()
             
     # Save the trained model
     agent.save(save_path)
-    print(f"Training complete. Model saved to {save_path}")
+    if verbose:
+        print(f"Training complete. Model saved to {save_path}")
     
     return agent, rewards_history
 
+def train_agent_vectorized(user_profiles, episodes=500, num_envs=16, save_path="models/dqn_model.pth",
+                           prioritized=False, verbose=True, metrics=None, profiler=None, log_every=50,
+                           batch_size=64, learning_starts=0, train_freq=None, gradient_steps=1, tau=None):
+    """
+    Trains the DQN agent on a VectorBudgetEnvironment, collecting one
+    transition per environment on every step.
+    
+    Args:
+        user_profiles (list | dict): One profile per environment, or a single profile
+            replicated across `num_envs` environments.
+        episodes (int): Total number of episodes to train, summed over all environments.
+        num_envs (int): Number of environments when a single profile is given.
+        save_path (str): Path to save the trained model weights.
+        prioritized (bool): Use prioritized experience replay instead of uniform sampling.
+        verbose (bool): Print progress to stdout.
+        metrics (TrainingMetrics): Optional phase timers / loss stats, logged roughly every
+            `log_every` finished episodes.
+        profiler (StepProfiler): Optional profiler, stepped once per vector step.
+        log_every (int): Finished episodes between progress lines and metrics records.
+        batch_size (int): Transitions per gradient step.
+        learning_starts (int): Transitions collected before the first update.
+        train_freq (int): Transitions between rounds of updates; defaults to one round
+            per vector step (num_envs).
+        gradient_steps (int): Gradient steps per round.
+        tau (float): Soft (Polyak) target update coefficient; None keeps hard copies.
+    """
+    env = VectorBudgetEnvironment(user_profiles, num_envs=num_envs)
+    num_envs = env.num_envs
+    
+    state_dim = env.single_observation_space.shape[0]
+    action_dim = env.single_action_space.n
+    
+    agent = DQNAgent(state_dim, action_dim, prioritized=prioritized, batch_size=batch_size,
+                     learning_starts=learning_starts, train_freq=train_freq or num_envs,
+                     gradient_steps=gradient_steps, tau=tau)
+    agent.metrics = metrics
+    
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    
+    rewards_history = []
+    next_log = log_every
+    if verbose:
+        print(f"Starting vectorized training for {episodes} episodes across {num_envs} environments...")
+    
+    states, _ = env.reset()
+    episode_rewards = np.zeros(num_envs)
+    rounds = 0
+    
+    while len(rewards_history) < episodes:
+        with timed(metrics, "act"):
+            actions = agent.select_actions(states)
+        with timed(metrics, "env_step"):
+            next_states, rewards, terminations, truncations, infos = env.step(actions)
+        dones = terminations | truncations
+        
+        # Rows that just finished were auto-reset; store their true final observation
+        final_states = next_states
+        if "final_obs" in infos:
+            final_states = np.where(infos["_final_obs"][:, None], infos["final_obs"], next_states)
+        
+        with timed(metrics, "remember"):
+            agent.remember_batch(states, actions, rewards, final_states, dones)
+        agent.train_step(num_envs)
+        
+        if metrics:
+            metrics.count("env_steps", num_envs)
+        if profiler:
+            profiler.step()
+        
+        states = next_states
+        episode_rewards += rewards
+        
+        if dones.any():
+            rewards_history.extend(episode_rewards[dones].tolist())
+            episode_rewards[dones] = 0.0
+            
+            # Update target network every 10 rounds of episodes
+            if tau is None and rounds % 10 == 0:
+                agent.update_target_network()
+            rounds += 1
+            
+            # Log progress each time the finished-episode count crosses a log_every boundary
+            finished = len(rewards_history)
+            if finished >= next_log or finished >= episodes:
+                avg_reward = np.mean(rewards_history[-log_every:])
+                if verbose:
+                    print(f"Episode {min(finished, episodes)}/{episodes} | Avg Reward: {avg_reward:.2f} | "
+                          f"Epsilon: {agent.epsilon:.4f}")
+                if metrics:
+                    metrics.log(finished, avg_reward=float(avg_reward), epsilon=agent.epsilon,
+                                buffer_fill=len(agent.memory) / agent.memory.capacity)
+                next_log = finished + log_every
+    
+    if profiler:
+        profiler.stop()
+    
+    agent.save(save_path)
+    if verbose:
+        print(f"Training complete. Model saved to {save_path}")
+    
+    return agent, rewards_history[:episodes]
+
+def profile_name(user_profile):
+    """Stable identifier for a profile, used to name its checkpoint."""
+    if user_profile.get("name"):
+        return user_profile["name"]
+    return f"{user_profile.get('riskPreference', 'moderate')}_{int(user_profile.get('monthlyIncome', 50000))}"
+
+def cohort_profiles(incomes=(30000, 50000, 80000, 120000, 200000),
+                    risks=("conservative", "moderate", "aggressive")):
+    """Builds one profile per income bracket x riskPreference cohort."""
+    return [
+        {"monthlyIncome": income, "riskPreference": risk}
+        for income in incomes
+        for risk in risks
+    ]
+
+def _init_worker(threads_per_worker):
+    # Pin intra-op threads so K workers don't oversubscribe the cores
+    torch.set_num_threads(threads_per_worker)
+
+def _train_profile(user_profile, episodes, save_path, prioritized, progress_queue, report_every):
+    name = profile_name(user_profile)
+    chunk = []
+    
+    def report(episode, total_reward):
+        chunk.append(float(total_reward))
+        if len(chunk) >= report_every or episode == episodes - 1:
+            progress_queue.put((name, episode + 1 - len(chunk), list(chunk)))
+            chunk.clear()
+    
+    train_agent(user_profile, episodes=episodes, save_path=save_path, prioritized=prioritized,
+                progress_callback=report, verbose=False)
+    return name, save_path
+
+def train_many(profiles, workers=None, episodes=500, save_dir="models", prioritized=False,
+               threads_per_worker=None, progress_callback=None, report_every=10):
+    """
+    Trains one DQN agent per profile across a pool of worker processes.
+    
+    Args:
+        profiles (list): User profiles to train, e.g. from `cohort_profiles()`.
+        workers (int): Number of worker processes. Defaults to the CPU count.
+        episodes (int): Number of episodes to train per profile.
+        save_dir (str): Directory for the per-profile checkpoints (`dqn_<profile>.pth`).
+        prioritized (bool): Use prioritized experience replay.
+        threads_per_worker (int): torch intra-op threads per worker. Defaults to
+            cpu_count // workers (at least 1).
+        progress_callback (callable): Optional `callback(name, first_episode, rewards)`
+            called in the parent as reward chunks stream back from the workers.
+        report_every (int): Number of episodes per streamed reward chunk.
+    
+    Returns:
+        dict: profile name -> {"rewards_history": [...], "save_path": str}
+    """
+    cpu_count = os.cpu_count() or 1
+    workers = workers or cpu_count
+    threads_per_worker = threads_per_worker or max(1, cpu_count // workers)
+    
+    names = [profile_name(p) for p in profiles]
+    if len(set(names)) != len(names):
+        raise ValueError("Profiles must have unique names (set a 'name' key to disambiguate)")
+    
+    results = {name: {"rewards_history": [], "save_path": None} for name in names}
+    
+    def drain(progress_queue):
+        while True:
+            try:
+                name, first_episode, rewards = progress_queue.get_nowait()
+            except queue.Empty:
+                return
+            history = results[name]["rewards_history"]
+            history.extend(rewards)
+            if progress_callback:
+                progress_callback(name, first_episode, rewards)
+            elif len(history) % 50 < len(rewards) or len(history) == episodes:
+                print(f"[{name}] Episode {len(history)}/{episodes} | Avg Reward: {np.mean(history[-50:]):.2f}")
+    
+    print(f"Training {len(profiles)} profiles on {workers} workers ({threads_per_worker} thread(s) each)...")
+    
+    # Spawn (rather than fork) so every worker starts with a clean torch runtime
+    ctx = mp.get_context("spawn")
+    with ctx.Manager() as manager:
+        progress_queue = manager.Queue()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                 initializer=_init_worker, initargs=(threads_per_worker,)) as pool:
+            pending = {
+                pool.submit(_train_profile, profile, episodes,
+                            os.path.join(save_dir, f"dqn_{name}.pth"),
+                            prioritized, progress_queue, report_every)
+                for profile, name in zip(profiles, names)
+            }
+            while pending:
+                done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                drain(progress_queue)
+                for future in done:
+                    name, save_path = future.result()
+                    results[name]["save_path"] = save_path
+        drain(progress_queue)
+    
+    print(f"Trained {len(profiles)} profiles. Checkpoints saved to {save_dir}")
+    return results
+
 if __name__ == "__main__":
+    import argparse
+    from app.rl_engine.metrics import StepProfiler, TrainingMetrics
+    
+    parser = argparse.ArgumentParser(description="Train the DQN agent on a test profile.")
+    parser.add_argument("--episodes", type=int, default=200)
+    parser.add_argument("--metrics-log", help="Write training metrics as JSON lines to this file")
+    parser.add_argument("--tensorboard", help="Write training metrics to this TensorBoard log directory")
+    parser.add_argument("--profile", choices=["torch", "cprofile"], help="Capture a profiler trace")
+    parser.add_argument("--profile-steps", type=int, default=200, help="Environment steps to profile")
+    parser.add_argument("--profile-output", default="models/train_profile")
+    parser.add_argument("--register", metavar="NAME",
+                        help="Also save the trained agent as a new version of NAME in the model registry")
+    args = parser.parse_args()
+    
     # Example usage for testing
     dummy_profile = {
         "monthlyIncome": 50000,
         "riskPreference": "moderate"
     }
     
+    metrics = None
+    if args.metrics_log or args.tensorboard:
+        metrics = TrainingMetrics(log_path=args.metrics_log, tensorboard_dir=args.tensorboard)
+    profiler = None
+    if args.profile:
+        suffix = ".json" if args.profile == "torch" else ".prof"
+        profiler = StepProfiler(args.profile_output + suffix, steps=args.profile_steps, kind=args.profile)
+    
     # Run training
-    train_agent(dummy_profile, episodes=200, save_path="models/dqn_test.pth")
\ No newline at end of file
+    try:
+        agent, rewards_history = train_agent(dummy_profile, episodes=args.episodes, save_path="models/dqn_test.pth",
+                                             metrics=metrics, profiler=profiler)
+    finally:
+        if metrics:
+            metrics.close()
+    
+    if args.register:
+        from app.config import settings
+        from app.rl_engine.artifacts import ArtifactRegistry
+        manifest = ArtifactRegistry(settings.MODEL_REGISTRY_DIR).save(args.register, agent, profile=dummy_profile, metrics={
+            "episodes": args.episodes,
+            "final_avg_reward": float(np.mean(rewards_history[-50:])),
+            "epsilon": agent.epsilon,
+            "num_updates": agent.num_updates,
+        })
+        print(f"Registered {args.register} {manifest['version']} in {settings.MODEL_REGISTRY_DIR}")
@@ -0,0 +1,106 @@
+import asyncio
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from app.config import settings
+from app.rl_engine.adapters import Adapter
+from app.services.cache import MISSING
+
+_SAFE_UID = re.compile(r"[A-Za-z0-9_-]{1,128}")
+
+class AdapterStore:
+    """
+    Per-user adapters on local disk (`{directory}/{model}/{uid}.npz`),
+    loaded on demand and kept in an LRU of `max_adapters` entries.
+
+    Users without an adapter are cached too, so serving them costs one
+    dict lookup after the first request.
+    """
+    def __init__(self, directory, max_adapters=10000):
+        self.directory = directory
+        self.max_adapters = max_adapters
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def path(self, model_name, uid):
+        # Anything that isn't a plain id is hashed, so a uid can't escape the directory
+        name = uid if _SAFE_UID.fullmatch(uid) else hashlib.sha256(uid.encode()).hexdigest()
+        return os.path.join(self.directory, model_name, f"{name}.npz")
+
+    def get(self, model_name, uid, base_version=None):
+        """
+        The user's adapter for `model_name`, or None. Reads the disk on an
+        LRU miss; async code should use get_async().
+
+        Args:
+            base_version (str): If given, adapters fit on another version of the
+                base model are ignored.
+        """
+        adapter = self.get_cached(model_name, uid, base_version)
+        if adapter is not MISSING:
+            return adapter
+
+        key = (model_name, uid)
+        path = self.path(model_name, uid)
+        adapter = Adapter.load(path) if os.path.exists(path) else None
+        with self._lock:
+            self.misses += 1
+            # A put() that landed while we read the disk wins over what we read
+            if key not in self._entries:
+                self._insert(key, adapter)
+            adapter = self._entries[key]
+        return _matching(adapter, base_version)
+
+    def get_cached(self, model_name, uid, base_version=None):
+        """Like get(), but never touches the disk: MISSING if the user isn't in the LRU."""
+        key = (model_name, uid)
+        with self._lock:
+            if key not in self._entries:
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return _matching(self._entries[key], base_version)
+
+    async def get_async(self, model_name, uid, base_version=None):
+        """get() for the event loop: LRU hits are served inline, misses load in a worker thread."""
+        adapter = self.get_cached(model_name, uid, base_version)
+        if adapter is MISSING:
+            adapter = await asyncio.to_thread(self.get, model_name, uid, base_version)
+        return adapter
+
+    def put(self, model_name, uid, adapter):
+        """Saves the adapter and makes it the one served from now on."""
+        adapter.save(self.path(model_name, uid))
+        with self._lock:
+            self._insert((model_name, uid), adapter)
+
+    def _insert(self, key, adapter):
+        self._entries[key] = adapter
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_adapters:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            resident = [a for a in self._entries.values() if a is not None]
+            return {
+                "entries": len(self._entries),
+                "adapters": len(resident),
+                "bytes": sum(a.nbytes for a in resident),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+def _matching(adapter, base_version):
+    if adapter is not None and base_version is not None and adapter.base_version != base_version:
+        return None
+    return adapter
+
+adapters = AdapterStore(settings.ADAPTER_DIR, max_adapters=settings.ADAPTER_CACHE_SIZE)
@@ -0,0 +1,146 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from app.config import settings
+
+MISSING = object()
+
+def _sizeof(value):
+    """Rough deep size in bytes of plain dict/list/str/number values."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(_sizeof(v) for v in value)
+    return size
+
+class TTLCache:
+    """
+    Bounded in-process cache with per-key TTL and LRU eviction.
+
+    Entries can be tagged with a user id so every entry for that user can be
+    dropped at once after one of their writes. Readers take the user's
+    generation() before reading and pass it to set(), so a read that started
+    before a write can't cache its result after the write's invalidation.
+    The cache is per process: it keeps a user's reads consistent with their
+    own writes on this instance, but other instances may serve data up to
+    one TTL old.
+    """
+    def __init__(self, max_entries=10000, max_bytes=64 * 1024 * 1024, default_ttl=30.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+
+        self._entries = OrderedDict() # key -> (expires_at, size, uid, value)
+        self._user_keys = {}          # uid -> set of keys
+        self._generations = OrderedDict() # uid -> counter value at the user's last invalidation
+        self._generation_floor = 0    # highest generation dropped from _generations
+        self._counter = 0
+        self._lock = threading.Lock()
+        self.bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=MISSING):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[3]
+
+    def generation(self, uid):
+        """Token for set(): changes whenever the user's entries are invalidated."""
+        with self._lock:
+            return self._generations.get(uid, self._generation_floor)
+
+    def set(self, key, value, ttl=None, uid=None, generation=None):
+        """
+        Args:
+            uid (str): Tags the entry for invalidate_user().
+            generation (int): generation(uid) taken before the value was read;
+                if the user was invalidated since, the value is not cached.
+        """
+        size = _sizeof(value)
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+
+        with self._lock:
+            if generation is not None and self._generations.get(uid, self._generation_floor) != generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires_at, size, uid, value)
+            self.bytes += size
+            if uid is not None:
+                self._user_keys.setdefault(uid, set()).add(key)
+
+            # Evict least recently used entries until within both limits
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_user(self, uid):
+        """Drops every entry tagged with `uid` and moves the user to a new generation."""
+        with self._lock:
+            for key in self._user_keys.pop(uid, ()):
+                self._remove(key, forget_user=False)
+            self._counter += 1
+            self._generations[uid] = self._counter
+            self._generations.move_to_end(uid)
+            # Forgotten users fall back to the floor, which is newer than any token they handed out
+            while len(self._generations) > self.max_entries:
+                _, dropped = self._generations.popitem(last=False)
+                self._generation_floor = max(self._generation_floor, dropped)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+            self.bytes = 0
+            self._generations.clear()
+            self._counter += 1
+            self._generation_floor = self._counter
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hitRate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _remove(self, key, forget_user=True):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.bytes -= entry[1]
+        uid = entry[2]
+        if forget_user and uid is not None:
+            keys = self._user_keys.get(uid)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._user_keys[uid]
+
+cache = TTLCache(
+    max_entries=settings.CACHE_MAX_ENTRIES,
+    max_bytes=settings.CACHE_MAX_BYTES,
+    default_ttl=settings.CACHE_TTL_SECONDS
+)
@@ -0,0 +1,203 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+import numpy as np
+from app.config import settings
+from app.rl_engine.state import SPENDING_CATEGORIES
+
+# Category codes index SPENDING_CATEGORIES; unknown categories count as "other"
+CATEGORY_CODES = {category: code for code, category in enumerate(SPENDING_CATEGORIES)}
+OTHER_CODE = CATEGORY_CODES["other"]
+
+def epoch_seconds(value):
+    """Seconds since the epoch for a datetime (naive = UTC, as Firestore stores it) or ISO date string."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return int(np.datetime64(value, "s").astype(np.int64))
+
+class UserTransactions:
+    """
+    One user's transactions as parallel arrays: date (int64 epoch seconds),
+    amount (float32) and category code (uint8). Aggregations are bincounts
+    over the arrays, so they cost microseconds even for years of history.
+
+    The arrays are views into buffers that grow by doubling, so appending a
+    transaction is amortized O(1) rather than a copy of the whole history.
+    """
+    def __init__(self, dates=None, amounts=None, categories=None):
+        self._dates = np.asarray(dates if dates is not None else [], dtype=np.int64)
+        self._amounts = np.asarray(amounts if amounts is not None else [], dtype=np.float32)
+        self._categories = np.asarray(categories if categories is not None else [], dtype=np.uint8)
+        self._size = len(self._dates)
+
+    @property
+    def dates(self):
+        return self._dates[:self._size]
+
+    @property
+    def amounts(self):
+        return self._amounts[:self._size]
+
+    @property
+    def categories(self):
+        return self._categories[:self._size]
+
+    @classmethod
+    def from_records(cls, records):
+        """Builds the columns from transaction dicts with date, amount and category."""
+        columns = cls()
+        columns.append(records)
+        return columns
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self):
+        """Bytes held, including spare buffer capacity."""
+        return self._dates.nbytes + self._amounts.nbytes + self._categories.nbytes
+
+    def append(self, records):
+        records = list(records)
+        if not records:
+            return
+        end = self._size + len(records)
+        if end > len(self._dates):
+            capacity = max(end, 2 * len(self._dates), 16)
+            for name in ("_dates", "_amounts", "_categories"):
+                old = getattr(self, name)
+                grown = np.empty(capacity, dtype=old.dtype)
+                grown[:self._size] = old[:self._size]
+                setattr(self, name, grown)
+        self._dates[self._size:end] = [epoch_seconds(r["date"]) for r in records]
+        self._amounts[self._size:end] = [float(r.get("amount", 0)) for r in records]
+        self._categories[self._size:end] = [CATEGORY_CODES.get(r.get("category"), OTHER_CODE) for r in records]
+        self._size = end
+
+    def _mask(self, start_date=None, end_date=None):
+        mask = np.ones(len(self.dates), dtype=bool)
+        if start_date is not None:
+            mask &= self.dates >= epoch_seconds(start_date)
+        if end_date is not None:
+            mask &= self.dates <= epoch_seconds(end_date)
+        return mask
+
+    def category_totals(self, start_date=None, end_date=None):
+        """{category: amount spent} for categories with at least one transaction in range."""
+        mask = self._mask(start_date, end_date)
+        codes = self.categories[mask]
+        counts = np.bincount(codes, minlength=len(SPENDING_CATEGORIES))
+        sums = np.bincount(codes, weights=self.amounts[mask], minlength=len(SPENDING_CATEGORIES))
+        return {SPENDING_CATEGORIES[code]: float(sums[code]) for code in np.flatnonzero(counts)}
+
+    def monthly_totals(self, start_date=None, end_date=None):
+        """{"YYYY-MM": amount spent} for months with at least one transaction in range."""
+        mask = self._mask(start_date, end_date)
+        months = self.dates[mask].astype("datetime64[s]").astype("datetime64[M]")
+        unique_months, inverse = np.unique(months, return_inverse=True)
+        sums = np.bincount(inverse, weights=self.amounts[mask], minlength=len(unique_months))
+        return {str(month): float(total) for month, total in zip(unique_months, sums)}
+
+class _Entry:
+    __slots__ = ("columns", "synced_at", "checked_at", "recent_ids")
+
+    def __init__(self, columns, synced_at, recent_ids):
+        self.columns = columns
+        self.synced_at = synced_at    # createdAt watermark of the last Firestore read
+        self.checked_at = time.monotonic()
+        self.recent_ids = recent_ids  # doc id -> createdAt (epoch s) of rows near the watermark
+
+class ColumnarTransactionStore:
+    """
+    LRU of per-user UserTransactions.
+
+    Transactions are append-only, so after the initial load an entry is kept
+    current by reading only documents created since its watermark (see
+    FirestoreService.get_transaction_columns). Rows created within `overlap`
+    seconds of the watermark are read again and de-duplicated by document
+    id, which tolerates clock skew between writers.
+    """
+    def __init__(self, max_users=1000, refresh_after=30.0, overlap=60.0):
+        self.max_users = max_users
+        self.refresh_after = refresh_after
+        self.overlap = overlap
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.refreshes = 0
+        self.evictions = 0
+
+    def get(self, uid):
+        """The user's entry (marked most recently used), or None."""
+        with self._lock:
+            entry = self._entries.get(uid)
+            if entry is not None:
+                self._entries.move_to_end(uid)
+            return entry
+
+    def needs_refresh(self, entry):
+        return time.monotonic() - entry.checked_at >= self.refresh_after
+
+    def load(self, uid, rows, synced_at):
+        """Stores a user's full history, read as `(doc_id, record)` rows at watermark `synced_at`."""
+        entry = _Entry(UserTransactions(), synced_at, {})
+        with self._lock:
+            self._absorb(entry, rows, synced_at)
+            self._entries[uid] = entry
+            self._entries.move_to_end(uid)
+            self.loads += 1
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def merge(self, entry, rows, synced_at):
+        """Appends freshly read `(doc_id, record)` rows not seen before and moves the watermark to `synced_at`."""
+        with self._lock:
+            self._absorb(entry, rows, synced_at)
+            self.refreshes += 1
+
+    def _absorb(self, entry, rows, synced_at):
+        new_rows = [(doc_id, record) for doc_id, record in rows if doc_id not in entry.recent_ids]
+        entry.columns.append(record for _, record in new_rows)
+        for doc_id, record in new_rows:
+            if record.get("createdAt"):
+                entry.recent_ids[doc_id] = epoch_seconds(record["createdAt"])
+        
+        # Only rows the next incremental read can return again need remembering
+        cutoff = epoch_seconds(synced_at) - self.overlap
+        entry.recent_ids = {doc_id: created for doc_id, created in entry.recent_ids.items() if created >= cutoff}
+        entry.synced_at = synced_at
+        entry.checked_at = time.monotonic()
+
+    def append(self, uid, doc_id, record):
+        """Adds a transaction written by this instance, if the user is resident."""
+        with self._lock:
+            entry = self._entries.get(uid)
+            if entry is None:
+                return
+            entry.columns.append([record])
+            entry.recent_ids[doc_id] = epoch_seconds(record.get("createdAt", datetime.now()))
+
+    def invalidate(self, uid):
+        with self._lock:
+            self._entries.pop(uid, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "users": len(self._entries),
+                "rows": sum(len(e.columns) for e in self._entries.values()),
+                "bytes": sum(e.columns.nbytes for e in self._entries.values()),
+                "loads": self.loads,
+                "refreshes": self.refreshes,
+                "evictions": self.evictions,
+            }
+
+columns = ColumnarTransactionStore(
+    max_users=settings.COLUMNAR_MAX_USERS,
+    refresh_after=settings.COLUMNAR_REFRESH_SECONDS
+)
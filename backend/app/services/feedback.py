@@ -0,0 +1,428 @@
+"""
+Online learning from suggestion feedback.
+
+1. `/api/rl/suggest` stashes the state and action it served per user
+   (`pending`).
+2. `/api/rl/feedback` turns the stashed suggestion into a record
+   (state, action, reward) and appends it to `FeedbackLog`: fixed-size
+   binary records in rolling segment files, with the oldest segments dropped
+   once the log exceeds its size bound. That is one buffered write, however
+   much training is pending.
+3. `FeedbackTrainer`, a background thread, drains the log in micro-batches
+   and fine-tunes a DQNAgent on them. Every `publish_interval` seconds, if
+   gradient updates have happened since the last publish, it saves the
+   weights and atomically swaps them into the serving registry. The log
+   cursor only moves once the weights are saved, so a crash retrains
+   rather than loses feedback.
+   With FEEDBACK_PERSONALIZE the shared model stays frozen instead, and
+   each user's feedback fits that user's adapter (see rl_engine.adapters).
+
+The stash is per process; feedback that reaches a different worker than
+its suggestion is acknowledged but not recorded.
+"""
+import glob
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from app.config import settings
+from app.rl_engine.adapters import fit_adapter
+from app.rl_engine.state import apply_actions, build_states
+from app.services.adapters import adapters
+from app.services.rl_service import policy_version, registry
+
+# Feedback is a bonus/penalty on top of the environment reward of the action
+FEEDBACK_REWARDS = {"accepted": 10.0, "rejected": -10.0}
+
+# Firebase uids are at most 128 bytes; longer uids or model names are rejected, never truncated
+RECORD_DTYPE = np.dtype([
+    ("uid", "S128"),
+    ("model", "S32"),
+    ("state", "<f4", (10,)),
+    ("action", "u1"),
+    ("reward", "<f4"),
+    ("timestamp", "<f8"),
+])
+
+def _fits(value, field):
+    # Fixed-width bytes fields are NUL-padded, so trailing NULs wouldn't survive a round trip either
+    return len(value) <= RECORD_DTYPE[field].itemsize and not value.endswith(b"\0")
+
+class PendingSuggestions:
+    """LRU of the last suggestion served to each user: uid -> (model name, state, action)."""
+    def __init__(self, max_users=100000):
+        self.max_users = max_users
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, uid, model_name, state, action):
+        with self._lock:
+            self._entries[uid] = (model_name, np.asarray(state, dtype=np.float32), int(action))
+            self._entries.move_to_end(uid)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def pop(self, uid):
+        """Removes and returns the user's pending suggestion, so feedback is recorded once."""
+        with self._lock:
+            return self._entries.pop(uid, None)
+
+class FeedbackLog:
+    """
+    Append-only feedback log in `directory`, bounded to about `max_bytes`.
+
+    Records go to numbered segment files of `segment_records` records each.
+    A single consumer reads with read() and acknowledges with commit(); its
+    position is kept in `cursor.json`. Segments beyond the size bound are
+    deleted oldest first, even if unread.
+    """
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024, segment_records=4096):
+        self.directory = directory
+        self.segment_records = segment_records
+        self.max_segments = max(2, max_bytes // (segment_records * RECORD_DTYPE.itemsize))
+        self._lock = threading.Lock()
+        self._segments = None  # segment numbers on disk, oldest first; scanned on first use
+        self._file = None
+        self._count = 0        # records in the newest segment
+        self.appended = 0
+        self.dropped = 0
+
+    def _segment_path(self, segment):
+        return os.path.join(self.directory, f"{segment:08d}.log")
+
+    def _cursor_path(self):
+        return os.path.join(self.directory, "cursor.json")
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        paths = glob.glob(os.path.join(self.directory, "*.log"))
+        self._segments = sorted(int(os.path.basename(p)[:-4]) for p in paths) or [0]
+        path = self._segment_path(self._segments[-1])
+        self._file = open(path, "ab")
+        self._count = os.path.getsize(path) // RECORD_DTYPE.itemsize
+
+    def append(self, uid, model_name, state, action, reward):
+        """
+        Appends one feedback record.
+
+        Returns:
+            bool: False if `uid` or `model_name` doesn't fit its field; the
+            record is skipped, since truncating would merge different users'
+            (or models') feedback.
+        """
+        uid_bytes, model_bytes = uid.encode(), model_name.encode()
+        if not _fits(uid_bytes, "uid") or not _fits(model_bytes, "model"):
+            print(f"Warning: feedback for uid {uid!r} / model {model_name!r} exceeds the log's field sizes; "
+                  f"not recorded.")
+            return False
+        record = np.zeros(1, dtype=RECORD_DTYPE)
+        record["uid"] = uid_bytes
+        record["model"] = model_bytes
+        record["state"] = state
+        record["action"] = action
+        record["reward"] = reward
+        record["timestamp"] = time.time()
+
+        with self._lock:
+            if self._segments is None:
+                self._open()
+            if self._count >= self.segment_records:
+                self._roll()
+            self._file.write(record.tobytes())
+            self._file.flush()
+            self._count += 1
+            self.appended += 1
+        return True
+
+    def _roll(self):
+        self._file.close()
+        self._segments.append(self._segments[-1] + 1)
+        self._file = open(self._segment_path(self._segments[-1]), "ab")
+        self._count = 0
+        while len(self._segments) > self.max_segments:
+            oldest = self._segments.pop(0)
+            self.dropped += os.path.getsize(self._segment_path(oldest)) // RECORD_DTYPE.itemsize
+            os.remove(self._segment_path(oldest))
+
+    def _load_cursor(self):
+        if not os.path.exists(self._cursor_path()):
+            return {"segment": 0, "offset": 0}
+        with open(self._cursor_path()) as f:
+            return json.load(f)
+
+    def read(self, max_records, cursor=None):
+        """
+        Up to `max_records` unread records, oldest first.
+
+        Args:
+            cursor (dict): Position to read from, as returned by a previous
+                read(); defaults to the committed cursor.
+
+        Returns:
+            tuple: (records array of RECORD_DTYPE, cursor to pass to commit()).
+        """
+        with self._lock:
+            if self._segments is None:
+                self._open()
+            segments = list(self._segments)
+        cursor = cursor or self._load_cursor()
+        segment, offset = cursor["segment"], cursor["offset"]
+        if segment < segments[0]:
+            # Unread segments were dropped by the size bound
+            segment, offset = segments[0], 0
+
+        chunks, remaining = [], max_records
+        for current in (s for s in segments if s >= segment):
+            if current > segment:
+                segment, offset = current, 0
+            path = self._segment_path(current)
+            try:
+                # Whole records only: the writer may be mid-append on the newest segment
+                count = min(os.path.getsize(path) // RECORD_DTYPE.itemsize - offset, remaining)
+                if count > 0:
+                    chunks.append(np.fromfile(path, dtype=RECORD_DTYPE, count=count,
+                                              offset=offset * RECORD_DTYPE.itemsize))
+                    offset += count
+                    remaining -= count
+            except FileNotFoundError:
+                continue
+            if remaining == 0:
+                break
+
+        records = np.concatenate(chunks) if chunks else np.zeros(0, dtype=RECORD_DTYPE)
+        return records, {"segment": segment, "offset": offset}
+
+    def commit(self, cursor):
+        """Marks everything before `cursor` as consumed."""
+        tmp_path = self._cursor_path() + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(cursor, f)
+        os.replace(tmp_path, self._cursor_path())
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+                self._segments = None
+
+def feedback_transitions(records):
+    """
+    Turns feedback records into transitions: the next state is the
+    suggested action applied to the state's allocation, and the reward is
+    the environment reward of that step plus the feedback reward.
+
+    Returns:
+        tuple: (states, actions, rewards, next_states, dones) arrays.
+    """
+    states = records["state"].astype(np.float32)
+    actions = records["action"].astype(np.int64)
+
+    allocations = np.concatenate([states[:, :1], states[:, 2:8]], axis=1)
+    prev_savings = allocations[:, 0].copy()
+    apply_actions(allocations, actions)
+    allocations /= allocations.sum(axis=1, keepdims=True)
+
+    # Same reward terms as BudgetEnvironment.step
+    rewards = (allocations[:, 0] - prev_savings) * 100
+    rewards -= np.where(allocations[:, 0] < 0.05, np.float32(50), np.float32(0))
+    rewards -= np.where(allocations[:, 2] < 0.05, np.float32(20), np.float32(0))
+    rewards += records["reward"]
+
+    periods = np.minimum(states[:, 9] + 1 / 12, 1.0)
+    next_states = build_states(allocations, states[:, 8], periods)
+    dones = (periods >= 1.0).astype(np.float32)
+    return states, actions, rewards.astype(np.float32), next_states, dones
+
+class FeedbackTrainer:
+    """
+    Background thread that fine-tunes the served model on logged feedback.
+
+    Fine-tuned weights are saved to `output_path` (atomically) and published
+    to `registry` under `model_name` as a NumPy policy, at most once every
+    `publish_interval` seconds and only if the weights have changed. On
+    restart training continues from `output_path` if it exists, otherwise
+    from `checkpoint_path`.
+
+    Given an AdapterStore, the served model is left untouched and each
+    user's records instead update that user's adapter.
+    """
+    def __init__(self, log, registry, model_name, checkpoint_path, output_path, batch_size=32,
+                 gradient_steps=1, tau=0.005, max_records=1024, interval=5.0, publish_interval=60.0,
+                 adapters=None, adapter_rank=4):
+        """
+        Args:
+            batch_size (int): Transitions per gradient step.
+            gradient_steps (int): Gradient steps per `batch_size` new records.
+            tau (float): Polyak coefficient for the target network.
+            max_records (int): Records per micro-batch read from the log.
+            interval (float): Seconds between polls when not notified.
+            publish_interval (float): Minimum seconds between saving and
+                publishing new weights. Every publish changes the model
+                version, which invalidates precomputed suggestions.
+            adapters (AdapterStore): Train per-user adapters into this store
+                instead of fine-tuning the shared model.
+            adapter_rank (int): Rank of newly created adapters.
+        """
+        self.log = log
+        self.registry = registry
+        self.model_name = model_name
+        self.checkpoint_path = checkpoint_path
+        self.output_path = output_path
+        self.batch_size = batch_size
+        self.gradient_steps = gradient_steps
+        self.tau = tau
+        self.max_records = max_records
+        self.interval = interval
+        self.publish_interval = publish_interval
+        self.adapters = adapters
+        self.adapter_rank = adapter_rank
+
+        self.agent = None
+        self._read_cursor = None      # log position trained up to; committed once saved
+        self._published_updates = 0   # agent.num_updates at the last save
+        self._published_at = 0.0
+        self._thread = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self.trained_records = 0
+        self.swaps = 0
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if not _fits(self.model_name.encode(), "model"):
+            print(f"Warning: model name {self.model_name!r} is longer than the feedback log's "
+                  f"{RECORD_DTYPE['model'].itemsize}-byte field; feedback will not be trained on.")
+            return
+        start_path = self.output_path if os.path.exists(self.output_path) else self.checkpoint_path
+        if self.adapters is None and not os.path.exists(start_path):
+            print(f"Warning: no checkpoint at {start_path}; feedback will be logged but not trained on.")
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(start_path,), name="feedback-trainer",
+                                        daemon=True)
+        self._thread.start()
+
+    def notify(self):
+        """Wakes the worker early; called after every append."""
+        self._wake.set()
+
+    def stop(self, timeout=30.0):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self, start_path):
+        if self.adapters is None:
+            # torch is only imported by the worker thread, never on the request path
+            from app.rl_engine.agents.dqn import DQNAgent
+            self.agent = DQNAgent(epsilon=0.0, batch_size=self.batch_size, train_freq=self.batch_size,
+                                  gradient_steps=self.gradient_steps, tau=self.tau)
+            self.agent.load(start_path)
+            self._published_updates = self.agent.num_updates
+            self._published_at = time.monotonic()
+            if start_path == self.output_path:
+                self._publish()
+
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.drain()
+                self.publish()
+            except Exception as e:
+                print(f"Feedback training error: {e}")
+        try:
+            self.publish(force=True)
+        except Exception as e:
+            print(f"Feedback training error: {e}")
+
+    def drain(self):
+        """Trains on everything currently in the log, one micro-batch at a time."""
+        while not self._stop.is_set():
+            records, cursor = self.log.read(self.max_records, self._read_cursor)
+            if len(records) == 0:
+                return
+            records = records[records["model"] == self.model_name.encode()]
+            if len(records) and self.adapters is not None:
+                self.train_adapters(records)
+                # Adapters are saved as they are fit, so their records are done
+                self.log.commit(cursor)
+            elif len(records):
+                self.train(records)
+            self._read_cursor = cursor
+
+    def publish(self, force=False):
+        """
+        Saves and publishes the fine-tuned weights if gradient updates have
+        happened since the last publish and `publish_interval` has passed
+        (or `force`), then commits the log up to what was trained on.
+
+        Returns:
+            bool: Whether new weights were published.
+        """
+        if self.agent is None or self._read_cursor is None:
+            return False
+        if self.agent.num_updates == self._published_updates:
+            # Nothing learned yet (e.g. fewer records than a batch): keep the
+            # records uncommitted so a restart trains on them again
+            return False
+        if not force and time.monotonic() - self._published_at < self.publish_interval:
+            return False
+        self._save()
+        self._publish()
+        self.log.commit(self._read_cursor)
+        self._published_updates = self.agent.num_updates
+        self._published_at = time.monotonic()
+        return True
+
+    def train(self, records):
+        transitions = feedback_transitions(records)
+        self.agent.remember_batch(*transitions)
+        self.agent.train_step(num_steps=len(records))
+        self.trained_records += len(records)
+
+    def train_adapters(self, records):
+        """Fits the adapter of every user in `records` on that user's records; the base model is frozen."""
+        model = self.registry.get(self.model_name)
+        if model is None:
+            # Raised so the records stay in the log until the model is served
+            raise RuntimeError(f"RL model '{self.model_name}' is not loaded")
+        for uid in np.unique(records["uid"]):
+            user_records = records[records["uid"] == uid]
+            uid = uid.decode()
+            adapter = self.adapters.get(model.name, uid, base_version=model.version)
+            adapter = fit_adapter(model.policy, feedback_transitions(user_records), adapter,
+                                  rank=self.adapter_rank, base_version=model.version)
+            self.adapters.put(model.name, uid, adapter)
+            self.trained_records += len(user_records)
+
+    def _save(self):
+        # DQNAgent.save writes to a temp file and renames, so readers never see a torn checkpoint
+        self.agent.save(self.output_path)
+
+    def _publish(self):
+        from app.rl_engine.export import numpy_weights
+        from app.rl_engine.numpy_policy import NumpyPolicy
+        policy = NumpyPolicy(*numpy_weights(self.agent.policy_net))
+        self.registry.swap(self.model_name, policy, self.output_path, policy_version(policy))
+        self.swaps += 1
+
+pending = PendingSuggestions()
+feedback_log = FeedbackLog(settings.FEEDBACK_DIR, max_bytes=settings.FEEDBACK_LOG_MAX_BYTES)
+trainer = FeedbackTrainer(
+    feedback_log, registry, settings.FEEDBACK_MODEL, settings.FEEDBACK_CHECKPOINT,
+    os.path.join(settings.FEEDBACK_DIR, f"{settings.FEEDBACK_MODEL}.pth"),
+    interval=settings.FEEDBACK_TRAIN_INTERVAL_SECONDS,
+    publish_interval=settings.FEEDBACK_PUBLISH_INTERVAL_SECONDS,
+    adapters=adapters if settings.FEEDBACK_PERSONALIZE else None,
+    adapter_rank=settings.ADAPTER_RANK
+)
@@ -1,43 +1,416 @@
-from google.cloud import firestore
 from app.config import settings
+from app.services.cache import MISSING, cache
+from app.services.columnar import columns
+from app.services.rollups import (
+    ROLLUP_COLLECTION, aggregate_transactions, increment_update, month_start, rollup_fields, rollup_id
+)
+from app.services.suggestions import SUGGESTION_COLLECTION
+import asyncio
+import base64
+import json
 import os
+import random
+import threading
+from datetime import datetime, timedelta, timezone
+
+# One marker document per committed bulk-write batch, so retries are idempotent
+BULK_WRITE_COLLECTION = "bulk_writes"
 
 class FirestoreService:
-    def __init__(self):
+    def __init__(self, client=None, cache=cache, columns=columns):
+        # The Firestore client is created on first use (or by the app's
+        # lifespan warm-up), so importing this module stays cheap
+        self._client = client
+        self._initialized = client is not None
+        self._lock = threading.Lock()
+        
+        # Reads are cached per user; every write invalidates that user's entries
+        self.cache = cache
+        # Per-user columnar transactions for analytics, kept current incrementally
+        self.columns = columns
+        self._column_reads = {}  # uid -> in-flight load/refresh task, shared by concurrent callers
+
+    @property
+    def db(self):
+        if not self._initialized:
+            with self._lock:
+                if not self._initialized:
+                    self._client = self._create_client()
+                    self._initialized = True
+        return self._client
+
+    def _create_client(self):
         # Initialize Firestore client
         # Checks for credentials file to allow local dev without crashing
         try:
             if os.path.exists(settings.FIREBASE_CREDENTIALS_PATH):
-                 self.db = firestore.Client.from_service_account_json(
+                from google.cloud import firestore
+                # AsyncClient so Firestore round-trips never block the event loop
+                return firestore.AsyncClient.from_service_account_json(
                     settings.FIREBASE_CREDENTIALS_PATH,
                     database=settings.FIRESTORE_DATABASE
                 )
-            else:
-                print(f"Warning: Credentials not found at {settings.FIREBASE_CREDENTIALS_PATH}. Firestore disabled.")
-                self.db = None
+            print(f"Warning: Credentials not found at {settings.FIREBASE_CREDENTIALS_PATH}. Firestore disabled.")
         except Exception as e:
             print(f"Error initializing Firestore: {e}")
-            self.db = None
+        return None
 
     async def get_user(self, uid: str):
         if not self.db: return None
-        doc = self.db.collection("users").document(uid).get()
-        return doc.to_dict() if doc.exists else None
+        key = ("user", uid)
+        user = self.cache.get(key)
+        if user is MISSING:
+            generation = self.cache.generation(uid)
+            doc = await self.db.collection("users").document(uid).get()
+            user = doc.to_dict() if doc.exists else None
+            self.cache.set(key, user, uid=uid, generation=generation)
+        return user
 
     async def create_user(self, uid: str, data: dict):
         if not self.db: return
-        self.db.collection("users").document(uid).set(data, merge=True)
+        batch = self.db.batch()
+        batch.set(self.db.collection("users").document(uid), data, merge=True)
+        batch.set(self._suggestion_ref(uid), stale_update(uid), merge=True)
+        await batch.commit()
+        self.cache.invalidate_user(uid)
+
+    def _rollup_ref(self, uid, period_start):
+        return self.db.collection(ROLLUP_COLLECTION).document(rollup_id(uid, period_start))
+
+    def _suggestion_ref(self, uid):
+        return self.db.collection(SUGGESTION_COLLECTION).document(uid)
 
     async def add_transaction(self, transaction_data: dict):
         if not self.db: return "mock-txn-id"
+        from google.cloud.firestore import SERVER_TIMESTAMP
         doc_ref = self.db.collection("transactions").document()
         transaction_data["transactionId"] = doc_ref.id
-        doc_ref.set(transaction_data)
+        transaction_data["createdAt"] = datetime.now(timezone.utc)
+        
+        # Write the transaction and bump its monthly rollup atomically
+        uid = transaction_data["userId"]
+        period_start = month_start(transaction_data["date"])
+        totals = aggregate_transactions([transaction_data])[(uid, period_start)]
+        
+        batch = self.db.batch()
+        # createdAt is the commit time, which incremental column refreshes watermark on
+        batch.set(doc_ref, {**transaction_data, "createdAt": SERVER_TIMESTAMP})
+        batch.set(self._rollup_ref(uid, period_start), increment_update(uid, period_start, totals), merge=True)
+        batch.set(self._suggestion_ref(uid), stale_update(uid), merge=True)
+        await batch.commit()
+        self.cache.invalidate_user(uid)
+        self.columns.append(uid, doc_ref.id, transaction_data)
         return doc_ref.id
 
+    async def add_transactions_bulk(self, transactions, chunk_size=500, concurrency=8, max_retries=5):
+        """
+        Writes many transactions using batched writes.
+        
+        Transactions are committed in WriteBatches of at most `chunk_size`
+        writes (Firestore's per-batch limit is 500), with at most
+        `concurrency` batches in flight. Each batch also carries the monthly
+        rollup increments for its transactions, so rollups stay in step, and
+        marks the users' precomputed suggestions stale.
+        
+        Transient errors are retried with jittered exponential backoff. Some
+        of them (deadline, unavailable, internal) can arrive after the batch
+        was committed, and replaying its rollup Increments would count the
+        transactions twice. So every batch also creates a marker document
+        in `bulk_writes` with an id fixed before the first attempt; if an
+        earlier attempt did land, the retry fails with AlreadyExists as a
+        whole and the chunk counts as written. Markers carry `expireAt` for
+        a Firestore TTL policy to clean them up.
+        
+        Returns:
+            int: Number of transactions written.
+        """
+        if not self.db: return 0
+        from google.api_core import exceptions as gexc
+        from google.cloud.firestore import SERVER_TIMESTAMP
+        retryable = (gexc.ServiceUnavailable, gexc.DeadlineExceeded, gexc.Aborted,
+                     gexc.ResourceExhausted, gexc.InternalServerError)
+        
+        collection = self.db.collection("transactions")
+        markers = self.db.collection(BULK_WRITE_COLLECTION)
+        refs = []
+        for txn in transactions:
+            doc_ref = collection.document(txn.get("transactionId"))
+            txn["transactionId"] = doc_ref.id
+            refs.append(doc_ref)
+        
+        # Split into chunks whose transaction + rollup + suggestion + marker writes fit in one batch
+        chunks = []
+        start, keys, uids = 0, set(), set()
+        for i, txn in enumerate(transactions):
+            key = (txn["userId"], month_start(txn["date"]))
+            if (i - start + 1) + len(keys | {key}) + len(uids | {key[0]}) + 1 > chunk_size:
+                chunks.append((start, i))
+                start, keys, uids = i, set(), set()
+            keys.add(key)
+            uids.add(key[0])
+        if start < len(transactions):
+            chunks.append((start, len(transactions)))
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def commit_chunk(start, end):
+            rollups = aggregate_transactions(transactions[start:end])
+            marker = markers.document()
+            now = datetime.now()
+            async with semaphore:
+                for attempt in range(max_retries + 1):
+                    batch = self.db.batch()
+                    batch.create(marker, {"createdAt": now, "expireAt": now + timedelta(days=7),
+                                          "transactions": end - start})
+                    for i in range(start, end):
+                        # Stamped at commit, not when the upload started (see get_transaction_columns)
+                        batch.set(refs[i], {**transactions[i], "createdAt": SERVER_TIMESTAMP})
+                    for (uid, period_start), totals in rollups.items():
+                        batch.set(self._rollup_ref(uid, period_start),
+                                  increment_update(uid, period_start, totals), merge=True)
+                    for uid in {uid for uid, _ in rollups}:
+                        batch.set(self._suggestion_ref(uid), stale_update(uid), merge=True)
+                    try:
+                        await batch.commit()
+                        return end - start
+                    except gexc.AlreadyExists:
+                        if attempt == 0:
+                            raise
+                        # An earlier attempt committed after all; nothing was applied twice
+                        return end - start
+                    except retryable as e:
+                        if attempt == max_retries:
+                            raise
+                        delay = min(30.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.5)
+                        print(f"Batch write failed ({e.__class__.__name__}), retrying in {delay:.1f}s...")
+                        await asyncio.sleep(delay)
+        
+        try:
+            written = await asyncio.gather(*(commit_chunk(start, end) for start, end in chunks))
+        finally:
+            # Invalidate even on partial failure: some chunks may have landed.
+            # Columns are dropped too, since re-uploaded IDs would otherwise be appended twice.
+            for uid in {txn["userId"] for txn in transactions}:
+                self.cache.invalidate_user(uid)
+                self.columns.invalidate(uid)
+        return sum(written)
+
+    async def get_budget_rollup(self, uid: str, period_start):
+        """The monthly rollup for the month starting at `period_start`, or None."""
+        if not self.db: return None
+        doc = await self._rollup_ref(uid, period_start).get()
+        return doc.to_dict() if doc.exists else None
+
+    async def get_budget_rollups(self, uid: str, start_date=None, end_date=None):
+        """Monthly rollups overlapping [start_date, end_date], oldest first."""
+        if not self.db: return []
+        
+        try:
+            query = self.db.collection(ROLLUP_COLLECTION).where("userId", "==", uid)
+            if start_date:
+                query = query.where("periodStart", ">=", month_start(start_date))
+            if end_date:
+                query = query.where("periodStart", "<=", end_date)
+            query = query.order_by("periodStart")
+            
+            return [doc.to_dict() async for doc in query.stream()]
+        except Exception as e:
+            print(f"Firestore query error: {e}")
+            return []
+
+    async def get_budget_rollups_bulk(self, uids, period_start):
+        """
+        Rollups of many users for the month starting at `period_start`, read
+        with one batched get.
+
+        Returns:
+            dict: uid -> rollup; users without one for the month are left out.
+        """
+        if not self.db: return {}
+        refs = [self._rollup_ref(uid, period_start) for uid in uids]
+        return {
+            doc.get("userId"): doc.to_dict()
+            async for doc in self.db.get_all(refs, field_paths=["userId", "actualSpent"])
+            if doc.exists
+        }
+
+    async def rebuild_budget_rollups(self, uid: str = None, chunk_size=500):
+        """
+        Recomputes rollups from raw transactions (all users, or just `uid`)
+        and deletes rollups for months that no longer have transactions.
+        
+        Transactions are streamed in userId order and each user's rollups
+        are written before the next user's transactions are read, so memory
+        holds one user's history at a time. The rebuild sets absolute totals:
+        an Increment from a write that lands between a user's read and their
+        commit is lost, so only run it while transaction writes are stopped.
+        
+        Returns:
+            tuple: (rollups written, stale rollups deleted)
+        """
+        if not self.db: return 0, 0
+        
+        transactions = self.db.collection("transactions")
+        if uid:
+            transactions = transactions.where("userId", "==", uid)
+        else:
+            transactions = transactions.order_by("userId")
+        
+        written = deleted = 0
+        rebuilt = set()
+        current, rows = uid, []
+        async for doc in transactions.stream():
+            txn = doc.to_dict()
+            if txn["userId"] != current:
+                if rows:
+                    counts = await self._rebuild_user_rollups(current, rows, chunk_size)
+                    written, deleted = written + counts[0], deleted + counts[1]
+                    rebuilt.add(current)
+                current, rows = txn["userId"], []
+            rows.append(txn)
+        if rows or uid:
+            counts = await self._rebuild_user_rollups(current, rows, chunk_size)
+            written, deleted = written + counts[0], deleted + counts[1]
+            rebuilt.add(current)
+        
+        if not uid:
+            # Rollups of users who no longer have any transactions
+            stale_refs = [doc.reference async for doc in self.db.collection(ROLLUP_COLLECTION).stream()
+                          if doc.get("userId") not in rebuilt]
+            await self._commit_writes([("delete", ref, None) for ref in stale_refs], chunk_size)
+            deleted += len(stale_refs)
+            self.cache.clear()
+        return written, deleted
+
+    async def _rebuild_user_rollups(self, uid, transactions, chunk_size):
+        """Replaces one user's rollups with totals of `transactions`; returns (written, deleted)."""
+        groups = aggregate_transactions(transactions)
+        fresh_ids = {rollup_id(uid, period_start) for _, period_start in groups}
+        rollups = self.db.collection(ROLLUP_COLLECTION).where("userId", "==", uid)
+        stale_refs = [doc.reference async for doc in rollups.stream() if doc.id not in fresh_ids]
+        
+        writes = []
+        for (_, period_start), totals in groups.items():
+            data = rollup_fields(uid, period_start)
+            data.update(totals)
+            data["updatedAt"] = datetime.now()
+            writes.append(("set", self._rollup_ref(uid, period_start), data))
+        writes.extend(("delete", ref, None) for ref in stale_refs)
+        await self._commit_writes(writes, chunk_size)
+        
+        self.cache.invalidate_user(uid)
+        return len(groups), len(stale_refs)
+
+    async def _commit_writes(self, writes, chunk_size):
+        """Commits ("set" | "delete", ref, data) writes in batches of `chunk_size`."""
+        for i in range(0, len(writes), chunk_size):
+            batch = self.db.batch()
+            for op, ref, data in writes[i:i + chunk_size]:
+                if op == "set":
+                    batch.set(ref, data)
+                else:
+                    batch.delete(ref)
+            await batch.commit()
+
+    async def list_users_page(self, page_size, start_after=None):
+        """
+        One page of users in document id order, with only their profile.
+
+        Args:
+            page_size (int): Maximum number of users.
+            start_after (str): uid of the last user of the previous page.
+
+        Returns:
+            list: (uid, user document) pairs.
+        """
+        if not self.db: return []
+        query = self.db.collection("users").order_by("__name__").select(["profile"]).limit(page_size)
+        if start_after:
+            query = query.start_after({"__name__": start_after})
+        return [(doc.id, doc.to_dict()) async for doc in query.stream()]
+
+    async def get_suggestions(self, uid: str):
+        """The user's precomputed suggestions document (see app.services.suggestions), or None."""
+        if not self.db: return None
+        key = ("suggestions", uid)
+        suggestions = self.cache.get(key)
+        if suggestions is MISSING:
+            generation = self.cache.generation(uid)
+            doc = await self._suggestion_ref(uid).get()
+            suggestions = doc.to_dict() if doc.exists else None
+            self.cache.set(key, suggestions, uid=uid, generation=generation)
+        return suggestions
+
+    async def get_suggestion_sequences(self, uids):
+        """
+        uid -> `writeSeq` of each user's suggestions document (0 if none),
+        read with one batched get.
+
+        Read before the data a suggestion is computed from: a write that
+        lands in between bumps the sequence past the recorded `basedOnSeq`.
+        """
+        if not self.db: return {}
+        refs = [self._suggestion_ref(uid) for uid in uids]
+        sequences = {uid: 0 for uid in uids}
+        async for doc in self.db.get_all(refs, field_paths=["writeSeq"]):
+            if doc.exists:
+                sequences[doc.id] = doc.get("writeSeq") or 0
+        return sequences
+
+    async def write_suggestions(self, documents, chunk_size=500, concurrency=8):
+        """
+        Writes users' precomputed suggestions using batched writes.
+
+        Documents are merged rather than replaced, so the `writeSeq` that
+        profile and transaction writes increment survives; a suggestion is
+        only current while its `basedOnSeq` still equals it.
+
+        Args:
+            documents (dict): uid -> suggestions document.
+
+        Returns:
+            int: Number of documents written.
+        """
+        if not self.db: return 0
+        items = list(documents.items())
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def commit_chunk(chunk):
+            async with semaphore:
+                batch = self.db.batch()
+                for uid, data in chunk:
+                    batch.set(self._suggestion_ref(uid), data, merge=True)
+                await batch.commit()
+                return len(chunk)
+        
+        try:
+            written = await asyncio.gather(*(
+                commit_chunk(items[i:i + chunk_size]) for i in range(0, len(items), chunk_size)
+            ))
+        finally:
+            for uid, _ in items:
+                self.cache.invalidate_user(uid)
+        return sum(written)
+
     async def get_transactions(self, uid: str, start_date=None, end_date=None):
+        """
+        A user's transactions with `date` in [start_date, end_date].
+
+        Results are cached per exact bounds, so only day- or month-aligned
+        bounds are cached; a range ending at datetime.now() would never be
+        asked for again.
+        """
         if not self.db: return []
         
+        key = ("transactions", uid, start_date, end_date)
+        cacheable = _aligned(start_date, end_date)
+        transactions = self.cache.get(key) if cacheable else MISSING
+        if transactions is not MISSING:
+            # Callers may sort/filter the list in place
+            return list(transactions)
+        
+        # Taken before reading, so a write that lands meanwhile keeps this read out of the cache
+        generation = self.cache.generation(uid)
         try:
             ref = self.db.collection("transactions")
             query = ref.where("userId", "==", uid)
@@ -47,10 +420,155 @@ class FirestoreService:
             if end_date:
                 query = query.where("date", "<=", end_date)
                 
-            docs = query.stream()
-            return [doc.to_dict() for doc in docs]
+            transactions = [doc.to_dict() async for doc in query.stream()]
         except Exception as e:
             print(f"Firestore query error: {e}")
             return []
+        
+        if cacheable:
+            self.cache.set(key, transactions, uid=uid, generation=generation)
+        return list(transactions)
+
+    async def get_transactions_page(self, uid: str, start_date=None, end_date=None, category=None,
+                                    limit=50, cursor=None):
+        """
+        Fetches one page of a user's transactions, newest first.
+
+        Filtering, ordering and the limit all run inside Firestore, so a page
+        costs O(limit) document reads however long the user's history is.
+        Two composite indexes on transactions must exist: (userId, date desc,
+        __name__ desc) for unfiltered pages and (userId, category, date desc,
+        __name__ desc) for pages filtered by category.
+
+        Args:
+            uid (str): Owner of the transactions.
+            start_date (datetime): Optional inclusive lower bound on `date`.
+            end_date (datetime): Optional inclusive upper bound on `date`.
+            category (str): Optional exact category filter.
+            limit (int): Page size.
+            cursor (str): `nextCursor` returned with the previous page.
+
+        Returns:
+            tuple: (transactions, next_cursor, total). next_cursor is None on the last page.
+        
+        Raises:
+            ValueError: If `cursor` is not a token produced by this method.
+            GoogleAPICallError: If Firestore rejects the query (e.g. FailedPrecondition
+                for a missing index) or is unavailable.
+        """
+        if not self.db: return [], None, 0
+        
+        query = self.db.collection("transactions").where("userId", "==", uid)
+        if category:
+            query = query.where("category", "==", category)
+        if start_date:
+            query = query.where("date", ">=", start_date)
+        if end_date:
+            query = query.where("date", "<=", end_date)
+        
+        # Document id breaks ties between transactions with the same date
+        page_query = query.order_by("date", direction="DESCENDING").order_by("__name__", direction="DESCENDING")
+        if cursor:
+            page_query = page_query.start_after(decode_cursor(cursor))
+        
+        # One extra row tells us whether another page exists
+        docs = [doc async for doc in page_query.limit(limit + 1).stream()]
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_cursor(docs[-1])
+        
+        return [doc.to_dict() for doc in docs], next_cursor, await self._count_transactions(query, uid, start_date, end_date, category)
+
+    async def _count_transactions(self, query, uid, start_date, end_date, category):
+        """
+        Count aggregation for `query`; cached (for aligned bounds) so paging
+        through a period only counts once.
+        """
+        key = ("transactionCount", uid, start_date, end_date, category)
+        cacheable = _aligned(start_date, end_date)
+        total = self.cache.get(key) if cacheable else MISSING
+        if total is MISSING:
+            generation = self.cache.generation(uid)
+            results = await query.count(alias="total").get()
+            total = int(results[0][0].value)
+            if cacheable:
+                self.cache.set(key, total, uid=uid, generation=generation)
+        return total
+
+    async def get_transaction_columns(self, uid: str):
+        """
+        The user's full transaction history as UserTransactions.
+        
+        The first call reads every transaction of the user (date, amount,
+        category only). Later calls are served from memory; once the entry is
+        older than the store's refresh interval, only transactions created
+        since the last read are fetched and appended. `createdAt` is a server
+        timestamp set at commit, so a row can't become visible with a
+        createdAt already behind the watermark (beyond clock skew, which the
+        store's overlap window covers).
+        
+        The first load costs one document read per transaction the user has
+        ever made, so this is meant for analytics that need individual
+        transactions; monthly summaries and history read the rollups instead. Concurrent calls
+        for the same user share one Firestore read. The refresh query needs
+        a composite index on transactions (userId, createdAt).
+        
+        Returns:
+            UserTransactions, or None if Firestore is unavailable.
+        """
+        if not self.db: return None
+        
+        entry = self.columns.get(uid)
+        if entry is not None and not self.columns.needs_refresh(entry):
+            return entry.columns
+        
+        read = self._column_reads.get(uid)
+        if read is None:
+            read = asyncio.ensure_future(self._read_transaction_columns(uid, entry))
+            self._column_reads[uid] = read
+            read.add_done_callback(lambda _: self._column_reads.pop(uid, None))
+        # Shielded, so one caller going away doesn't cancel the read for the others
+        return await asyncio.shield(read)
+    
+    async def _read_transaction_columns(self, uid, entry):
+        # Taken before the read, so rows committed while it runs are caught next time
+        synced_at = datetime.now(timezone.utc)
+        query = self.db.collection("transactions").where("userId", "==", uid)
+        if entry is not None:
+            query = query.where("createdAt", ">=", entry.synced_at - timedelta(seconds=self.columns.overlap))
+        
+        try:
+            query = query.select(["date", "amount", "category", "createdAt"])
+            rows = [(doc.id, doc.to_dict()) async for doc in query.stream()]
+        except Exception as e:
+            print(f"Firestore query error: {e}")
+            return entry.columns if entry is not None else None
+        
+        if entry is None:
+            return self.columns.load(uid, rows, synced_at).columns
+        self.columns.merge(entry, rows, synced_at)
+        return entry.columns
+
+def _aligned(*bounds):
+    """Whether date bounds are whole seconds (e.g. day or month edges) rather than a datetime.now()."""
+    return all(bound is None or bound.microsecond in (0, 999999) for bound in bounds)
+
+def stale_update(uid):
+    """A merge-set payload marking a user's precomputed suggestions as out of date."""
+    from google.cloud.firestore import Increment
+    return {"userId": uid, "stale": True, "writeSeq": Increment(1)}
+
+def encode_cursor(snapshot):
+    """Opaque page token for the (date, document id) position of `snapshot`."""
+    payload = {"date": snapshot.get("date").isoformat(), "id": snapshot.id}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+def decode_cursor(token):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+        return {"date": datetime.fromisoformat(payload["date"]), "__name__": payload["id"]}
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {token!r}") from e
 
 db = FirestoreService()
\ No newline at end of file
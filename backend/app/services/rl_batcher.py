@@ -0,0 +1,104 @@
+import asyncio
+import numpy as np
+from app.config import settings
+
+class SuggestionBatcher:
+    """
+    Dynamic micro-batcher for policy forward passes.
+
+    Concurrent requests enqueue their state and await a future. A single
+    background task collects pending states for up to `max_wait_ms` or
+    `max_batch_size` requests, runs one batched forward pass per model and
+    resolves every caller's future. Requests with different per-user
+    adapters still share their model's forward pass.
+    """
+    def __init__(self, max_wait_ms=2.0, max_batch_size=64):
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._queue = None
+        self._task = None
+        
+        # Stats for load testing
+        self.batches = 0
+        self.items = 0
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        
+        # Fail anything still waiting so no caller hangs
+        while not self._queue.empty():
+            *_, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Suggestion batcher stopped"))
+
+    async def q_values(self, model, state, adapter=None):
+        """Q-values for a single state (optionally with the user's Adapter), computed as part of a batch."""
+        if not self.running:
+            return model.q_values(state.reshape(1, -1), [adapter])[0]
+        
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((model, state, adapter, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            
+            while len(batch) < self.max_batch_size:
+                # Take whatever is already queued before waiting for more
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            self._flush(batch)
+
+    def _flush(self, batch):
+        by_model = {}
+        for model, state, adapter, future in batch:
+            by_model.setdefault(model, []).append((state, adapter, future))
+        
+        for model, entries in by_model.items():
+            try:
+                q_values = model.q_values(np.stack([state for state, _, _ in entries]),
+                                          [adapter for _, adapter, _ in entries])
+            except Exception as e:
+                for _, _, future in entries:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            
+            for (_, _, future), q in zip(entries, q_values):
+                if not future.done():
+                    future.set_result(q)
+        
+        self.batches += 1
+        self.items += len(batch)
+
+batcher = SuggestionBatcher(
+    max_wait_ms=settings.RL_BATCH_MAX_WAIT_MS,
+    max_batch_size=settings.RL_BATCH_MAX_SIZE
+)
@@ -0,0 +1,173 @@
+import hashlib
+import os
+import time
+import numpy as np
+from app.rl_engine.adapters import adapted_q_values
+from app.rl_engine.numpy_policy import NumpyPolicy
+from app.rl_engine.state import ALLOCATION_KEYS, ACTION_NAMES, apply_actions
+
+class TorchPolicy:
+    """Runs a DQN policy network under torch.inference_mode()."""
+    def __init__(self, policy_net):
+        import torch
+        self._torch = torch
+        self.policy_net = policy_net
+        from app.rl_engine.export import numpy_weights
+        # NumPy copies of the layers, for the output layer and for policy_version()
+        self.weights, self.biases = numpy_weights(policy_net)
+        self.output_layer = (self.weights[-1], self.biases[-1])
+
+    @classmethod
+    def load(cls, path, state_dim=10, action_dim=9):
+        # torch is only imported when a .pth checkpoint is actually served
+        from app.rl_engine.export import load_policy_net
+        return cls(load_policy_net(path, state_dim, action_dim))
+
+    def q_values(self, states):
+        with self._torch.inference_mode():
+            return self.policy_net(self._torch.from_numpy(states)).numpy()
+
+    def features(self, states):
+        with self._torch.inference_mode():
+            return self.policy_net.net[:-1](self._torch.from_numpy(states)).numpy()
+
+def policy_version(policy):
+    """
+    Short content hash of a policy's weights.
+
+    Only the weights are hashed, not the file they came from, so the same
+    weights get the same version whether served from a .pth, an .npz or an
+    artifact, and training state (optimizer, counters) never changes it.
+    """
+    digest = hashlib.sha256()
+    for array in [*policy.weights, *policy.biases]:
+        digest.update(np.ascontiguousarray(array, dtype=np.float32).tobytes())
+    return digest.hexdigest()[:12]
+
+class LoadedModel:
+    """A warm policy ready for inference."""
+    def __init__(self, name, path, policy, version=None):
+        self.name = name
+        self.path = path
+        self.policy = policy
+        # Stamped on precomputed suggestions so they are ignored once the model changes
+        self.version = version
+        self.loaded_at = time.time()
+
+    def q_values(self, states, adapters=None):
+        """
+        Q-values for a (batch, state_dim) float32 array.
+
+        Args:
+            adapters (list): Optional per-row Adapter (or None for the base
+                model), so users with different adapters share one forward pass.
+        """
+        if adapters is None or not any(adapter is not None for adapter in adapters):
+            return self.policy.q_values(states)
+        weight, bias = self.policy.output_layer
+        return adapted_q_values(self.policy.features(states), weight, bias, adapters)
+
+class ModelRegistry:
+    """
+    Loads DQN checkpoints once (at startup) and keeps them in memory.
+
+    Request handlers only ever look models up; they never touch the disk.
+    """
+    def __init__(self):
+        self._models = {}
+
+    def load(self, name, path, state_dim=10, action_dim=9):
+        # Artifacts (directories) and exported .npz weights run on pure NumPy; .pth checkpoints need torch
+        if os.path.isdir(path):
+            from app.rl_engine.artifacts import load_artifact
+            artifact = load_artifact(path)
+            policy = artifact.numpy_policy()
+            return self.swap(name, policy, artifact.path, policy_version(policy), artifact.manifest["state_dim"])
+        if path.endswith(".npz"):
+            policy = NumpyPolicy.load(path)
+        else:
+            policy = TorchPolicy.load(path, state_dim, action_dim)
+
+        return self.swap(name, policy, path, policy_version(policy), state_dim)
+
+    def swap(self, name, policy, path=None, version=None, state_dim=10):
+        """
+        Publishes `policy` under `name`, replacing any model already served.
+
+        The swap is a single dict assignment, so requests (and batches already
+        in flight) see either the old or the new model, never a mix.
+        """
+        model = LoadedModel(name, path, policy, version)
+        # Warm-up pass so the first real request doesn't pay for lazy init
+        model.q_values(np.zeros((1, state_dim), dtype=np.float32))
+        self._models[name] = model
+        return model
+
+    def load_all(self, model_paths):
+        for name, path in model_paths.items():
+            if not os.path.exists(path):
+                print(f"Warning: RL model '{name}' not found at {path}. Skipping.")
+                continue
+            try:
+                self.load(name, path)
+                print(f"Loaded RL model '{name}' from {path}")
+            except Exception as e:
+                print(f"Error loading RL model '{name}' from {path}: {e}")
+
+    def get(self, name):
+        return self._models.get(name)
+
+    def names(self):
+        return list(self._models)
+
+def _softmax(x):
+    z = np.exp(x - x.max())
+    return z / z.sum()
+
+def _as_percentages(allocation):
+    return {key: round(float(v) * 100, 1) for key, v in zip(ALLOCATION_KEYS, allocation)}
+
+def suggest(model, state, allocation, monthly_income=0.0):
+    """
+    Runs the policy on a single state and formats the suggestion payload.
+
+    Args:
+        model (LoadedModel): Warm model from the registry.
+        state (np.ndarray): 10-dim observation.
+        allocation (np.ndarray): The current 7-slot allocation the state was built from.
+        monthly_income (float): Used to express the savings change in currency.
+    """
+    q_values = model.q_values(state.reshape(1, -1))[0]
+    return format_suggestion(model.name, q_values, allocation, monthly_income)
+
+def format_suggestion(model_name, q_values, allocation, monthly_income=0.0):
+    action = int(q_values.argmax())
+    confidence = float(_softmax(q_values)[action])
+
+    suggested = allocation.reshape(1, -1).copy()
+    apply_actions(suggested, [action])
+    suggested = suggested[0] / suggested[0].sum()
+
+    current_pct = _as_percentages(allocation)
+    suggested_pct = _as_percentages(suggested)
+    delta_pct = {key: round(suggested_pct[key] - current_pct[key], 1) for key in ALLOCATION_KEYS}
+
+    savings_increase = float(suggested[0] - allocation[0])
+    reasoning = f"{ACTION_NAMES[action]}."
+    if monthly_income > 0 and savings_increase > 0:
+        reasoning += f" This could increase monthly savings by ₹{savings_increase * monthly_income:,.0f}."
+
+    return {
+        "actionId": action,
+        "action": ACTION_NAMES[action],
+        "qValues": [round(float(q), 4) for q in q_values],
+        "currentAllocation": current_pct,
+        "suggestedAllocation": suggested_pct,
+        "deltaAllocation": delta_pct,
+        "expectedSavingsIncrease": round(savings_increase, 4),
+        "confidence": round(confidence, 4),
+        "reasoning": reasoning,
+        "modelType": model_name,
+    }
+
+registry = ModelRegistry()
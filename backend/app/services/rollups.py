@@ -0,0 +1,89 @@
+"""
+Per-user, per-month spending rollups stored in the `budgets` collection.
+
+Each rollup document (`{uid}_{YYYY-MM}`) holds the month's `totalSpent`,
+`transactionCount` and per-category `actualSpent`. Writes keep them up to
+date incrementally; `python -m app.services.rollups` rebuilds them from the
+raw transactions (backfill / repair). The rebuild overwrites totals, so run
+it only while transaction writes are stopped.
+"""
+import asyncio
+import argparse
+import calendar
+import sys
+from datetime import datetime
+
+ROLLUP_COLLECTION = "budgets"
+
+def month_start(date):
+    """First instant of the month containing `date` (datetime or "YYYY-MM-DD" string)."""
+    if isinstance(date, str):
+        return datetime.strptime(date[:7], "%Y-%m")
+    return datetime(date.year, date.month, 1)
+
+def rollup_id(uid, period_start):
+    return f"{uid}_{period_start.strftime('%Y-%m')}"
+
+def period_bounds(period_start):
+    _, last_day = calendar.monthrange(period_start.year, period_start.month)
+    period_end = period_start.replace(day=last_day, hour=23, minute=59, second=59, microsecond=999999)
+    return period_start, period_end
+
+def rollup_fields(uid, period_start):
+    """The static (non-aggregate) fields of a rollup document."""
+    start, end = period_bounds(period_start)
+    return {
+        "budgetId": rollup_id(uid, period_start),
+        "userId": uid,
+        "periodStart": start,
+        "periodEnd": end,
+        "periodType": "monthly",
+    }
+
+def aggregate_transactions(transactions):
+    """
+    Groups transactions by (userId, month).
+
+    Returns:
+        dict: (uid, period_start) -> {"totalSpent", "transactionCount", "actualSpent": {category: amount}}
+    """
+    groups = {}
+    for txn in transactions:
+        key = (txn["userId"], month_start(txn["date"]))
+        amount = float(txn.get("amount", 0))
+        category = txn.get("category", "other")
+
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {"totalSpent": 0.0, "transactionCount": 0, "actualSpent": {}}
+        group["totalSpent"] += amount
+        group["transactionCount"] += 1
+        group["actualSpent"][category] = group["actualSpent"].get(category, 0.0) + amount
+    return groups
+
+def increment_update(uid, period_start, totals):
+    """A merge-set payload that adds `totals` to a rollup with Firestore Increment transforms."""
+    from google.cloud.firestore import Increment
+
+    data = rollup_fields(uid, period_start)
+    data["totalSpent"] = Increment(totals["totalSpent"])
+    data["transactionCount"] = Increment(totals["transactionCount"])
+    data["actualSpent"] = {cat: Increment(amount) for cat, amount in totals["actualSpent"].items()}
+    data["updatedAt"] = datetime.now()
+    return data
+
+async def main():
+    parser = argparse.ArgumentParser(description="Rebuild monthly budget rollups from raw transactions.")
+    parser.add_argument("--uid", help="Only rebuild this user's rollups (default: all users)")
+    args = parser.parse_args()
+
+    from app.services.firestore_service import db
+    if not db.db:
+        print("Error: Firestore not initialized. Check credentials.")
+        sys.exit(1)
+
+    written, deleted = await db.rebuild_budget_rollups(args.uid)
+    print(f"Rebuilt {written} rollups, removed {deleted} stale rollups.")
+
+if __name__ == "__main__":
+    asyncio.run(main())
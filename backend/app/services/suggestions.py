@@ -0,0 +1,229 @@
+"""
+Precomputed RL suggestions, one document per user in the `suggestions` collection.
+
+Each document (`{uid}`) holds the `period` ("YYYY-MM") it was computed for,
+a `stale` flag and a `writeSeq` counter that every write to the user's
+profile or transactions sets and increments, the `writeSeq` value read
+before the user's data (`basedOnSeq`), the `state` the suggestions were
+computed from (kept for feedback), and per
+model the suggestion plus the `modelVersion` of the weights and the
+`adapterVersion` of the user's adapter (if any) that produced it.
+`/api/rl/suggest` serves a document that is still current for the model
+and month, and falls back to on-demand inference otherwise.
+
+`python -m app.services.suggestions` (re)computes them for all users:
+1. Users are streamed from the `users` collection in pages.
+2. Each page's write sequences, then its monthly rollups, are fetched with
+   one batched get each, and the rollups are turned into states in bulk.
+3. Every loaded model runs one forward pass over the whole page.
+4. Suggestions are written with batched writes while the next page is read.
+   After each page the last written uid is checkpointed, so an interrupted
+   run resumes where it stopped.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime
+import numpy as np
+from app.rl_engine.state import RISK_MAP, SPENDING_CATEGORIES, allocations_from_spending, build_states
+from app.services.columnar import CATEGORY_CODES, OTHER_CODE
+from app.services.rl_service import format_suggestion
+
+SUGGESTION_COLLECTION = "suggestions"
+
+def period_key(date):
+    return date.strftime("%Y-%m")
+
+def current_suggestion(document, model, period, adapter=None):
+    """
+    The precomputed suggestion for `model` in a suggestions document, or None
+    if there is none or it is stale, for another month, or from another
+    version of the model or of the user's `adapter`.
+
+    A write that landed while the document was being computed leaves
+    `writeSeq` ahead of `basedOnSeq`, even though the precompute job then
+    cleared `stale`.
+    """
+    if not document or document.get("stale") or document.get("period") != period:
+        return None
+    if document.get("basedOnSeq", 0) != document.get("writeSeq", 0):
+        return None
+    entry = (document.get("models") or {}).get(model.name)
+    if not entry or entry.get("modelVersion") != model.version:
+        return None
+    if entry.get("adapterVersion") != (adapter.version if adapter is not None else None):
+        return None
+    return entry.get("suggestion")
+
+def page_states(users, rollups, period_start):
+    """
+    Builds the states of a page of users from their monthly rollups.
+
+    Args:
+        users (list): (uid, user document) pairs.
+        rollups (dict): uid -> rollup document of the period; users without
+            one have no spending yet.
+        period_start (datetime): First day of the suggestion month.
+
+    Returns:
+        tuple: (states (N, 10), allocations (N, 7), monthly incomes (N,)).
+    """
+    incomes = np.zeros(len(users), dtype=np.float32)
+    risks = np.zeros(len(users), dtype=np.float32)
+    spent = np.zeros((len(users), len(SPENDING_CATEGORIES)), dtype=np.float32)
+
+    for i, (uid, user) in enumerate(users):
+        profile = (user or {}).get("profile") or {}
+        incomes[i] = float(profile.get("monthlyIncome", 0))
+        risks[i] = RISK_MAP.get(profile.get("riskPreference", "moderate"), 0.5)
+        # Unknown categories count as "other", as in the columnar store
+        for category, amount in ((rollups.get(uid) or {}).get("actualSpent") or {}).items():
+            spent[i, CATEGORY_CODES.get(category, OTHER_CODE)] += float(amount)
+
+    allocations = allocations_from_spending(incomes, spent)
+    return build_states(allocations, risks, (period_start.month - 1) / 12), allocations, incomes
+
+def suggestion_documents(users, rollups, models, period_start, adapters=None, sequences=None):
+    """
+    uid -> suggestions document for a page of users, with one forward pass
+    per model. Users' adapters from the optional AdapterStore `adapters` are
+    applied within that same pass.
+
+    Args:
+        sequences (dict): uid -> `writeSeq` read before `rollups`; recorded
+            as `basedOnSeq`.
+    """
+    states, allocations, incomes = page_states(users, rollups, period_start)
+    computed_at = datetime.now()
+    documents = {
+        uid: {"userId": uid, "period": period_key(period_start), "stale": False,
+              "basedOnSeq": (sequences or {}).get(uid, 0), "computedAt": computed_at,
+              "state": state.tolist(), "models": {}}
+        for (uid, _), state in zip(users, states)
+    }
+
+    for model in models:
+        user_adapters = [adapters.get(model.name, uid, model.version) if adapters else None for uid, _ in users]
+        q_values = model.q_values(states, user_adapters)
+        rows = zip(users, q_values, allocations, incomes, user_adapters)
+        for (uid, _), q, allocation, income, adapter in rows:
+            documents[uid]["models"][model.name] = {
+                "modelVersion": model.version,
+                "adapterVersion": adapter.version if adapter is not None else None,
+                "suggestion": format_suggestion(model.name, q, allocation, float(income)),
+            }
+    return documents
+
+def load_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def save_checkpoint(path, checkpoint):
+    """Writes the checkpoint atomically, so a crash never leaves a torn file."""
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+async def precompute_suggestions(db, models, period_start, page_size=1000, checkpoint_path=None, restart=False,
+                                 adapters=None):
+    """
+    Computes and stores suggestions for every user.
+
+    Args:
+        db (FirestoreService): Source of users and rollups, target of the suggestions.
+        models (list): LoadedModels to compute suggestions for.
+        period_start (datetime): First day of the suggestion month.
+        page_size (int): Users per page (and per forward pass).
+        checkpoint_path (str): Optional JSON file recording progress. A run
+            for the same month and model versions resumes after its cursor.
+        restart (bool): Ignore an existing checkpoint.
+        adapters (AdapterStore): Optional per-user adapters to apply.
+
+    Returns:
+        int: Number of users written by this run.
+    """
+    period = period_key(period_start)
+    versions = {model.name: model.version for model in models}
+
+    cursor, done = None, 0
+    checkpoint = None if restart else load_checkpoint(checkpoint_path)
+    if checkpoint and not checkpoint.get("complete") and checkpoint.get("period") == period \
+            and checkpoint.get("versions") == versions:
+        cursor, done = checkpoint["cursor"], checkpoint["processed"]
+        print(f"Resuming after user {cursor} ({done} users already done)")
+
+    def record(cursor, processed, complete=False):
+        if checkpoint_path:
+            save_checkpoint(checkpoint_path, {
+                "period": period, "versions": versions, "cursor": cursor,
+                "processed": processed, "complete": complete, "updatedAt": datetime.now().isoformat(),
+            })
+
+    start = time.perf_counter()
+    written = 0
+    write, write_cursor = None, None
+    while True:
+        # 1. Read and compute the next page while the previous one is being written
+        users = await db.list_users_page(page_size, cursor)
+        if users:
+            uids = [uid for uid, _ in users]
+            # Sequences first: any write after this read invalidates the page's documents
+            sequences = await db.get_suggestion_sequences(uids)
+            rollups = await db.get_budget_rollups_bulk(uids, period_start)
+            documents = suggestion_documents(users, rollups, models, period_start, adapters, sequences)
+
+        # 2. Only checkpoint a page once its writes have landed
+        if write is not None:
+            written += await write
+            record(write_cursor, done + written)
+            elapsed = time.perf_counter() - start
+            print(f"  {done + written} users done ({written / elapsed:,.0f} users/s)")
+
+        if not users:
+            break
+        cursor = users[-1][0]
+        write, write_cursor = asyncio.create_task(db.write_suggestions(documents)), cursor
+
+    record(cursor, done + written, complete=True)
+    return written
+
+async def main():
+    parser = argparse.ArgumentParser(description="Precompute RL suggestions for all users.")
+    parser.add_argument("--period", help="Suggestion month as YYYY-MM (default: current month)")
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--checkpoint", default="suggestions_checkpoint.json",
+                        help="Progress file used to resume an interrupted run")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start over")
+    args = parser.parse_args()
+
+    from app.config import settings
+    from app.services.adapters import adapters
+    from app.services.firestore_service import db
+    from app.services.rl_service import ModelRegistry
+    if not db.db:
+        print("Error: Firestore not initialized. Check credentials.")
+        sys.exit(1)
+
+    registry = ModelRegistry()
+    registry.load_all(settings.RL_MODELS)
+    models = [registry.get(name) for name in registry.names()]
+    if not models:
+        print("Error: no RL models could be loaded.")
+        sys.exit(1)
+
+    now = datetime.now()
+    period_start = datetime.strptime(args.period, "%Y-%m") if args.period else datetime(now.year, now.month, 1)
+    written = await precompute_suggestions(db, models, period_start, args.page_size, args.checkpoint, args.restart,
+                                           adapters)
+    print(f"Wrote suggestions for {written} users ({period_key(period_start)}).")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+"""
+Per-user adapters: size, mixed-adapter batching and on-demand loading.
+
+Fits `--users` adapters on random feedback with the base policy frozen,
+then reports:
+  - bytes per user: adapter file vs. a full DQNAgent checkpoint
+  - one forward pass over a batch where every row has its own adapter,
+    vs. the base model alone and vs. one forward pass per user (and checks
+    the batched Q-values match the per-user ones)
+  - AdapterStore.get latency from disk (cold) and from the LRU (warm)
+
+Usage (from backend/):
+    python -m benchmarks.adapters --users 64 --rank 4
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from app.rl_engine.adapters import fit_adapter
+from app.services.adapters import AdapterStore
+from app.services.feedback import RECORD_DTYPE, feedback_transitions
+from app.services.rl_service import ModelRegistry
+
+NPZ_PATH = "models/dqn_test.npz"
+CHECKPOINT_PATH = "models/dqn_test.pth"
+
+
+def random_records(rng, count):
+    records = np.zeros(count, dtype=RECORD_DTYPE)
+    allocations = rng.dirichlet(np.ones(7), size=count).astype(np.float32)
+    records["state"][:, 0] = allocations[:, 0]
+    records["state"][:, 1] = 1.0
+    records["state"][:, 2:8] = allocations[:, 1:]
+    records["state"][:, 8] = rng.choice([0.0, 0.5, 1.0], size=count)
+    records["state"][:, 9] = rng.integers(12, size=count) / 12
+    records["action"] = rng.integers(9, size=count)
+    records["reward"] = rng.choice([-10.0, 10.0], size=count)
+    return records
+
+
+def per_call(fn, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return (time.perf_counter() - start) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=64)
+    parser.add_argument("--rank", type=int, default=4)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    model = ModelRegistry().load("dqn", NPZ_PATH)
+    store = AdapterStore(tempfile.mkdtemp(), max_adapters=args.users)
+
+    uids = [f"user_{i:05d}" for i in range(args.users)]
+    start = time.perf_counter()
+    for uid in uids:
+        adapter = fit_adapter(model.policy, feedback_transitions(random_records(rng, 8)), rank=args.rank,
+                              base_version=model.version)
+        store.put(model.name, uid, adapter)
+    print(f"Fit {args.users} adapters in {time.perf_counter() - start:.2f}s")
+
+    adapter_bytes = os.path.getsize(store.path(model.name, uids[0]))
+    print(f"Bytes per user: adapter {adapter_bytes:,} vs full checkpoint {os.path.getsize(CHECKPOINT_PATH):,}")
+
+    # Mixed batch: every row has a different adapter
+    states = random_records(rng, args.users)["state"]
+    user_adapters = [store.get(model.name, uid, model.version) for uid in uids]
+    batched = model.q_values(states, user_adapters)
+    separate = np.stack([model.q_values(states[i:i + 1], [user_adapters[i]])[0] for i in range(args.users)])
+    assert np.allclose(batched, separate, atol=1e-4), np.abs(batched - separate).max()
+    changed = (batched.argmax(1) != model.q_values(states).argmax(1)).mean()
+    print(f"Batched Q-values match per-user passes; adapters change the action for {changed:.0%} of rows")
+
+    base_t = per_call(lambda: model.q_values(states), args.number)
+    mixed_t = per_call(lambda: model.q_values(states, user_adapters), args.number)
+    separate_t = per_call(lambda: [model.q_values(states[i:i + 1], [user_adapters[i]])
+                                   for i in range(args.users)], max(1, args.number // 10))
+    print(f"\n{'forward pass over ' + str(args.users) + ' users':<34} {'us/batch':>10}")
+    print(f"{'base model only':<34} {base_t * 1e6:>10.1f}")
+    print(f"{'one batch, mixed adapters':<34} {mixed_t * 1e6:>10.1f}")
+    print(f"{'one pass per user':<34} {separate_t * 1e6:>10.1f}")
+
+    # On-demand loading
+    cold_store = AdapterStore(store.directory, max_adapters=args.users)
+    cold = per_call(lambda: [cold_store.get(model.name, uid) for uid in uids], 1) / args.users
+    warm = per_call(lambda: [cold_store.get(model.name, uid) for uid in uids], args.number) / args.users
+    print(f"\nAdapterStore.get: cold (disk) {cold * 1e6:.1f}us, warm (LRU) {warm * 1e6:.2f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Model artifact loading: versioned safetensors artifact vs. legacy formats.
+
+Imports the DQNAgent checkpoint into a temporary artifact registry, then
+reports the time for ModelRegistry.load to serve each format, the bytes a
+serving process has to read, and checks all formats give the same Q-values.
+
+Usage (from backend/):
+    python -m benchmarks.artifacts --number 50
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from app.rl_engine.agents.dqn import DQNAgent
+from app.rl_engine.artifacts import POLICY_FILE, ArtifactRegistry
+from app.services.rl_service import ModelRegistry
+
+NPZ_PATH = "models/dqn_test.npz"
+CHECKPOINT_PATH = "models/dqn_test.pth"
+
+
+def per_call(fn, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return (time.perf_counter() - start) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=50)
+    args = parser.parse_args()
+
+    agent = DQNAgent()
+    agent.load(CHECKPOINT_PATH)
+    artifacts = ArtifactRegistry(tempfile.mkdtemp())
+    manifest = artifacts.save("dqn", agent, metrics={"imported_from": CHECKPOINT_PATH})
+    artifact_dir = artifacts.model_dir("dqn")
+
+    registry = ModelRegistry()
+    formats = [
+        (".pth checkpoint (torch.load)", CHECKPOINT_PATH, os.path.getsize(CHECKPOINT_PATH)),
+        (".npz export", NPZ_PATH, os.path.getsize(NPZ_PATH)),
+        ("artifact (mmap safetensors)", artifact_dir, manifest["files"][POLICY_FILE]["bytes"]),
+    ]
+
+    states = np.random.default_rng(0).random((64, 10), dtype=np.float32)
+    reference = registry.load("reference", CHECKPOINT_PATH).q_values(states)
+    print(f"{'format':<30} {'bytes read':>11} {'load ms':>9}")
+    for label, path, size in formats:
+        model = registry.load("dqn", path)
+        assert np.allclose(model.q_values(states), reference, atol=1e-4), label
+        elapsed = per_call(lambda: registry.load("dqn", path), args.number)
+        print(f"{label:<30} {size:>11,} {elapsed * 1e3:>9.2f}")
+
+    # Rollback is a pointer swap; the next load serves the previous version
+    artifacts.save("dqn", agent, resume=False)
+    start = time.perf_counter()
+    version = artifacts.rollback("dqn")
+    model = registry.load("dqn", artifact_dir)
+    print(f"\nRolled back to {version} and reloaded in {(time.perf_counter() - start) * 1e3:.2f} ms "
+          f"(serving {model.path})")
+
+
+if __name__ == "__main__":
+    main()
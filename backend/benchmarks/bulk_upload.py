@@ -0,0 +1,75 @@
+"""
+Bulk transaction ingestion against the in-memory Firestore stand-in.
+
+Compares the old one-document-per-round-trip upload (timed on a sample and
+extrapolated) with FirestoreService.add_transactions_bulk on the full set,
+optionally injecting transient commit failures to exercise the retries.
+With --ambiguous the failures happen after the batch was applied, and the
+rollups are checked for double counting.
+
+Usage (from backend/):
+    python -m benchmarks.bulk_upload --rows 100000 --latency-ms 20 --fail-rate 0.01 [--ambiguous]
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from app.rl_engine.data_generator import generate_synthetic_data
+from app.services.firestore_service import FirestoreService
+from app.services.rollups import ROLLUP_COLLECTION, aggregate_transactions
+from benchmarks.firestore_standin import StandinAsyncClient
+
+
+def synthetic_transactions(rows):
+    # ~35 transactions per user-month
+    num_users = max(1, rows // (35 * 12))
+    df = generate_synthetic_data(num_users=num_users, months_per_user=12, output_path="/tmp/bench_bulk.csv")
+    df = df.head(rows).copy()
+    df["date"] = pd.to_datetime(df["date"], format="%Y-%m-%d")
+    df["source"] = "synthetic"
+    return df.to_dict("records")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--ambiguous", action="store_true", help="Inject failures after the commit applied")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--sample", type=int, default=200, help="Rows timed for the one-by-one baseline")
+    args = parser.parse_args()
+
+    transactions = synthetic_transactions(args.rows)
+    latency = args.latency_ms / 1000
+
+    # Baseline: one awaited add_transaction per row
+    service = FirestoreService(client=StandinAsyncClient(latency=latency))
+    start = time.perf_counter()
+    for txn in transactions[:args.sample]:
+        await service.add_transaction(dict(txn))
+    per_row = (time.perf_counter() - start) / args.sample
+    print(f"one-by-one: {per_row * 1000:.2f} ms/row -> ~{per_row * len(transactions) / 60:.1f} min "
+          f"for {len(transactions)} rows (extrapolated)")
+
+    # Batched writes
+    client = StandinAsyncClient(latency=latency, fail_rate=args.fail_rate, ambiguous=args.ambiguous)
+    service = FirestoreService(client=client)
+    start = time.perf_counter()
+    written = await service.add_transactions_bulk(transactions, concurrency=args.concurrency)
+    elapsed = time.perf_counter() - start
+    stored = len(client.store.collection("transactions"))
+    print(f"bulk:       {elapsed:.2f} s for {written} rows "
+          f"({written / elapsed:,.0f} rows/s, {client.store.round_trips} round-trips, {stored} docs stored)")
+
+    expected = sum(totals["totalSpent"] for totals in aggregate_transactions(transactions).values())
+    rolled_up = sum(doc["totalSpent"] for doc in client.store.collection(ROLLUP_COLLECTION).values())
+    assert abs(rolled_up - expected) <= 1e-6 * max(1.0, expected), (rolled_up, expected)
+    print(f"rollups:    totalSpent {rolled_up:,.2f} matches the transactions")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
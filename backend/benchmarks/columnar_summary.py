@@ -0,0 +1,85 @@
+"""
+Per-dict loop vs. columnar aggregation for the budget analytics endpoints.
+
+Builds a synthetic multi-year history for one user and times the category
+summary and monthly history both ways: the previous per-row Python loop
+(float() + strptime per transaction) and UserTransactions' bincounts.
+
+Usage (from backend/):
+    python -m benchmarks.columnar_summary --years 5 --per-month 40
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.rl_engine.state import SPENDING_CATEGORIES
+from app.services.columnar import UserTransactions
+
+
+def make_history(years, per_month, seed=0):
+    rng = np.random.default_rng(seed)
+    count = years * 12 * per_month
+    start = datetime(2020, 1, 1)
+    offsets = np.sort(rng.integers(0, years * 365 * 86400, size=count))
+    categories = rng.integers(len(SPENDING_CATEGORIES), size=count)
+    amounts = rng.uniform(50, 5000, size=count).round(2)
+    return [
+        {
+            "date": (start + timedelta(seconds=int(offset))).strftime("%Y-%m-%d"),
+            "amount": float(amount),
+            "category": SPENDING_CATEGORIES[code],
+        }
+        for offset, code, amount in zip(offsets, categories, amounts)
+    ]
+
+
+def loop_summary(transactions):
+    spending = {}
+    for txn in transactions:
+        spending[txn["category"]] = spending.get(txn["category"], 0) + float(txn.get("amount", 0))
+    return spending
+
+
+def loop_history(transactions):
+    monthly = {}
+    for txn in transactions:
+        month = datetime.strptime(txn["date"], "%Y-%m-%d").strftime("%Y-%m")
+        monthly[month] = monthly.get(month, 0) + float(txn.get("amount", 0))
+    return monthly
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--per-month", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    transactions = make_history(args.years, args.per_month)
+    columns = UserTransactions.from_records(transactions)
+    print(f"{len(transactions):,} transactions, {columns.nbytes / 1024:.1f} KiB as columns")
+
+    print(f"{'aggregation':<18} {'dict loop':>12} {'columnar':>12} {'speedup':>8}")
+    for label, loop_fn, columnar_fn in [
+        ("category summary", lambda: loop_summary(transactions), columns.category_totals),
+        ("monthly history", lambda: loop_history(transactions), columns.monthly_totals),
+    ]:
+        loop_time = best_of(loop_fn, args.repeat)
+        columnar_time = best_of(columnar_fn, args.repeat)
+        print(f"{label:<18} {loop_time * 1e6:>10.0f}us {columnar_time * 1e6:>10.0f}us "
+              f"{loop_time / columnar_time:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
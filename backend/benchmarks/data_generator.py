@@ -0,0 +1,106 @@
+"""
+Throughput and distribution check for the vectorized synthetic data generator.
+
+Generates `--users` users in memory, reports rows/sec, checks that the same
+seed reproduces the same rows, and prints the statistics the generator is
+meant to preserve: income mix, category shares and mean savings rate.
+Then compares the single CSV output with the streamed Parquet dataset:
+peak RSS of each writer (fresh interpreter), size on disk and load time.
+
+Usage (from backend/):
+    python -m benchmarks.data_generator --users 24000 --months 12 --seed 0
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from app.rl_engine.data_generator import generate_synthetic_data, load_synthetic_parquet
+
+WRITERS = {
+    "csv": "generate_synthetic_data(num_users={users}, months_per_user={months}, seed={seed}, output_path={path!r})",
+    "parquet": "write_synthetic_parquet({path!r}, num_users={users}, months_per_user={months}, seed={seed})",
+}
+
+
+def run_writer(fmt, path, users, months, seed):
+    """Runs one writer in a fresh interpreter and returns its peak RSS in MB."""
+    # VmHWM rather than ru_maxrss, which Linux carries over from the parent across exec
+    code = (
+        "from app.rl_engine.data_generator import *;"
+        + WRITERS[fmt].format(path=path, users=users, months=months, seed=seed)
+        + "; print('peak_rss_kb', next(l.split()[1] for l in open('/proc/self/status') if l.startswith('VmHWM')))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    line = next(l for l in out.splitlines() if l.startswith("peak_rss_kb"))
+    return int(line.split()[1]) / 1024
+
+
+def disk_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def compare_formats(users, months, seed):
+    tmp = tempfile.mkdtemp()
+    try:
+        paths = {"csv": os.path.join(tmp, "synthetic.csv"), "parquet": os.path.join(tmp, "synthetic")}
+        loaders = {
+            "csv": lambda: pd.read_csv(paths["csv"], parse_dates=["date"]),
+            "parquet": lambda: load_synthetic_parquet(paths["parquet"]),
+        }
+        print(f"\n{'format':>8} {'peak RSS MB':>12} {'disk MB':>8} {'load s':>7}")
+        for fmt in ("csv", "parquet"):
+            peak = run_writer(fmt, paths[fmt], users, months, seed)
+            start = time.perf_counter()
+            loaders[fmt]()
+            load = time.perf_counter() - start
+            print(f"{fmt:>8} {peak:>12.0f} {disk_size(paths[fmt]) / 1e6:>8.1f} {load:>7.2f}")
+    finally:
+        shutil.rmtree(tmp)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=24000)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--block-users", type=int, default=10000)
+    parser.add_argument("--format-users", type=int, default=10000, help="Users for the CSV vs Parquet comparison")
+    args = parser.parse_args()
+
+    end_date = datetime(2026, 1, 1)
+    start = time.perf_counter()
+    df, users = generate_synthetic_data(num_users=args.users, months_per_user=args.months, output_path=None,
+                                        return_users=True, seed=args.seed, block_users=args.block_users,
+                                        end_date=end_date)
+    elapsed = time.perf_counter() - start
+    print(f"rows: {len(df)} in {elapsed:.2f}s -> {len(df) / elapsed:,.0f} rows/s")
+
+    sample = dict(num_users=200, months_per_user=args.months, output_path=None, seed=args.seed, end_date=end_date)
+    print(f"deterministic: {generate_synthetic_data(**sample).equals(generate_synthetic_data(**sample))}")
+
+    users = pd.DataFrame(users)
+    print("\nincome mix:")
+    print(users["monthlyIncome"].value_counts(normalize=True).sort_index().round(3).to_string())
+    print("\ncategory share:")
+    print(df["category"].value_counts(normalize=True).round(3).to_string())
+
+    spent = df.groupby(["userId", df["date"].str[:7]], observed=True)["amount"].sum()
+    income = users.set_index("uid")["monthlyIncome"]
+    savings_rate = 1 - spent / income.reindex(spent.index.get_level_values(0)).to_numpy()
+    print(f"\nmean savings rate: {np.mean(savings_rate):.3f}")
+
+    compare_formats(args.format_users, args.months, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Requests/sec of the Firestore-backed routes under concurrency.
+
+Serves /api/users/profile, /api/transactions and /api/budgets/summary/current
+in-process against the in-memory Firestore stand-in with emulated round-trip
+latency, in two modes:
+
+    blocking  - every round-trip blocks the event loop (a sync client inside
+                async def, i.e. the old FirestoreService)
+    async     - round-trips are awaited (firestore.AsyncClient)
+
+Usage (from backend/):
+    python -m benchmarks.firestore_concurrency --latency-ms 5 --requests 300 --concurrency 1 10 50
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+import httpx
+
+from app.main import app
+from app.services.firestore_service import db
+from app.services.rollups import ROLLUP_COLLECTION, aggregate_transactions, rollup_fields, rollup_id
+from benchmarks.firestore_standin import StandinAsyncClient, StandinStore
+
+UID = "dev_user_123"
+PATHS = ["/api/users/profile", "/api/transactions/", "/api/budgets/summary/current"]
+
+
+def seed_store(num_transactions=200):
+    store = StandinStore()
+    store.collection("users")[UID] = {
+        "uid": UID, "profile": {"monthlyIncome": 50000, "riskPreference": "moderate"}
+    }
+    now = datetime.now()
+    transactions = store.collection("transactions")
+    for i in range(num_transactions):
+        transactions[f"txn{i:05d}"] = {
+            "transactionId": f"txn{i:05d}", "userId": UID, "amount": 100.0 + i,
+            "category": "food", "date": now.replace(day=1 + i % 28, hour=12),
+        }
+    for (uid, period_start), totals in aggregate_transactions(transactions.values()).items():
+        store.collection(ROLLUP_COLLECTION)[rollup_id(uid, period_start)] = {
+            **rollup_fields(uid, period_start), **totals
+        }
+    return store
+
+
+async def run_level(client, total_requests, concurrency):
+    remaining = total_requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            r = await client.get(PATHS[remaining % len(PATHS)], headers={"Authorization": "Bearer bench"})
+            r.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return total_requests / (time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    args = parser.parse_args()
+
+    store = seed_store()
+    transport = httpx.ASGITransport(app=app)
+
+    print(f"{'mode':<10} {'concurrency':>12} {'req/s':>10}")
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        for mode in ("blocking", "async"):
+            db._client = StandinAsyncClient(store, latency=args.latency_ms / 1000, blocking=mode == "blocking")
+            db._initialized = True
+            for concurrency in args.concurrency:
+                throughput = await run_level(client, args.requests, concurrency)
+                print(f"{mode:<10} {concurrency:>12} {throughput:>10.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
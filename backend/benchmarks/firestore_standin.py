@@ -0,0 +1,322 @@
+"""
+In-memory stand-in for the parts of `firestore.AsyncClient` the backend uses.
+
+Used by the benchmarks to emulate Firestore round-trip latency without a
+network. By default every round-trip awaits asyncio.sleep(latency). With
+`blocking=True` each round-trip instead time.sleep()s before returning,
+which reproduces a synchronous client called from `async def` code.
+"""
+import asyncio
+import copy
+import random
+import time
+import uuid
+from datetime import datetime, timezone
+
+OPS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    ">=": lambda a, b: a is not None and a >= b,
+    "<=": lambda a, b: a is not None and a <= b,
+    ">": lambda a, b: a is not None and a > b,
+    "<": lambda a, b: a is not None and a < b,
+    "in": lambda a, b: a in b,
+}
+
+
+class StandinStore:
+    """collection name -> {document id -> dict}"""
+
+    def __init__(self):
+        self.collections = {}
+        self.round_trips = 0
+
+    def collection(self, name):
+        return self.collections.setdefault(name, {})
+
+
+class Snapshot:
+    def __init__(self, doc_id, data, reference=None):
+        self.id = doc_id
+        self._data = data
+        self.reference = reference
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field):
+        return (self._data or {}).get(field)
+
+
+def _is_increment(value):
+    return type(value).__name__ == "Increment"
+
+
+def _is_server_timestamp(value):
+    if type(value).__name__ != "Sentinel":
+        return False
+    from google.cloud.firestore import SERVER_TIMESTAMP
+    return value is SERVER_TIMESTAMP
+
+
+def _resolve(value):
+    """Replaces Increment transforms and SERVER_TIMESTAMP in a fresh document with their values."""
+    if _is_increment(value):
+        return value.value
+    if _is_server_timestamp(value):
+        return datetime.now(timezone.utc)
+    if isinstance(value, dict):
+        return {k: _resolve(v) for k, v in value.items()}
+    return copy.deepcopy(value)
+
+
+def _merge(target, data):
+    for key, value in data.items():
+        if _is_increment(value):
+            target[key] = target.get(key, 0) + value.value
+        elif isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        else:
+            target[key] = _resolve(value)
+
+
+class _Latency:
+    def __init__(self, store, latency, blocking):
+        self.store = store
+        self.latency = latency
+        self.blocking = blocking
+
+    def wait(self):
+        """Returns an awaitable covering one emulated round-trip."""
+        self.store.round_trips += 1
+        if self.blocking:
+            time.sleep(self.latency)
+            return asyncio.sleep(0)
+        return asyncio.sleep(self.latency)
+
+
+class _Result:
+    """Awaitable that resolves to `value` after the emulated round-trip."""
+
+    def __init__(self, value, pending):
+        self.value = value
+        self.pending = pending
+
+    def __await__(self):
+        yield from self.pending.__await__()
+        return self.value
+
+
+class DocumentReference:
+    def __init__(self, client, collection, doc_id):
+        self._client = client
+        self._collection = collection
+        self.id = doc_id
+
+    def _docs(self):
+        return self._client.store.collection(self._collection)
+
+    def _result(self, value):
+        return _Result(value, self._client.latency.wait())
+
+    def get(self):
+        return self._result(Snapshot(self.id, copy.deepcopy(self._docs().get(self.id)), self))
+
+    def set(self, data, merge=False):
+        self._write(data, merge)
+        return self._result(None)
+
+    def _write(self, data, merge=False):
+        docs = self._docs()
+        if merge and self.id in docs:
+            _merge(docs[self.id], data)
+        else:
+            docs[self.id] = _resolve(data)
+
+    def _delete(self):
+        self._docs().pop(self.id, None)
+
+    def delete(self):
+        self._delete()
+        return self._result(None)
+
+
+class Query:
+    def __init__(self, client, collection, filters=(), orders=(), limit=None, cursor=None, projection=None):
+        self._client = client
+        self._collection = collection
+        self._filters = list(filters)
+        self._orders = list(orders)
+        self._limit = limit
+        self._cursor = cursor
+        self._projection = projection
+
+    def _copy(self, **kwargs):
+        state = dict(filters=self._filters, orders=self._orders, limit=self._limit, cursor=self._cursor,
+                     projection=self._projection)
+        state.update(kwargs)
+        return Query(self._client, self._collection, **state)
+
+    def where(self, field, op, value):
+        return self._copy(filters=self._filters + [(field, op, value)])
+
+    def order_by(self, field, direction="ASCENDING"):
+        return self._copy(orders=self._orders + [(field, direction)])
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def select(self, field_paths):
+        return self._copy(projection=list(field_paths))
+
+    def start_after(self, values):
+        if isinstance(values, Snapshot):
+            values = {field: values.get(field) for field, _ in self._orders}
+        return self._copy(cursor=values)
+
+    def _matches(self):
+        docs = self._client.store.collection(self._collection)
+        rows = [
+            (doc_id, data) for doc_id, data in docs.items()
+            if all(OPS[op](data.get(field), value) for field, op, value in self._filters)
+        ]
+        for field, direction in reversed(self._orders):
+            key = (lambda r: r[0]) if field == "__name__" else (lambda r, f=field: r[1].get(f))
+            rows.sort(key=key, reverse=direction == "DESCENDING")
+        if self._cursor is not None:
+            def after(row):
+                for field, direction in self._orders:
+                    value = row[0] if field == "__name__" else row[1].get(field)
+                    cursor_value = self._cursor.get(field)
+                    if value == cursor_value:
+                        continue
+                    return value < cursor_value if direction == "DESCENDING" else value > cursor_value
+                return False
+            rows = [r for r in rows if after(r)]
+        if self._limit is not None:
+            rows = rows[:self._limit]
+        if self._projection is not None:
+            rows = [(doc_id, {f: data[f] for f in self._projection if f in data}) for doc_id, data in rows]
+        return [Snapshot(doc_id, copy.deepcopy(data),
+                         DocumentReference(self._client, self._collection, doc_id)) for doc_id, data in rows]
+
+    def stream(self):
+        snapshots = self._matches()
+        pending = self._client.latency.wait()
+
+        async def gen():
+            await pending
+            for snap in snapshots:
+                yield snap
+        return gen()
+
+    def get(self):
+        return _Result(self._matches(), self._client.latency.wait())
+
+    def count(self, alias=None):
+        return _CountQuery(self)
+
+
+class _AggregationResult:
+    def __init__(self, value, alias="count"):
+        self.value = value
+        self.alias = alias
+
+
+class _CountQuery:
+    def __init__(self, query):
+        self._query = query
+
+    def get(self):
+        result = [[_AggregationResult(len(self._query._matches()))]]
+        return _Result(result, self._query._client.latency.wait())
+
+
+class CollectionReference(Query):
+    def __init__(self, client, name):
+        super().__init__(client, name)
+        self.id = name
+
+    def document(self, doc_id=None):
+        return DocumentReference(self._client, self._collection, doc_id or uuid.uuid4().hex[:20])
+
+
+class WriteBatch:
+    """Buffers writes and applies them atomically in a single round-trip on commit()."""
+
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def set(self, reference, data, merge=False):
+        self._writes.append(("set", reference, data, merge))
+
+    def create(self, reference, data):
+        self._writes.append(("create", reference, data, False))
+
+    def delete(self, reference):
+        self._writes.append(("delete", reference, None, None))
+
+    async def commit(self):
+        from google.api_core.exceptions import AlreadyExists, DeadlineExceeded, ServiceUnavailable
+        client = self._client
+        injected = client.fail_rate and client.rng.random() < client.fail_rate
+        if injected and not client.ambiguous:
+            await client.latency.wait()
+            raise ServiceUnavailable("stand-in injected failure")
+        for op, reference, _, _ in self._writes:
+            if op == "create" and reference.id in reference._docs():
+                await client.latency.wait()
+                raise AlreadyExists(f"Document already exists: {reference.id}")
+        for op, reference, data, merge in self._writes:
+            if op == "delete":
+                reference._delete()
+            else:
+                reference._write(data, merge)
+        await client.latency.wait()
+        if injected:
+            # The writes landed, but the client never hears back
+            raise DeadlineExceeded("stand-in injected failure after commit")
+        return []
+
+
+class StandinAsyncClient:
+    def __init__(self, store=None, latency=0.005, blocking=False, fail_rate=0.0, seed=0, ambiguous=False):
+        """
+        Args:
+            fail_rate (float): Fraction of batch commits that fail.
+            ambiguous (bool): Injected failures happen after the batch was
+                applied (like a deadline expiring on the way back), instead
+                of before.
+        """
+        self.store = store or StandinStore()
+        self.latency = _Latency(self.store, latency, blocking)
+        self.fail_rate = fail_rate
+        self.ambiguous = ambiguous
+        self.rng = random.Random(seed)
+
+    def collection(self, name):
+        return CollectionReference(self, name)
+
+    def batch(self):
+        return WriteBatch(self)
+
+    def get_all(self, references, field_paths=None):
+        """Batched get: one round-trip for all `references`, yielded as snapshots."""
+        snapshots = []
+        for reference in references:
+            data = reference._docs().get(reference.id)
+            if data is not None and field_paths is not None:
+                data = {f: data[f] for f in field_paths if f in data}
+            snapshots.append(Snapshot(reference.id, copy.deepcopy(data), reference))
+        pending = self.latency.wait()
+
+        async def gen():
+            await pending
+            for snap in snapshots:
+                yield snap
+        return gen()
@@ -0,0 +1,102 @@
+"""
+Import-time profile and time-to-first-request regression benchmark.
+
+Runs `python -X importtime -c "import app.main"` in a fresh interpreter,
+reports the slowest imports, and times a fresh process from start to the
+first response on "/" (lifespan included). Results are compared against a
+stored baseline; the script exits non-zero on a regression.
+
+Usage (from backend/):
+    python -m benchmarks.import_time                      # compare against baseline
+    python -m benchmarks.import_time --update-baseline    # record a new baseline
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "import_time.json")
+
+FIRST_REQUEST = (
+    "import time; t = time.perf_counter();"
+    "from fastapi.testclient import TestClient; from app.main import app;"
+    "client = TestClient(app); client.__enter__(); client.get('/');"
+    "print('first_request_s', time.perf_counter() - t); client.__exit__(None, None, None)"
+)
+
+# Modules that must never be imported by `import app.main`
+FORBIDDEN = ("torch", "gymnasium", "firebase_admin", "google.cloud.firestore")
+
+
+def import_profile():
+    """Returns {module: (self_us, cumulative_us)} for `import app.main`."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"],
+                         capture_output=True, text=True, check=True)
+    profile = {}
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        profile[name.strip()] = (int(self_us), int(cumulative_us))
+    return profile
+
+
+def time_to_first_request(runs):
+    times = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", FIRST_REQUEST], capture_output=True, text=True, check=True)
+        line = next(l for l in out.stdout.splitlines() if l.startswith("first_request_s"))
+        times.append(float(line.split()[1]))
+    return float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--tolerance", type=float, default=1.5,
+                        help="Fail if a metric exceeds baseline * tolerance")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    profiles = [import_profile() for _ in range(args.runs)]
+    import_ms = float(np.median([p["app.main"][1] for p in profiles])) / 1000
+    first_request_ms = time_to_first_request(args.runs) * 1000
+
+    profile = profiles[-1]
+    print("Slowest imports under app.main (cumulative):")
+    for name, (_, cumulative) in sorted(profile.items(), key=lambda kv: -kv[1][1])[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    print(f"\nimport app.main:        {import_ms:8.1f} ms")
+    print(f"time to first request:  {first_request_ms:8.1f} ms")
+
+    failures = [m for m in FORBIDDEN if m in profile]
+    for module in failures:
+        print(f"REGRESSION: {module} is imported at startup")
+
+    result = {"import_ms": import_ms, "first_request_ms": first_request_ms}
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Baseline written to {BASELINE_PATH}")
+    elif os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+        for key, value in result.items():
+            limit = baseline[key] * args.tolerance
+            status = "ok" if value <= limit else "REGRESSION"
+            print(f"{key}: {value:.1f} ms (baseline {baseline[key]:.1f} ms, limit {limit:.1f} ms) {status}")
+            if value > limit:
+                failures.append(key)
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
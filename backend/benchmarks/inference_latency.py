@@ -0,0 +1,48 @@
+"""
+Measures per-suggestion inference latency of the RL model registry.
+
+Times state construction, the policy forward pass under torch.inference_mode()
+and response formatting, then reports p50/p99 (target: p99 < 5 ms on CPU).
+
+Usage (from backend/):
+    python -m benchmarks.inference_latency --model models/dqn_test.pth --iterations 5000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.rl_engine.state import allocation_from_spending, build_state
+from app.services.rl_service import ModelRegistry, suggest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="models/dqn_test.pth")
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    registry = ModelRegistry()
+    start = time.perf_counter()
+    model = registry.load("dqn", args.model)
+    print(f"Model load + warm-up: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    rng = np.random.default_rng(0)
+    latencies = np.empty(args.iterations)
+    for i in range(args.iterations):
+        spending = {cat: float(rng.uniform(0, 10000)) for cat in ("rent", "food", "transport", "shopping")}
+        start = time.perf_counter()
+        allocation = allocation_from_spending(50000.0, spending)
+        state = build_state(allocation, "moderate", 0.5)
+        suggest(model, state, allocation, 50000.0)
+        latencies[i] = time.perf_counter() - start
+
+    latencies *= 1000
+    print(f"{args.iterations} suggestions | "
+          f"p50: {np.percentile(latencies, 50):.3f} ms | "
+          f"p99: {np.percentile(latencies, 99):.3f} ms | "
+          f"max: {latencies.max():.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Compares the torch and pure-NumPy inference paths for the DQN policy.
+
+Checks that both produce the same Q-values, then reports cold-start time
+(fresh interpreter: import + load + first forward pass) and per-call
+latency for single-state and batched forward passes.
+
+Usage (from backend/):
+    python -m benchmarks.numpy_policy --checkpoint models/dqn_test.pth --npz models/dqn_test.npz
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+COLD_START = {
+    "torch": (
+        "import time; t = time.perf_counter();"
+        "from app.services.rl_service import TorchPolicy; import numpy as np;"
+        "TorchPolicy.load({path!r}).q_values(np.zeros((1, 10), dtype=np.float32));"
+        "print(time.perf_counter() - t)"
+    ),
+    "numpy": (
+        "import time; t = time.perf_counter();"
+        "from app.rl_engine.numpy_policy import NumpyPolicy; import numpy as np;"
+        "NumpyPolicy.load({path!r}).q_values(np.zeros((1, 10), dtype=np.float32));"
+        "print(time.perf_counter() - t)"
+    ),
+}
+
+
+def cold_start(backend, path, runs):
+    times = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", COLD_START[backend].format(path=path)],
+                             capture_output=True, text=True, check=True)
+        times.append(float(out.stdout.strip().splitlines()[-1]))
+    return float(np.median(times))
+
+
+def per_call(policy, states, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        policy.q_values(states)
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoint", default="models/dqn_test.pth")
+    parser.add_argument("--npz", default="models/dqn_test.npz")
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--cold-runs", type=int, default=3)
+    args = parser.parse_args()
+
+    from app.rl_engine.numpy_policy import NumpyPolicy
+    from app.services.rl_service import TorchPolicy
+
+    torch_policy = TorchPolicy.load(args.checkpoint)
+    numpy_policy = NumpyPolicy.load(args.npz)
+
+    states = np.random.default_rng(0).random((4096, 10), dtype=np.float32)
+    max_diff = np.abs(torch_policy.q_values(states) - numpy_policy.q_values(states)).max()
+    agree = np.allclose(torch_policy.q_values(states), numpy_policy.q_values(states), atol=1e-5)
+    print(f"Numerical agreement: max |dQ| = {max_diff:.2e} ({'OK' if agree else 'MISMATCH'})")
+
+    print(f"{'backend':<8} {'cold start (ms)':>16} {'1x10 call (us)':>15} {'64x10 call (us)':>16}")
+    for name, policy in (("torch", torch_policy), ("numpy", numpy_policy)):
+        cold = cold_start(name, args.npz if name == "numpy" else args.checkpoint, args.cold_runs)
+        single = per_call(policy, states[:1], args.iterations)
+        batch = per_call(policy, states[:64], args.iterations)
+        print(f"{name:<8} {cold * 1000:>16.1f} {single * 1e6:>15.1f} {batch * 1e6:>16.1f}")
+
+    if not agree:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Throughput of the batch suggestion precompute job (app.services.suggestions).
+
+Seeds the in-memory Firestore stand-in with `--users` users and their
+current-month rollups, runs the job with emulated round-trip latency, and
+reports users/s and Firestore round-trips. It then interrupts a second run
+after a few pages and checks that resuming from the checkpoint finishes the
+remaining users, that served suggestions match on-demand inference, and
+that a transaction written while its page is being computed is not lost.
+
+Usage (from backend/):
+    python -m benchmarks.precompute_suggestions --users 100000 --latency-ms 20
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from app.rl_engine.state import SPENDING_CATEGORIES, allocation_from_spending, build_state
+from app.services.cache import TTLCache
+from app.services.columnar import ColumnarTransactionStore
+from app.services.firestore_service import FirestoreService
+from app.services.rl_service import ModelRegistry, format_suggestion
+from app.services.rollups import ROLLUP_COLLECTION, rollup_fields, rollup_id
+from app.services.suggestions import (
+    SUGGESTION_COLLECTION, current_suggestion, load_checkpoint, period_key, precompute_suggestions
+)
+from benchmarks.firestore_standin import StandinAsyncClient, StandinStore
+
+MODEL_PATH = "models/dqn_test.npz"
+
+
+def seed_store(num_users, period_start, seed=0):
+    rng = np.random.default_rng(seed)
+    store = StandinStore()
+    users, rollups = store.collection("users"), store.collection(ROLLUP_COLLECTION)
+    incomes = rng.choice([25000, 50000, 100000, 200000], size=num_users)
+    risks = rng.choice(["conservative", "moderate", "aggressive"], size=num_users)
+    spent = rng.uniform(0, 0.15, size=(num_users, len(SPENDING_CATEGORIES))) * incomes[:, None]
+    for i in range(num_users):
+        uid = f"user_{i:07d}"
+        users[uid] = {"uid": uid, "profile": {"monthlyIncome": float(incomes[i]), "riskPreference": str(risks[i])}}
+        # One in five users has no spending yet this month
+        if i % 5:
+            actual = {cat: float(amount) for cat, amount in zip(SPENDING_CATEGORIES, spent[i])}
+            rollups[rollup_id(uid, period_start)] = {
+                **rollup_fields(uid, period_start), "totalSpent": sum(actual.values()), "actualSpent": actual
+            }
+    return store
+
+
+def service(store, latency):
+    return FirestoreService(StandinAsyncClient(store, latency=latency), cache=TTLCache(),
+                            columns=ColumnarTransactionStore())
+
+
+def on_demand(model, store, uid, period_start):
+    profile = store.collection("users")[uid]["profile"]
+    rollup = store.collection(ROLLUP_COLLECTION).get(rollup_id(uid, period_start)) or {}
+    allocation = allocation_from_spending(profile["monthlyIncome"], rollup.get("actualSpent", {}))
+    state = build_state(allocation, profile["riskPreference"], (period_start.month - 1) / 12)
+    return format_suggestion(model.name, model.q_values(state.reshape(1, -1))[0], allocation,
+                             profile["monthlyIncome"])
+
+
+async def interrupted_run(db, models, period_start, page_size, checkpoint_path, pages):
+    """Runs the job and cancels it once `pages` pages have been checkpointed."""
+    os.remove(checkpoint_path)
+    task = asyncio.create_task(precompute_suggestions(db, models, period_start, page_size, checkpoint_path,
+                                                      restart=True))
+    while not task.done():
+        await asyncio.sleep(0.001)
+        checkpoint = load_checkpoint(checkpoint_path)
+        if checkpoint and checkpoint["processed"] >= pages * page_size:
+            task.cancel()
+            break
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    return load_checkpoint(checkpoint_path)["processed"]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    now = datetime.now()
+    period_start = datetime(now.year, now.month, 1)
+    registry = ModelRegistry()
+    models = [registry.load("dqn", MODEL_PATH)]
+    checkpoint_path = os.path.join(tempfile.mkdtemp(), "checkpoint.json")
+
+    print(f"Seeding {args.users:,} users...")
+    store = seed_store(args.users, period_start)
+    db = service(store, args.latency_ms / 1000)
+
+    # 1. Full run
+    start = time.perf_counter()
+    written = await precompute_suggestions(db, models, period_start, args.page_size, checkpoint_path)
+    elapsed = time.perf_counter() - start
+    print(f"Full run: {written:,} users in {elapsed:.1f}s ({written / elapsed:,.0f} users/s), "
+          f"{store.round_trips} round-trips")
+
+    # 2. Interrupted run, then resume from the checkpoint
+    store.collection(SUGGESTION_COLLECTION).clear()
+    done = await interrupted_run(db, models, period_start, args.page_size, checkpoint_path, pages=3)
+    resumed = await precompute_suggestions(db, models, period_start, args.page_size, checkpoint_path)
+    documents = store.collection(SUGGESTION_COLLECTION)
+    print(f"Interrupted after {done:,} users, resumed for {resumed:,} more; "
+          f"{len(documents):,}/{args.users:,} documents present")
+    assert done + resumed == args.users and len(documents) == args.users
+
+    # 3. Precomputed suggestions match on-demand inference
+    for uid in list(documents)[::max(1, args.users // 200)]:
+        expected = on_demand(models[0], store, uid, period_start)
+        assert current_suggestion(documents[uid], models[0], period_key(period_start)) == expected, uid
+    print("Sampled suggestions match on-demand inference")
+
+    # 4. A write between reading a page and writing its suggestions invalidates the user's document
+    racing_uid = list(documents)[0]
+    read_rollups = db.get_budget_rollups_bulk
+
+    async def rollups_then_write(uids, period_start):
+        rollups = await read_rollups(uids, period_start)
+        if racing_uid in uids:
+            await db.add_transaction({"userId": racing_uid, "date": period_start, "amount": 500.0,
+                                      "category": "food"})
+        return rollups
+
+    db.get_budget_rollups_bulk = rollups_then_write
+    await precompute_suggestions(db, models, period_start, args.page_size, restart=True)
+    assert current_suggestion(documents[racing_uid], models[0], period_key(period_start)) is None
+    print("A write racing the job leaves the user's suggestion invalid")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
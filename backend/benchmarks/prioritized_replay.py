@@ -0,0 +1,107 @@
+"""
+Compares prioritized and uniform experience replay on BudgetEnvironment.
+
+Reports episodes-to-convergence and wall-clock time per replay mode,
+averaged over several seeds.
+
+Usage (from backend/):
+    python -m benchmarks.prioritized_replay --episodes 300 --seeds 3
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import tempfile
+import time
+
+import numpy as np
+import torch
+
+from app.rl_engine.environment import BudgetEnvironment
+from app.rl_engine.training import train_agent
+
+PROFILE = {"monthlyIncome": 50000, "riskPreference": "moderate"}
+
+
+def reference_return(profile):
+    """Return of the fixed 'Aggressive Save every month' policy, used as the convergence target."""
+    env = BudgetEnvironment(profile)
+    env.reset()
+    total, done = 0.0, False
+    while not done:
+        _, reward, terminated, truncated, _ = env.step(6)
+        total += reward
+        done = terminated or truncated
+    return total
+
+
+def episodes_to_convergence(rewards_history, target, window=20):
+    """First episode at which the moving average reward reaches `target`, or None."""
+    rewards = np.asarray(rewards_history)
+    if len(rewards) < window:
+        return None
+    moving = np.convolve(rewards, np.ones(window) / window, mode="valid")
+    hits = np.nonzero(moving >= target)[0]
+    return int(hits[0] + window) if len(hits) else None
+
+
+def run(prioritized, seed, episodes):
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+    
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        _, rewards_history = train_agent(
+            PROFILE, episodes=episodes, save_path=f"{tmp}/dqn.pth", prioritized=prioritized
+        )
+        elapsed = time.perf_counter() - start
+    return rewards_history, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--episodes", type=int, default=300)
+    parser.add_argument("--seeds", type=int, default=3)
+    parser.add_argument("--target-fraction", type=float, default=0.9,
+                        help="Convergence target as a fraction of the reference policy's return")
+    parser.add_argument("--output", help="Optional path to write results as JSON")
+    args = parser.parse_args()
+    
+    target = args.target_fraction * reference_return(PROFILE)
+    print(f"Convergence target: moving-average reward >= {target:.2f}")
+    
+    results = {}
+    for mode, prioritized in (("uniform", False), ("prioritized", True)):
+        runs = []
+        for seed in range(args.seeds):
+            rewards_history, elapsed = run(prioritized, seed, args.episodes)
+            runs.append({
+                "seed": seed,
+                "wall_clock_s": elapsed,
+                "episodes_to_convergence": episodes_to_convergence(rewards_history, target),
+                "final_avg_reward": float(np.mean(rewards_history[-50:])),
+            })
+        converged = [r["episodes_to_convergence"] for r in runs if r["episodes_to_convergence"] is not None]
+        results[mode] = {
+            "runs": runs,
+            "mean_wall_clock_s": float(np.mean([r["wall_clock_s"] for r in runs])),
+            "mean_episodes_to_convergence": float(np.mean(converged)) if converged else None,
+            "converged_runs": len(converged),
+        }
+    
+    print(f"{'mode':<12} {'wall clock (s)':>15} {'episodes to conv.':>18} {'converged':>10}")
+    for mode, summary in results.items():
+        eps = summary["mean_episodes_to_convergence"]
+        eps_str = f"{eps:.1f}" if eps is not None else "-"
+        print(f"{mode:<12} {summary['mean_wall_clock_s']:>15.2f} {eps_str:>18} "
+              f"{summary['converged_runs']:>6}/{args.seeds}")
+    
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
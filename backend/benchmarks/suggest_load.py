@@ -0,0 +1,68 @@
+"""
+Load test for POST /api/rl/suggest with and without micro-batching.
+
+Drives the FastAPI app in-process through httpx's ASGI transport at several
+concurrency levels and reports throughput and mean forward-pass batch size.
+Run without Firestore credentials so only the RL path is exercised.
+
+Usage (from backend/):
+    python -m benchmarks.suggest_load --requests 2000 --concurrency 1 8 32 128
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from app.config import settings
+from app.main import app
+from app.services.rl_batcher import batcher
+from app.services.rl_service import registry
+
+
+async def run_level(client, total_requests, concurrency):
+    remaining = total_requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            r = await client.post("/api/rl/suggest", json={"modelType": "dqn"},
+                                  headers={"Authorization": "Bearer load-test"})
+            r.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return total_requests / (time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--max-wait-ms", type=float, default=settings.RL_BATCH_MAX_WAIT_MS)
+    parser.add_argument("--max-batch-size", type=int, default=settings.RL_BATCH_MAX_SIZE)
+    args = parser.parse_args()
+
+    registry.load_all(settings.RL_MODELS)
+    transport = httpx.ASGITransport(app=app)
+
+    print(f"{'mode':<10} {'concurrency':>12} {'req/s':>10} {'mean batch':>11}")
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        for mode in ("unbatched", "batched"):
+            for concurrency in args.concurrency:
+                if mode == "batched":
+                    batcher.max_wait = args.max_wait_ms / 1000
+                    batcher.max_batch_size = args.max_batch_size
+                    batcher.start()
+                batcher.batches = batcher.items = 0
+
+                throughput = await run_level(client, args.requests, concurrency)
+                mean_batch = batcher.items / batcher.batches if batcher.batches else 1.0
+                print(f"{mode:<10} {concurrency:>12} {throughput:>10.0f} {mean_batch:>11.1f}")
+
+                await batcher.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,257 @@
+"""
+Benchmark suite for the RL engine hot paths.
+
+Cases:
+  env_reset / env_step          BudgetEnvironment calls (single state)
+  vector_env_step_16            VectorBudgetEnvironment.step over 16 rows
+  select_action                 DQNAgent.select_action, greedy, one state
+  replay_b{32,64,256}           DQNAgent.replay (sample + update), uniform buffer
+  replay_per_b64                DQNAgent.replay with prioritized replay
+  train_agent_episode           train_agent, per episode, end to end
+  generate_synthetic_rows       generate_synthetic_data, per row
+
+Every case is timed `--repeat` times (after a warm-up); the median time per
+call is the headline number. Results are written as JSON together with
+machine info, and compared against a stored baseline (or any earlier result
+file via --compare); the script exits non-zero when a case is slower than
+baseline * tolerance. Baselines are machine-specific: record one per
+deployment/CI machine with --update-baseline.
+
+Usage (from backend/):
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --update-baseline
+    python -m benchmarks.suite --compare old_results.json --filter replay
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import torch
+
+from app.rl_engine.agents.dqn import DQNAgent
+from app.rl_engine.data_generator import generate_synthetic_data
+from app.rl_engine.environment import BudgetEnvironment, VectorBudgetEnvironment
+from app.rl_engine.training import train_agent
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "rl_engine.json")
+
+PROFILE = {"monthlyIncome": 50000, "riskPreference": "moderate"}
+
+CASES = {}
+
+
+def case(name, number):
+    """
+    Registers `setup() -> fn`. fn(number) runs `number` units of work per timing;
+    if it returns a count, that count is used as the number of units instead.
+    """
+    def register(setup):
+        CASES[name] = (setup, number)
+        return setup
+    return register
+
+
+def seed_everything(seed=0):
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+
+@case("env_reset", number=1000)
+def _env_reset():
+    env = BudgetEnvironment(PROFILE)
+
+    def run(n):
+        for _ in range(n):
+            env.reset()
+    return run
+
+
+@case("env_step", number=1000)
+def _env_step():
+    env = BudgetEnvironment(PROFILE)
+    env.reset(seed=0)
+    actions = np.random.randint(9, size=1000)
+
+    def run(n):
+        for i in range(n):
+            _, _, terminated, _, _ = env.step(actions[i % len(actions)])
+            if terminated:
+                env.reset()
+    return run
+
+
+@case("vector_env_step_16", number=200)
+def _vector_env_step():
+    env = VectorBudgetEnvironment(PROFILE, num_envs=16)
+    env.reset(seed=0)
+    actions = np.random.randint(9, size=(200, 16))
+
+    def run(n):
+        for i in range(n):
+            env.step(actions[i % len(actions)])
+    return run
+
+
+@case("select_action", number=500)
+def _select_action():
+    agent = DQNAgent()
+    state = BudgetEnvironment(PROFILE).reset(seed=0)[0]
+
+    def run(n):
+        for _ in range(n):
+            agent.select_action(state, training=False)
+    return run
+
+
+def _filled_agent(batch_size, prioritized=False):
+    agent = DQNAgent(prioritized=prioritized)
+    agent.batch_size = batch_size
+    states = np.random.random((5000, 10)).astype(np.float32)
+    agent.remember_batch(states, np.random.randint(9, size=5000), np.random.randn(5000).astype(np.float32),
+                         np.random.random((5000, 10)).astype(np.float32), np.zeros(5000, dtype=np.float32))
+
+    def run(n):
+        for _ in range(n):
+            agent.replay()
+    return run
+
+
+for _batch_size in (32, 64, 256):
+    case(f"replay_b{_batch_size}", number=50)(lambda b=_batch_size: _filled_agent(b))
+case("replay_per_b64", number=50)(lambda: _filled_agent(64, prioritized=True))
+
+
+@case("train_agent_episode", number=10)
+def _train_agent():
+    save_path = os.path.join(tempfile.mkdtemp(), "dqn_bench.pth")
+
+    def run(n):
+        train_agent(PROFILE, episodes=n, save_path=save_path, verbose=False)
+    return run
+
+
+@case("generate_synthetic_rows", number=100)
+def _generate_synthetic():
+    # `number` users x 12 months; timed per generated row
+    def run(n):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return len(generate_synthetic_data(num_users=n, months_per_user=12, output_path=None, seed=0))
+    return run
+
+
+def machine_info():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    import gymnasium
+    import pandas
+    return {
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "torch": torch.__version__,
+        "torch_threads": torch.get_num_threads(),
+        "gymnasium": gymnasium.__version__,
+        "pandas": pandas.__version__,
+        "git_commit": commit,
+    }
+
+
+def run_case(name, repeat):
+    setup, number = CASES[name]
+    seed_everything()
+    fn = setup()
+    fn(number)  # warm-up
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        units = fn(number)
+        times.append((time.perf_counter() - start) / (units or number))
+    q1, median, q3 = np.percentile(times, [25, 50, 75])
+    return {
+        "median_s": float(median),
+        "min_s": float(min(times)),
+        "iqr_s": float(q3 - q1),
+        "per_sec": float(1 / median),
+        "repeat": repeat,
+        "number": number,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Prints a comparison table and returns the names of regressed cases."""
+    regressions = []
+    print(f"\n{'case':<26} {'median':>12} {'baseline':>12} {'ratio':>7}")
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name:<26} {result['median_s'] * 1e6:>10.1f}us {'-':>12} {'-':>7}")
+            continue
+        ratio = result["median_s"] / baseline[name]["median_s"]
+        status = "REGRESSION" if ratio > tolerance else ""
+        print(f"{name:<26} {result['median_s'] * 1e6:>10.1f}us {baseline[name]['median_s'] * 1e6:>10.1f}us "
+              f"{ratio:>6.2f}x {status}")
+        if ratio > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--filter", help="Only run cases whose name contains this substring")
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--compare", help="Result JSON to compare against (default: stored baseline)")
+    parser.add_argument("--tolerance", type=float, default=1.3,
+                        help="Fail if a case's median exceeds baseline * tolerance")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    names = [name for name in CASES if not args.filter or args.filter in name]
+    results = {}
+    for name in names:
+        results[name] = run_case(name, args.repeat)
+        print(f"{name:<26} {results[name]['median_s'] * 1e6:>10.1f}us/call  {results[name]['per_sec']:>12,.0f}/s")
+
+    report = {"machine": machine_info(), "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {BASELINE_PATH}")
+        return
+
+    compare_path = args.compare or BASELINE_PATH
+    if not os.path.exists(compare_path):
+        return
+    with open(compare_path) as f:
+        baseline = json.load(f)
+    if baseline["machine"].get("processor") != report["machine"]["processor"] or \
+            baseline["machine"].get("cpu_count") != report["machine"]["cpu_count"]:
+        print("\nWarning: baseline was recorded on a different machine; ratios are indicative only.")
+    if compare(results, baseline["results"], args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
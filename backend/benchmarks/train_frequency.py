@@ -0,0 +1,77 @@
+"""
+Wall-clock vs. reward trade-off of the update schedule in train_agent.
+
+Trains the same profile under several (train_freq, gradient_steps,
+batch_size, tau) settings and reports training time, gradient updates per
+second, the average reward of the last 50 training episodes, and the
+reward of one greedy evaluation episode. Each setting is averaged over
+`--seeds` seeds.
+
+Usage (from backend/):
+    python -m benchmarks.train_frequency --episodes 300 --seeds 3
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+import torch
+
+from app.rl_engine.environment import BudgetEnvironment
+from app.rl_engine.training import train_agent
+
+PROFILE = {"monthlyIncome": 50000, "riskPreference": "moderate"}
+
+# (label, train_agent kwargs)
+SETTINGS = [
+    ("every step, b64 (default)", dict()),
+    ("every step, b64, tau=0.005", dict(tau=0.005)),
+    ("freq 4, 1 step, b256", dict(train_freq=4, batch_size=256)),
+    ("freq 4, 2 steps, b128", dict(train_freq=4, gradient_steps=2, batch_size=128)),
+    ("freq 8, 1 step, b512", dict(train_freq=8, batch_size=512)),
+    ("freq 4, b256, tau=0.01", dict(train_freq=4, batch_size=256, tau=0.01)),
+    ("freq 4, b256, start 1000", dict(train_freq=4, batch_size=256, learning_starts=1000)),
+]
+
+
+def greedy_reward(agent):
+    env = BudgetEnvironment(PROFILE)
+    state, _ = env.reset(seed=0)
+    total, done = 0.0, False
+    while not done:
+        state, reward, terminated, truncated, _ = env.step(agent.select_action(state, training=False))
+        total += reward
+        done = terminated or truncated
+    return total
+
+
+def run(kwargs, episodes, seed, save_path):
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+    start = time.perf_counter()
+    agent, rewards = train_agent(PROFILE, episodes=episodes, save_path=save_path, verbose=False, **kwargs)
+    elapsed = time.perf_counter() - start
+
+    return elapsed, agent.num_updates / elapsed, float(np.mean(rewards[-50:])), greedy_reward(agent)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--episodes", type=int, default=300)
+    parser.add_argument("--seeds", type=int, default=3)
+    args = parser.parse_args()
+
+    save_path = os.path.join(tempfile.mkdtemp(), "dqn_bench.pth")
+    print(f"{'setting':<28} {'time s':>7} {'updates/s':>10} {'train reward':>13} {'greedy reward':>14}")
+    for label, kwargs in SETTINGS:
+        results = np.array([run(kwargs, args.episodes, seed, save_path) for seed in range(args.seeds)])
+        elapsed, updates_per_sec, train_reward, eval_reward = results.mean(axis=0)
+        print(f"{label:<28} {elapsed:>7.2f} {updates_per_sec:>10.0f} {train_reward:>13.2f} {eval_reward:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
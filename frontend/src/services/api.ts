@@ -42,8 +42,8 @@ export const api = {
         apiClient.put('/api/users/profile', data),
 
     // Transactions
-    getTransactions: (params?: { period?: string; limit?: number }) =>
-        apiClient.get<{ transactions: Transaction[]; total: number }>('/api/transactions', { params }),
+    getTransactions: (params?: { period?: string; limit?: number; category?: string; cursor?: string }) =>
+        apiClient.get<{ transactions: Transaction[]; total: number; nextCursor: string | null }>('/api/transactions', { params }),
 
     createTransaction: (data: Omit<Transaction, 'transactionId' | 'userId' | 'createdAt' | 'source'>) =>
         apiClient.post<{ success: boolean; transactionId: string }>('/api/transactions', data),